@@ -0,0 +1,122 @@
+from __future__ import annotations
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional
+import math
+
+
+def _add_exact(partials: List[float], x: float) -> None:
+    """Shewchuk's running sum: ``partials`` always represents the exact total, so
+    ``math.fsum(partials)`` equals ``math.fsum`` over every value ever added."""
+    i = 0
+    for y in partials:
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo:
+            partials[i] = lo
+            i += 1
+        x = hi
+    partials[i:] = [x]
+
+
+class RunningAggregate:
+    """Constant-memory aggregate over per-segment results.
+
+    ``mean_score`` is bit-identical to ``statistics.fmean`` over the same scores. The
+    exact partial sums make aggregates mergeable: :meth:`to_partial` output from shards
+    of a corpus, combined with :meth:`merge`, gives the same numbers as one pass.
+
+    When results were judged several times (``score_var`` over ``num_samples``, see
+    ``prompting.parse_samples``), ``mean_score_ci`` at ``confidence`` is reported from
+    ``s^2 / N`` of the per-segment means, which already include their judge noise;
+    that share is reported on its own as ``judge_noise_se``
+    (``sqrt(sum(score_var / num_samples)) / N``).
+    """
+
+    def __init__(self, confidence: float = 0.95) -> None:
+        self.confidence = confidence
+        self.num_segments = 0
+        self.num_scored = 0
+        self.num_errors = 0
+        self.num_sampled = 0
+        self._sum: List[float] = []
+        self._sum_sq: List[float] = []
+        self._noise: List[float] = []
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.num_segments += 1
+        if "error" in result:
+            self.num_errors += 1
+        score = result.get("score")
+        if isinstance(score, (int, float)):
+            self.num_scored += 1
+            _add_exact(self._sum, float(score))
+            _add_exact(self._sum_sq, float(score) * float(score))
+            var, k = result.get("score_var"), result.get("num_samples")
+            if isinstance(var, (int, float)) and isinstance(k, int) and k > 0:
+                self.num_sampled += 1
+                _add_exact(self._noise, float(var) / k)
+
+    def merge(self, other: "RunningAggregate") -> "RunningAggregate":
+        """Add ``other``'s segments to this aggregate (exactly, in any order)."""
+        self.num_segments += other.num_segments
+        self.num_scored += other.num_scored
+        self.num_errors += other.num_errors
+        self.num_sampled += other.num_sampled
+        for x in other._noise:
+            _add_exact(self._noise, x)
+        for x in other._sum:
+            _add_exact(self._sum, x)
+        for x in other._sum_sq:
+            _add_exact(self._sum_sq, x)
+        return self
+
+    def to_partial(self) -> Dict[str, Any]:
+        """JSON-serialisable state; floats round-trip exactly through ``json``."""
+        return {
+            "num_segments": self.num_segments,
+            "num_scored": self.num_scored,
+            "num_errors": self.num_errors,
+            "sum": list(self._sum),
+            "sum_sq": list(self._sum_sq),
+            "num_sampled": self.num_sampled,
+            "noise": list(self._noise),
+        }
+
+    @classmethod
+    def from_partial(cls, data: Dict[str, Any]) -> "RunningAggregate":
+        agg = cls()
+        agg.num_segments = int(data["num_segments"])
+        agg.num_scored = int(data["num_scored"])
+        agg.num_errors = int(data["num_errors"])
+        agg._sum = [float(x) for x in data["sum"]]
+        agg._sum_sq = [float(x) for x in data["sum_sq"]]
+        agg.num_sampled = int(data.get("num_sampled", 0))
+        agg._noise = [float(x) for x in data.get("noise", [])]
+        return agg
+
+    @property
+    def mean_score(self) -> Optional[float]:
+        return math.fsum(self._sum) / self.num_scored if self.num_scored else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "mean_score": self.mean_score,
+            "num_segments": self.num_segments,
+            "num_scored": self.num_scored,
+            "num_errors": self.num_errors,
+        }
+        if self.num_sampled and self.mean_score is not None:
+            n = self.num_scored
+            se: Optional[float] = None
+            out["mean_score_ci"] = None
+            if n > 1:
+                centered = math.fsum(self._sum_sq) - math.fsum(self._sum) ** 2 / n
+                se = math.sqrt(max(0.0, centered) / (n - 1) / n)
+                half = NormalDist().inv_cdf((1 + self.confidence) / 2) * se
+                out["mean_score_ci"] = [self.mean_score - half, self.mean_score + half]
+            out["mean_score_se"] = se
+            out["judge_noise_se"] = math.sqrt(max(0.0, math.fsum(self._noise))) / n
+            out["confidence"] = self.confidence
+        return out
@@ -1,49 +1,217 @@
+import importlib
+import json
 import os
-from typing import Any, Dict, Optional, TYPE_CHECKING
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, TYPE_CHECKING, Union
 from dotenv import load_dotenv
+import httpx
+
+from .prompting import JsonFieldScanner
+from .ratelimit import estimate_tokens
+from .telemetry import TELEMETRY, RequestRecord
 
 load_dotenv()
 
 try:  # pragma: no cover
-    from openai import OpenAI
+    from openai import DefaultHttpxClient, OpenAI
 except ImportError as e:  # pragma: no cover
     OpenAI = None  # type: ignore
+    DefaultHttpxClient = None  # type: ignore
+
+DEFAULT_PROFILE_PATH = os.path.join("~", ".cache", "llm-eval", "deployment_profiles.json")
+
+
+def configured_endpoints() -> List[str]:
+    """Endpoints serving the same deployments, from ``AZURE_OPENAI_ENDPOINTS`` (comma-separated)."""
+    raw = os.getenv("AZURE_OPENAI_ENDPOINTS", "")
+    return [e.strip() for e in raw.split(",") if e.strip()]
+
+
+def _api_key_for(endpoint: Optional[str]) -> Optional[str]:
+    # AZURE_OPENAI_API_KEYS lines up with AZURE_OPENAI_ENDPOINTS; otherwise one key for all
+    keys = [k.strip() for k in os.getenv("AZURE_OPENAI_API_KEYS", "").split(",") if k.strip()]
+    endpoints = configured_endpoints()
+    if endpoint is not None and keys and endpoint in endpoints and len(keys) == len(endpoints):
+        return keys[endpoints.index(endpoint)]
+    return os.getenv("AZURE_OPENAI_API_KEY")
+
+
+@dataclass
+class ClientConfig:
+    """Connection-pool settings shared by every endpoint client."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 100
+    keepalive_expiry: float = 60.0
+    timeout: float = 120.0
+    connect_timeout: float = 10.0
 
-_CLIENT: Any = None  # defer concrete type to runtime
+
+def _http_module() -> Any:
+    # Limits/Timeout must come from the HTTP library the SDK's client is built on
+    # (httpx, or its httpx2 fork in newer SDK releases); mixing them breaks requests.
+    try:
+        return importlib.import_module(DefaultHttpxClient.__mro__[1].__module__.split(".")[0])
+    except (AttributeError, IndexError, ImportError):  # pragma: no cover
+        return httpx
 
 
-def _build_client() -> Any:
-    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    api_key = os.getenv("AZURE_OPENAI_API_KEY")
+def _build_client(endpoint: Optional[str] = None, config: Optional[ClientConfig] = None) -> Any:
+    endpoint = endpoint or os.getenv("AZURE_OPENAI_ENDPOINT")
+    api_key = _api_key_for(endpoint)
     if not endpoint or not api_key:
         raise RuntimeError("AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY must be set")
     if OpenAI is None:  # pragma: no cover
         raise ImportError("openai package not installed. Install with `pip install openai`.")
+    config = config or ClientConfig()
+    # Explicit pool: keep enough warm connections for the configured concurrency so
+    # bursts reuse TLS sessions instead of reconnecting.
+    http = _http_module()
+    http_client = DefaultHttpxClient(
+        limits=http.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        timeout=http.Timeout(config.timeout, connect=config.connect_timeout),
+    )
     # Ensure endpoint ends with /openai/v1/ for the Azure OpenAI v1 API
     # Accept endpoints already containing /openai/.* and trust user if custom.
-    return OpenAI(base_url=endpoint.rstrip("/" ) + "/" if not endpoint.endswith("/") else endpoint, api_key=api_key)
+    # SDK-level retries are disabled: ratelimit.RateLimitedChat owns retry/backoff so that
+    # throttling is paced against the shared quota instead of per call.
+    return OpenAI(
+        base_url=endpoint.rstrip("/" ) + "/" if not endpoint.endswith("/") else endpoint,
+        api_key=api_key,
+        max_retries=0,
+        http_client=http_client,
+    )
 
 
-def get_client() -> Any:
-    global _CLIENT
-    if _CLIENT is None:
-        _CLIENT = _build_client()
-    return _CLIENT
+class ClientPool:
+    """One long-lived, explicitly configured client per endpoint, safe to share across threads."""
 
+    def __init__(self, config: Optional[ClientConfig] = None):
+        self.config = config or ClientConfig()
+        self._clients: Dict[Optional[str], Any] = {}
+        self._lock = threading.Lock()
 
-def chat_completion(
+    def get(self, endpoint: Optional[str] = None) -> Any:
+        with self._lock:
+            if endpoint not in self._clients:
+                self._clients[endpoint] = _build_client(endpoint, self.config)
+            return self._clients[endpoint]
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                try:
+                    client.close()
+                except Exception:  # noqa: BLE001
+                    pass
+            self._clients.clear()
+
+
+_POOL = ClientPool()
+
+
+def configure_clients(config: ClientConfig) -> ClientPool:
+    """Replace the shared client pool (closing existing connections) with new settings."""
+    global _POOL
+    old, _POOL = _POOL, ClientPool(config)
+    old.close()
+    return _POOL
+
+
+def get_client(endpoint: Optional[str] = None) -> Any:
+    return _POOL.get(endpoint)
+
+
+# Adaptive request-shape transforms, in the order the fallback loop tries them:
+# 1. max_tokens -> max_completion_tokens
+# 2. remove temperature if rejected
+# 3. max_completion_tokens -> max_tokens (inverse future-proof)
+# 4. drop n (multiple choices) if rejected; callers make separate requests instead
+def _apply_transform(kwargs: Dict[str, Any], name: str) -> bool:
+    if name == "max_tokens->max_completion_tokens" and "max_tokens" in kwargs:
+        kwargs["max_completion_tokens"] = kwargs.pop("max_tokens")
+        return True
+    if name == "drop-temperature" and "temperature" in kwargs:
+        kwargs.pop("temperature")
+        return True
+    if name == "max_completion_tokens->max_tokens" and "max_completion_tokens" in kwargs:
+        kwargs["max_tokens"] = kwargs.pop("max_completion_tokens")
+        return True
+    if name == "drop-n" and "n" in kwargs:
+        kwargs.pop("n")
+        return True
+    return False
+
+
+class CapabilityProfiles:
+    """Accepted request shape per (endpoint, deployment), learned once and shared.
+
+    A profile is the list of adaptive transforms a deployment needed; later calls
+    apply it up front instead of failing and retransforming every time. Profiles
+    can be persisted as JSON between runs.
+    """
+
+    def __init__(self) -> None:
+        self._profiles: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(deployment: str, endpoint: Optional[str] = None) -> str:
+        return f"{endpoint or os.getenv('AZURE_OPENAI_ENDPOINT', '')}|{deployment}"
+
+    def get(self, deployment: str, endpoint: Optional[str] = None) -> List[str]:
+        with self._lock:
+            return list(self._profiles.get(self.key(deployment, endpoint), []))
+
+    def record(self, deployment: str, endpoint: Optional[str], transforms: List[str]) -> None:
+        with self._lock:
+            self._profiles[self.key(deployment, endpoint)] = list(transforms)
+
+    def load(self, path: str) -> None:
+        path = os.path.expanduser(path)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return  # a corrupt profile file only costs a re-learn
+        with self._lock:
+            for key, transforms in (data.get("profiles") or {}).items():
+                if isinstance(transforms, list):
+                    self._profiles[key] = [str(t) for t in transforms]
+
+    def save(self, path: str) -> None:
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            data = {"version": 1, "profiles": dict(self._profiles)}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+
+PROFILES = CapabilityProfiles()
+
+
+def build_request(
     deployment: str,
     system: str,
     user: str,
     temperature: float = 0.0,
     max_tokens: int = 1024,
     response_format: Optional[Dict[str, Any]] = None,
-) -> str:
-    """Send a chat completion request using the OpenAI SDK (Azure OpenAI v1 endpoint).
-
-    Parameters are consistent with previous implementation for backward compatibility.
-    """
-    client = get_client()
+    endpoint: Optional[str] = None,
+    n: int = 1,
+) -> Dict[str, Any]:
+    """Chat completion request body, already in the shape this deployment is known to accept."""
     messages = []
     if system:
         messages.append({"role": "system", "content": system})
@@ -55,6 +223,8 @@ def chat_completion(
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
+    if n > 1:
+        kwargs["n"] = n
     # Basic mapping for response_format; OpenAI v1 supports response_format={"type": "json_object"}
     if response_format:
         # If user passed full dict, forward as-is; if simple alias, convert
@@ -62,12 +232,22 @@ def chat_completion(
             kwargs["response_format"] = response_format
         else:  # pragma: no cover
             kwargs["response_format"] = {"type": str(response_format)}
-    # Sequential adaptive retries for evolving parameter requirements.
-    # Order of transforms we may apply:
-    # 1. max_tokens -> max_completion_tokens
-    # 2. remove temperature if rejected
-    # 3. max_completion_tokens -> max_tokens (inverse future-proof)
-    attempted_transforms = []
+    for name in PROFILES.get(deployment, endpoint):
+        _apply_transform(kwargs, name)
+    return kwargs
+
+
+def create_completion(client: Any, kwargs: Dict[str, Any], endpoint: Optional[str] = None) -> Any:
+    """Send ``kwargs`` to ``client``, adapting the request shape if parameters are rejected.
+
+    Whatever shape finally succeeds is recorded in :data:`PROFILES`, so subsequent
+    requests for the deployment (from any thread) start with it.
+    """
+    deployment = kwargs["model"]
+    learned = PROFILES.get(deployment, endpoint)
+    # Sequential adaptive retries for evolving parameter requirements (see _apply_transform).
+    # The learned transforms were already applied by build_request.
+    attempted_transforms = list(learned)
     for _ in range(4):  # hard cap to avoid infinite loops
         try:
             completion = client.chat.completions.create(**kwargs)
@@ -80,10 +260,8 @@ def chat_completion(
                 and "'max_tokens'" in msg
                 and "max_completion_tokens" in msg
                 and "max_tokens->max_completion_tokens" not in attempted_transforms
-                and "max_tokens" in kwargs
+                and _apply_transform(kwargs, "max_tokens->max_completion_tokens")
             ):
-                val = kwargs.pop("max_tokens")
-                kwargs["max_completion_tokens"] = val
                 attempted_transforms.append("max_tokens->max_completion_tokens")
                 continue
             # 2. Remove temperature if not allowed
@@ -91,9 +269,8 @@ def chat_completion(
                 ("Unsupported value" in msg or "Unsupported parameter" in msg)
                 and "temperature" in msg
                 and "drop-temperature" not in attempted_transforms
-                and "temperature" in kwargs
+                and _apply_transform(kwargs, "drop-temperature")
             ):
-                kwargs.pop("temperature", None)
                 attempted_transforms.append("drop-temperature")
                 continue
             # 3. Inverse: max_completion_tokens -> max_tokens
@@ -101,12 +278,19 @@ def chat_completion(
                 "Unsupported parameter" in msg
                 and "'max_completion_tokens'" in msg
                 and "max_completion_tokens->max_tokens" not in attempted_transforms
-                and "max_completion_tokens" in kwargs
+                and _apply_transform(kwargs, "max_completion_tokens->max_tokens")
             ):
-                val = kwargs.pop("max_completion_tokens")
-                kwargs["max_tokens"] = val
                 attempted_transforms.append("max_completion_tokens->max_tokens")
                 continue
+            # 4. Drop n if multiple choices are not supported
+            if (
+                "Unsupported parameter" in msg
+                and "'n'" in msg
+                and "drop-n" not in attempted_transforms
+                and _apply_transform(kwargs, "drop-n")
+            ):
+                attempted_transforms.append("drop-n")
+                continue
             # No recognized fallback left
             raise RuntimeError(
                 f"Chat completion request failed after transformations {attempted_transforms}: {e}"
@@ -115,7 +299,90 @@ def chat_completion(
         raise RuntimeError(
             f"Chat completion failed: exceeded adaptive retry attempts ({attempted_transforms})"
         )
+    if attempted_transforms != learned:
+        PROFILES.record(deployment, endpoint, attempted_transforms)
+    rec = TELEMETRY.current()
+    if rec is not None:
+        rec.transforms = list(attempted_transforms)
+    return completion
+
+
+def _record_usage(rec: RequestRecord, completion: Any) -> None:
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    rec.prompt_tokens = getattr(usage, "prompt_tokens", None)
+    rec.completion_tokens = getattr(usage, "completion_tokens", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    rec.cached_tokens = getattr(details, "cached_tokens", None) if details is not None else None
+
+
+def _read_stream(stream: Any, rec: RequestRecord, early_stop: bool) -> str:
+    """Collect streamed content; with ``early_stop`` close once the score fields are in."""
+    scanner = JsonFieldScanner()
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                _record_usage(rec, chunk)
+            for choice in getattr(chunk, "choices", None) or []:
+                delta = getattr(getattr(choice, "delta", None), "content", None)
+                if delta and scanner.feed(delta) and early_stop:
+                    # The final usage chunk never arrives; estimate what was generated
+                    rec.completion_tokens = estimate_tokens(scanner.text)
+                    return scanner.complete_json()
+        return scanner.text
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+
+def chat_completion(
+    deployment: str,
+    system: str,
+    user: str,
+    temperature: float = 0.0,
+    max_tokens: int = 1024,
+    response_format: Optional[Dict[str, Any]] = None,
+    endpoint: Optional[str] = None,
+    stream: bool = False,
+    early_stop: bool = False,
+    n: int = 1,
+) -> Union[str, List[str]]:
+    """Send a chat completion request using the OpenAI SDK (Azure OpenAI v1 endpoint).
+
+    Parameters are consistent with previous implementation for backward compatibility.
+    ``endpoint`` selects one of several resources serving the deployment (default:
+    ``AZURE_OPENAI_ENDPOINT``). Throttling and transient errors are not retried here;
+    wrap with :class:`~llm_eval.ratelimit.RateLimitedChat` for that. Latency, token
+    usage and transforms are recorded in :data:`~llm_eval.telemetry.TELEMETRY`.
+
+    With ``stream`` the response is read as it is generated; ``early_stop`` then closes
+    the stream as soon as ``score``/``adequacy``/``fluency`` are complete and returns
+    just those fields as a JSON object (use when no rationale is needed).
+
+    With ``n > 1`` several choices are requested at once and the list of their
+    contents is returned; it is shorter than ``n`` if the deployment rejected ``n``
+    (learned as the ``drop-n`` transform). Streaming is not used for ``n > 1``.
+    """
+    client = get_client() if endpoint is None else get_client(endpoint)
+    kwargs = build_request(
+        deployment, system, user, temperature, max_tokens, response_format, endpoint=endpoint, n=n
+    )
+    if stream and n == 1:
+        kwargs.update(stream=True, stream_options={"include_usage": True})
+    with TELEMETRY.request(deployment) as rec:
+        start = time.perf_counter()
+        try:
+            completion = create_completion(client, kwargs, endpoint)
+            if stream and n == 1:
+                return _read_stream(completion, rec, early_stop)
+        finally:
+            rec.latency += time.perf_counter() - start
+        _record_usage(rec, completion)
 
+    if n > 1:
+        return [choice.message.content or "" for choice in completion.choices]  # type: ignore[attr-defined]
     try:
         return completion.choices[0].message.content or ""  # type: ignore[attr-defined]
     except Exception:  # noqa: BLE001
@@ -0,0 +1,289 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import json
+import os
+import time
+
+from .aggregate import RunningAggregate
+from .azure_client import build_request, get_client
+from .data import Segment
+from .prompting import PromptTemplate, parse_score
+
+# Offline scoring through the Batch API: segments are written as batch input JSONL
+# (one chat completion request per line, built exactly like interactive requests,
+# including the learned per-deployment parameter shape), split into shards that fit
+# the provider's per-file limits, uploaded and submitted. The job manifest keeps the
+# file and batch ids so `status` and `collect` can run later from another process;
+# collected outputs go through parse_score into the usual per-segment results.
+
+BATCH_ENDPOINT = "/chat/completions"
+DEFAULT_MAX_REQUESTS = 50_000
+DEFAULT_MAX_BYTES = 190 * 1024 * 1024  # the limit is 200 MB per input file; leave headroom
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def custom_id(seg_id: Any) -> str:
+    """Batch ``custom_id`` for a segment id (JSON-encoded so int ids round-trip)."""
+    return json.dumps(seg_id)
+
+
+def segment_id(cid: str) -> Any:
+    try:
+        return json.loads(cid)
+    except ValueError:
+        return cid
+
+
+@dataclass
+class BatchShard:
+    index: int
+    path: str
+    num_requests: int
+    bytes: int
+    input_file_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    status: str = "pending"
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    request_counts: Dict[str, int] = field(default_factory=dict)
+    errors: Optional[List[str]] = None
+
+
+@dataclass
+class BatchJob:
+    """Manifest of one batch scoring job, saved as JSON next to its shard input files."""
+
+    path: str
+    deployment: str
+    template: str
+    gen_params: Dict[str, Any]
+    endpoint: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    shards: List[BatchShard] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return all(s.status in TERMINAL_STATUSES for s in self.shards)
+
+    def save(self) -> None:
+        data = {k: v for k, v in asdict(self).items() if k != "path"}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, **data}, f, indent=2)
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path: str) -> "BatchJob":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.pop("version", None)
+        shards = [BatchShard(**s) for s in data.pop("shards", [])]
+        return cls(path=path, shards=shards, **data)
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for s in self.shards:
+            counts[s.status] = counts.get(s.status, 0) + 1
+        return {
+            "job": self.path,
+            "deployment": self.deployment,
+            "num_requests": sum(s.num_requests for s in self.shards),
+            "num_shards": len(self.shards),
+            "statuses": counts,
+            "shards": [
+                {
+                    "index": s.index,
+                    "batch_id": s.batch_id,
+                    "status": s.status,
+                    "num_requests": s.num_requests,
+                    "request_counts": s.request_counts,
+                    **({"errors": s.errors} if s.errors else {}),
+                }
+                for s in self.shards
+            ],
+        }
+
+
+def request_line(
+    seg: Segment,
+    deployment: str,
+    template: PromptTemplate,
+    gen_params: Dict[str, Any],
+    endpoint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """One batch input line for ``seg``: the same messages and parameters as ``chat_completion``."""
+    prompt = template.build(seg.source, seg.hypothesis, seg.reference)
+    body = build_request(deployment, prompt["system"], prompt["user"], endpoint=endpoint, **gen_params)
+    return {"custom_id": custom_id(seg.id), "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def write_shards(
+    segments: Iterable[Segment],
+    job_path: str,
+    deployment: str,
+    template: Optional[PromptTemplate] = None,
+    gen_params: Optional[Dict[str, Any]] = None,
+    endpoint: Optional[str] = None,
+    max_requests: int = DEFAULT_MAX_REQUESTS,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> BatchJob:
+    """Write batch input shards ``<job_path>.NNNN.jsonl`` and the job manifest.
+
+    A new shard starts whenever the next line would exceed ``max_requests`` lines or
+    ``max_bytes`` bytes; segments are streamed, so only one line is held at a time.
+    """
+    template = template or PromptTemplate()
+    gen_params = dict(gen_params or {"temperature": 0.0, "max_tokens": 1024})
+    job = BatchJob(
+        path=job_path,
+        deployment=deployment,
+        template=template.name,
+        gen_params=gen_params,
+        endpoint=endpoint,
+    )
+    out = None
+    try:
+        for seg in segments:
+            request = request_line(seg, deployment, template, gen_params, endpoint)
+            line = (json.dumps(request) + "\n").encode("utf-8")
+            if len(line) > max_bytes:
+                raise ValueError(f"Request for segment {seg.id} alone exceeds max_bytes={max_bytes}")
+            shard = job.shards[-1] if job.shards else None
+            if shard is None or shard.num_requests >= max_requests or shard.bytes + len(line) > max_bytes:
+                if out is not None:
+                    out.close()
+                index = len(job.shards)
+                shard = BatchShard(index=index, path=f"{job_path}.{index:04d}.jsonl", num_requests=0, bytes=0)
+                job.shards.append(shard)
+                out = open(shard.path, "wb")
+            out.write(line)  # type: ignore[union-attr]
+            shard.num_requests += 1
+            shard.bytes += len(line)
+    finally:
+        if out is not None:
+            out.close()
+    job.save()
+    return job
+
+
+def submit(job: BatchJob, client: Any = None) -> BatchJob:
+    """Upload and create a batch for every shard not yet submitted (safe to re-run)."""
+    client = client or get_client(job.endpoint)
+    for shard in job.shards:
+        if shard.batch_id is not None:
+            continue
+        if shard.input_file_id is None:
+            with open(shard.path, "rb") as f:
+                uploaded = client.files.create(file=(os.path.basename(shard.path), f), purpose="batch")
+            shard.input_file_id = uploaded.id
+            job.save()
+        batch = client.batches.create(
+            input_file_id=shard.input_file_id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"job": os.path.basename(job.path), "shard": str(shard.index)},
+        )
+        shard.batch_id, shard.status = batch.id, batch.status
+        job.save()
+    return job
+
+
+def refresh(job: BatchJob, client: Any = None) -> BatchJob:
+    """Poll every unfinished submitted shard and record its status and output files."""
+    client = client or get_client(job.endpoint)
+    for shard in job.shards:
+        if shard.batch_id is None or shard.status in TERMINAL_STATUSES:
+            continue
+        batch = client.batches.retrieve(shard.batch_id)
+        shard.status = batch.status
+        shard.output_file_id = getattr(batch, "output_file_id", None)
+        shard.error_file_id = getattr(batch, "error_file_id", None)
+        counts = getattr(batch, "request_counts", None)
+        if counts is not None:
+            shard.request_counts = {k: getattr(counts, k, 0) for k in ("total", "completed", "failed")}
+        errors = getattr(getattr(batch, "errors", None), "data", None)
+        if errors:
+            shard.errors = [getattr(e, "message", None) or str(e) for e in errors]
+    job.save()
+    return job
+
+
+def wait(
+    job: BatchJob,
+    client: Any = None,
+    poll_interval: float = 60.0,
+    timeout: Optional[float] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> BatchJob:
+    """Refresh until every shard is in a terminal state; ``TimeoutError`` after ``timeout`` s."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        refresh(job, client)
+        if job.done:
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"Batch job {job.path} not finished after {timeout}s")
+        sleep(poll_interval)
+
+
+def _file_lines(client: Any, file_id: Optional[str]) -> Iterator[Dict[str, Any]]:
+    if not file_id:
+        return
+    content = client.files.content(file_id)
+    for line in content.text.splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+def _parse_output(deployment: str, line: Dict[str, Any]) -> Dict[str, Any]:
+    seg_id = segment_id(line.get("custom_id"))
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or body.get("error") or {}
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        return {"id": seg_id, "model": deployment, "error": message or f"HTTP {response.get('status_code')}"}
+    try:
+        content = body["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        content = ""
+    result = parse_score(content)
+    result.update({"id": seg_id, "model": deployment})
+    return result
+
+
+def iter_results(job: BatchJob, client: Any = None) -> Iterator[Dict[str, Any]]:
+    """Per-segment results of a finished job, in input order.
+
+    Requests that failed, or are missing from the output of an expired/failed batch,
+    yield an ``error`` record, so every input segment appears exactly once.
+    """
+    client = client or get_client(job.endpoint)
+    for shard in job.shards:
+        found: Dict[str, Dict[str, Any]] = {}
+        for file_id in (shard.output_file_id, shard.error_file_id):
+            for line in _file_lines(client, file_id):
+                found[line.get("custom_id")] = _parse_output(job.deployment, line)
+        with open(shard.path, "r", encoding="utf-8") as f:
+            for line in f:
+                cid = json.loads(line)["custom_id"]
+                yield found.pop(cid, None) or {
+                    "id": segment_id(cid),
+                    "model": job.deployment,
+                    "error": f"missing from output of batch {shard.batch_id} ({shard.status})",
+                }
+
+
+def collect(
+    job: BatchJob,
+    client: Any = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Aggregate a finished job like ``score``: ``{"model", ...aggregate, "batch": summary}``."""
+    agg = RunningAggregate()
+    for result in iter_results(job, client):
+        agg.add(result)
+        if on_result is not None:
+            on_result(result)
+    return {"model": job.deployment, **agg.to_dict(), "batch": job.summary()}
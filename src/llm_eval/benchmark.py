@@ -0,0 +1,162 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import azure_client
+from .data import Segment
+from .fake_server import FakeOpenAIServer, FakeServerConfig
+
+# End-to-end throughput benchmarks against the local fake endpoint: the real OpenAI
+# client, connection pool, rate limiter and retry path are exercised, only the
+# service itself is simulated.
+
+CASES = ("score", "score_multiple", "cli")
+
+_WORDS = "the a translation quality model source sentence output reference of to and in is".split()
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    segments: int
+    seconds: float
+    segments_per_sec: float
+    requests: int
+    peak_in_flight: int
+    cached_token_rate: Optional[float]
+    p50_ms: Optional[float]
+    p99_ms: Optional[float]
+    peak_memory_mb: Optional[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def synthetic_segments(n: int, seed: int = 0, words: int = 20) -> List[Segment]:
+    rng = random.Random(seed)
+
+    def sentence() -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+    return [Segment(id=i, source=sentence(), hypothesis=sentence(), reference=sentence()) for i in range(n)]
+
+
+@contextmanager
+def pointed_at(server: FakeOpenAIServer) -> Iterator[None]:
+    """Route the default client pool to ``server`` for the duration of the block."""
+    names = ("AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_API_KEY", "AZURE_OPENAI_ENDPOINTS", "AZURE_OPENAI_API_KEYS")
+    saved = {name: os.environ.get(name) for name in names}
+    os.environ.update({"AZURE_OPENAI_ENDPOINT": server.url, "AZURE_OPENAI_API_KEY": "fake"})
+    os.environ.pop("AZURE_OPENAI_ENDPOINTS", None)
+    os.environ.pop("AZURE_OPENAI_API_KEYS", None)
+    azure_client.configure_clients(azure_client.ClientConfig())
+    try:
+        yield
+    finally:
+        azure_client.configure_clients(azure_client.ClientConfig())
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def measure(
+    name: str, server: FakeOpenAIServer, num_segments: int, fn: Callable[[], Any], track_memory: bool = True
+) -> BenchmarkResult:
+    """Run ``fn`` once and summarize wall time, server-side latency and peak Python memory."""
+    server.reset_stats()
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        fn()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if track_memory else None
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+    latencies = np.asarray(server.stats.latencies) * 1000
+    p50, p99 = (np.percentile(latencies, [50, 99]) if len(latencies) else (None, None))
+    return BenchmarkResult(
+        name=name,
+        segments=num_segments,
+        seconds=seconds,
+        segments_per_sec=num_segments / seconds if seconds > 0 else float("inf"),
+        requests=server.stats.requests,
+        peak_in_flight=server.stats.peak_in_flight,
+        cached_token_rate=(
+            server.stats.cached_tokens / server.stats.prompt_tokens if server.stats.prompt_tokens else None
+        ),
+        p50_ms=None if p50 is None else float(p50),
+        p99_ms=None if p99 is None else float(p99),
+        peak_memory_mb=peak,
+    )
+
+
+def run_benchmarks(
+    num_segments: int = 200,
+    models: Sequence[str] = ("bench-a", "bench-b"),
+    concurrency: int = 8,
+    segments_per_request: int = 1,
+    config: Optional[FakeServerConfig] = None,
+    cases: Sequence[str] = CASES,
+    track_memory: bool = True,
+) -> List[BenchmarkResult]:
+    """Benchmark ``LLMScorer.score``, ``score_multiple`` and ``llm-eval score`` on a fake server."""
+    from typer.testing import CliRunner
+
+    from .cli import app
+    from .evaluator import LLMScorer, score_multiple
+
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {sorted(unknown)} (expected some of {CASES})")
+    segments = synthetic_segments(num_segments)
+    results: List[BenchmarkResult] = []
+    with FakeOpenAIServer(config) as server, pointed_at(server), tempfile.TemporaryDirectory() as tmp:
+        for case in cases:
+            if case == "score":
+                scorer = LLMScorer(deployment=models[0], cache=None)
+                fn: Callable[[], Any] = lambda: scorer.score(
+                    segments, concurrency=concurrency, segments_per_request=segments_per_request
+                )
+                n = num_segments
+            elif case == "score_multiple":
+                fn = lambda: score_multiple(
+                    segments,
+                    list(models),
+                    concurrency=concurrency,
+                    segments_per_request=segments_per_request,
+                    bootstrap_resamples=0,
+                )
+                n = num_segments * len(models)
+            else:
+                data = os.path.join(tmp, "bench.tsv")
+                with open(data, "w", encoding="utf-8") as f:
+                    for s in segments:
+                        f.write(f"{s.source}\t{s.reference}\t{s.hypothesis}\n")
+                args = [
+                    "score", "--data", data, "--models", ",".join(models), "--no-cache",
+                    "--concurrency", str(concurrency),
+                    "--segments-per-request", str(segments_per_request),
+                    "--output", os.path.join(tmp, "out.jsonl"), "--jsonl",
+                    "--profile-cache", os.path.join(tmp, "profiles.json"),
+                ]
+
+                def fn() -> None:
+                    res = CliRunner().invoke(app, args)
+                    if res.exit_code != 0:
+                        raise RuntimeError(f"llm-eval score failed: {res.output}") from res.exception
+
+                n = num_segments * len(models)
+            results.append(measure(case, server, n, fn, track_memory=track_memory))
+    return results
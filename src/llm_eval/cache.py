@@ -0,0 +1,137 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join("~", ".cache", "llm-eval", "judgments.sqlite3")
+
+
+def cache_key(
+    deployment: str,
+    template: Any,
+    params: Dict[str, Any],
+    source: str,
+    hypothesis: str,
+    reference: Optional[str],
+) -> str:
+    """Stable hash identifying one judgment request.
+
+    ``template`` is anything with ``name``, ``system`` and ``user_template`` attributes
+    (normally a :class:`~llm_eval.prompting.PromptTemplate`).
+    """
+    payload = {
+        "deployment": deployment,
+        "template": [template.name, template.system, template.user_template],
+        "params": params,
+        "triplet": [source, reference, hypothesis],
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class JudgmentCache:
+    """On-disk (sqlite) cache of raw judge responses.
+
+    Entries older than ``max_age_days`` are ignored and purged; when more than
+    ``max_entries`` rows are stored, the least recently used ones are evicted.
+    The cache is safe to share between scoring threads.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: Optional[int] = 1_000_000,
+        max_age_days: Optional[float] = None,
+    ):
+        self.path = os.path.expanduser(path)
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS judgments ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS judgments_accessed ON judgments(accessed)")
+        self._conn.commit()
+        self.evict()
+
+    def _min_created(self) -> Optional[float]:
+        if self.max_age_days is None:
+            return None
+        return time.time() - self.max_age_days * 86400.0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM judgments WHERE key = ?", (key,)
+            ).fetchone()
+            min_created = self._min_created()
+            if row is None or (min_created is not None and row[1] < min_created):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE judgments SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO judgments (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            # Amortize eviction instead of counting rows on every insert
+            if self.max_entries is not None and self._writes % 1000 == 0:
+                self._evict_locked()
+
+    def evict(self) -> int:
+        """Drop expired entries and trim to ``max_entries``; returns rows removed."""
+        with self._lock:
+            return self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        removed = 0
+        min_created = self._min_created()
+        if min_created is not None:
+            removed += self._conn.execute(
+                "DELETE FROM judgments WHERE created < ?", (min_created,)
+            ).rowcount
+        if self.max_entries is not None:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM judgments").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                removed += self._conn.execute(
+                    "DELETE FROM judgments WHERE key IN "
+                    "(SELECT key FROM judgments ORDER BY accessed ASC LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        self._conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else None,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._evict_locked()
+            self._conn.close()
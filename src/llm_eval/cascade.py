@@ -0,0 +1,171 @@
+from __future__ import annotations
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+import math
+
+import numpy as np
+
+from .aggregate import RunningAggregate
+from .cache import JudgmentCache
+from .data import Segment
+from .metrics.engine import METRICS, compute_metrics
+
+# Cascaded scoring: every segment is first judged by cheap tiers (sentence-level
+# lexical metrics and/or small deployments); only segments whose cheap score lands
+# in the uncertain band, whose cheap judges disagree, or that the cheap tier could
+# not score are sent to the expensive deployment. A random audit sample of the
+# settled segments is also judged by the expensive deployment, so agreement with
+# full scoring stays measurable.
+
+
+def _cheap_metric_scores(segments: Sequence[Segment], metric: str) -> List[Optional[float]]:
+    """Sentence-level metric on the judge's 0-100 "higher is better" scale (TER is inverted)."""
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r} (expected one of {METRICS})")
+    has_ref = [bool(s.reference) for s in segments]
+    res = compute_metrics(
+        [s.hypothesis for s in segments], [s.reference or "" for s in segments], metrics=(metric,)
+    )
+    values = res["sentence"][metric]
+    if metric == "TER":
+        values = 100.0 - np.minimum(values, 100.0)
+    return [float(v) if ok else None for v, ok in zip(values, has_ref)]
+
+
+def _pearson(a: np.ndarray, b: np.ndarray) -> Optional[float]:
+    if len(a) < 2 or np.std(a) == 0 or np.std(b) == 0:
+        return None
+    return float(np.corrcoef(a, b)[0, 1])
+
+
+def cascade_score(
+    segments: Sequence[Segment],
+    expensive: str,
+    cheap_deployments: Sequence[str] = (),
+    cheap_metric: Optional[str] = None,
+    band: Tuple[float, float] = (30.0, 70.0),
+    max_disagreement: Optional[float] = 15.0,
+    audit_rate: float = 0.0,
+    seed: Optional[int] = 0,
+    chat_fn: Optional[Callable[..., Any]] = None,
+    concurrency: Union[int, Mapping[str, int]] = 1,
+    max_workers: Optional[int] = None,
+    cache: Optional[JudgmentCache] = None,
+    segments_per_request: int = 1,
+    stream: bool = False,
+    rationale: bool = True,
+    samples: int = 1,
+    temperature: float = 0.0,
+) -> Dict[str, Any]:
+    """Score ``segments`` with cheap tiers first and ``expensive`` only where needed.
+
+    The cheap score of a segment is the mean over ``cheap_metric`` (if given) and
+    ``cheap_deployments``. It is escalated when that score lies within ``band``
+    (inclusive), when cheap judges differ by more than ``max_disagreement`` points, or
+    when any cheap judge failed. Each result records ``tier`` (``"cheap"`` or
+    ``"expensive"``), the tiers that produced its score (``judged_by``) and the
+    individual ``cheap_scores``; cheap-tier results carry no rationale or sub-scores,
+    since ``model`` names the expensive deployment. Audited segments also carry
+    ``audit_score`` from the expensive deployment. ``cache``, ``stream``,
+    ``rationale``, ``samples`` and ``temperature`` configure the
+    :class:`~llm_eval.evaluator.LLMScorer` of every deployment.
+
+    Returns ``{"segments", "aggregate", "cascade"}`` where ``cascade`` has tier
+    counts, the number of expensive calls and cheap/expensive agreement on the audit
+    sample.
+    """
+    from .evaluator import LLMScorer, default_chat_completion, score_multiple
+
+    if not cheap_deployments and cheap_metric is None:
+        raise ValueError("cascade needs a cheap metric and/or at least one cheap deployment")
+    chat_fn = chat_fn or default_chat_completion
+    scorer = partial(
+        LLMScorer, cache=cache, stream=stream, rationale=rationale, samples=samples, temperature=temperature
+    )
+    segments = list(segments)
+    n = len(segments)
+
+    def judge(segs: List[Segment], deployments: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        if not segs or not deployments:
+            return {dep: [] for dep in deployments}
+        out = score_multiple(
+            segs, deployments, max_workers=max_workers, chat_fn=chat_fn, concurrency=concurrency,
+            scorer=scorer, segments_per_request=segments_per_request, bootstrap_resamples=0,
+        )
+        return {
+            dep: block["segments"] or [{"id": s.id, "error": block["aggregate"].get("error")} for s in segs]
+            for dep, block in out["models"].items()
+        }
+
+    cheap: Dict[str, List[Optional[float]]] = {}
+    if cheap_metric is not None:
+        cheap[cheap_metric] = _cheap_metric_scores(segments, cheap_metric)
+    cheap_results = judge(segments, list(cheap_deployments))
+    for dep, results in cheap_results.items():
+        cheap[dep] = [
+            float(r["score"]) if isinstance(r.get("score"), (int, float)) and "error" not in r else None
+            for r in results
+        ]
+
+    low, high = band
+    escalate: List[int] = []
+    settled: List[int] = []
+    cheap_mean: List[Optional[float]] = []
+    for i in range(n):
+        scores = [cheap[name][i] for name in cheap]
+        if any(s is None for s in scores):
+            cheap_mean.append(None)
+            escalate.append(i)
+            continue
+        mean = math.fsum(scores) / len(scores)  # type: ignore[arg-type]
+        cheap_mean.append(mean)
+        spread = max(scores) - min(scores)  # type: ignore[type-var,operator]
+        if low <= mean <= high or (max_disagreement is not None and spread > max_disagreement):
+            escalate.append(i)
+        else:
+            settled.append(i)
+
+    rng = np.random.default_rng(seed)
+    audited = sorted(i for i in settled if rng.random() < audit_rate) if audit_rate > 0 else []
+    to_judge = sorted(escalate + audited)
+    expensive_results = dict(zip(to_judge, judge([segments[i] for i in to_judge], [expensive])[expensive]))
+
+    escalated = set(escalate)
+    agg = RunningAggregate()
+    results: List[Dict[str, Any]] = []
+    for i, seg in enumerate(segments):
+        cheap_scores = {name: cheap[name][i] for name in cheap}
+        if i in escalated:
+            res = dict(expensive_results[i], tier="expensive", judged_by=[expensive])
+        else:
+            # Only the combined cheap score: the cheap judges' rationale and sub-scores must
+            # not be attributed to the expensive deployment named in ``model``
+            res = {"id": seg.id, "score": cheap_mean[i], "tier": "cheap", "judged_by": list(cheap)}
+            if i in expensive_results:
+                res["audit_score"] = expensive_results[i].get("score")
+        res["model"] = expensive
+        res["cheap_scores"] = cheap_scores
+        agg.add(res)
+        results.append(res)
+
+    pairs = [
+        (cheap_mean[i], expensive_results[i].get("score"))
+        for i in audited
+        if isinstance(expensive_results[i].get("score"), (int, float))
+    ]
+    a = np.array([p[0] for p in pairs], dtype=np.float64)
+    b = np.array([p[1] for p in pairs], dtype=np.float64)
+    summary = {
+        "tiers": {"cheap": len(settled), "expensive": len(escalate)},
+        "escalation_rate": len(escalate) / n if n else 0.0,
+        "expensive_calls": len(to_judge),
+        "cheap_judges": list(cheap),
+        "band": [low, high],
+        "max_disagreement": max_disagreement,
+        "agreement": {
+            "num_audited": len(pairs),
+            "pearson": _pearson(a, b),
+            "mean_abs_diff": float(np.abs(a - b).mean()) if len(pairs) else None,
+        },
+    }
+    return {"segments": results, "aggregate": agg.to_dict(), "cascade": summary}
@@ -1,23 +1,83 @@
 from __future__ import annotations
 import typer
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
 import os
-from .data import read_tsv
+from functools import partial
+from .data import JsonlWriter, iter_segments
+from .aggregate import RunningAggregate
 from .evaluator import LLMScorer, score_multiple
-from .metrics.basic import corpus_bleu
+from .cache import DEFAULT_CACHE_PATH, JudgmentCache
+from .journal import RunJournal
+from .azure_client import (
+    DEFAULT_PROFILE_PATH,
+    PROFILES,
+    ClientConfig,
+    chat_completion,
+    configure_clients,
+    configured_endpoints,
+)
+from .ratelimit import RateLimitedChat, RetryPolicy
+from .telemetry import TELEMETRY
+from .sampling import sample_score
+from .cascade import cascade_score
+from .metrics.engine import METRICS, compute_metrics
+from .metrics.embedding import (
+    DEFAULT_EMBEDDING_CACHE,
+    EMBEDDING_METRICS,
+    AzureEmbeddingBackend,
+    EmbeddingCache,
+    SentenceTransformerBackend,
+    cache_dir_for,
+    embedding_similarity,
+)
+from .stats import compare as compare_models
+from .benchmark import CASES as BENCHMARK_CASES, run_benchmarks
+from .fake_server import FakeServerConfig
+from . import batch as batch_jobs
+from .results import RawSidecar, ResultColumns, save_npz
+from .shard import MetricTotals, merge_partials, parse_shard, select_shard, write_partial
 import json
 from pathlib import Path
 from dotenv import load_dotenv
 
 app = typer.Typer(help="LLM-Eval: LLM-based MT evaluation (COMET-style) using Azure OpenAI")
+batch_app = typer.Typer(help="Offline scoring through the Batch API (submit, status, collect)")
+app.add_typer(batch_app, name="batch")
 
 @app.callback()
 def _load_env():
     load_dotenv()
 
+
+def _per_deployment(spec: Optional[str], option: str) -> Dict[str, float]:
+    """Parse ``'600'`` or ``'gpt-4.1=600,o3=100'``; the bare form is keyed ``'*'``."""
+    out: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, sep, value = part.rpartition("=")
+        try:
+            out[name.strip() if sep else "*"] = float(value)
+        except ValueError:
+            typer.echo(f"Invalid {option} entry: {part!r}")
+            raise typer.Exit(code=1)
+    return out
+
+def _finish_telemetry(path: Optional[str], fmt: str) -> Dict[str, Any]:
+    if path:
+        if fmt == "prometheus":
+            TELEMETRY.write_prometheus(path)
+        else:
+            TELEMETRY.write_json(path)
+    return TELEMETRY.summary()
+
+
 @app.command()
 def score(
-    data: str = typer.Option(..., help="Path to TSV file"),
+    data: str = typer.Option(..., help="Path to TSV/CSV/JSONL file"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="Input format: tsv, csv or jsonl (default: from file extension)"
+    ),
     has_reference: bool = typer.Option(True, help="File includes reference column"),
     header: bool = typer.Option(False, help="First row is header"),
     output: Optional[str] = typer.Option(None, help="Write per-segment JSONL here"),
@@ -28,8 +88,132 @@ def score(
         help="Comma-separated list of deployments to score with (overrides --deployment).",
     ),
     no_parallel: bool = typer.Option(False, help="Disable parallel scoring across models"),
+    concurrency: int = typer.Option(1, min=1, help="Max in-flight requests per model"),
+    deployment_concurrency: Optional[str] = typer.Option(
+        None,
+        help="Per-deployment in-flight caps overriding --concurrency, e.g. 'gpt-4.1=8,o3=32'",
+    ),
+    max_in_flight: Optional[int] = typer.Option(
+        None, min=1, help="Global in-flight cap across all models (default: sum of caps)"
+    ),
+    segments_per_request: int = typer.Option(
+        1, min=1, help="Judge this many segments per chat completion (JSON array response)"
+    ),
+    cache_path: str = typer.Option(DEFAULT_CACHE_PATH, help="Judgment cache (sqlite) location"),
+    no_cache: bool = typer.Option(False, help="Always call the API; do not read or write the cache"),
+    cache_max_age_days: Optional[float] = typer.Option(
+        None, help="Ignore and evict cached judgments older than this"
+    ),
+    rpm: Optional[str] = typer.Option(
+        None, help="Requests/minute quota per deployment, e.g. '600' or 'gpt-4.1=600,o3=100'"
+    ),
+    tpm: Optional[str] = typer.Option(
+        None, help="Tokens/minute quota per deployment, e.g. '150000' or 'gpt-4.1=150000'"
+    ),
+    endpoints: Optional[str] = typer.Option(
+        None, help="Comma-separated endpoints serving the same deployments (default: AZURE_OPENAI_ENDPOINTS)"
+    ),
+    max_retries: int = typer.Option(6, min=0, help="Retries for 429/5xx/connection errors"),
+    profile_cache: str = typer.Option(
+        DEFAULT_PROFILE_PATH, help="Learned per-deployment request shapes (JSON); '' to disable"
+    ),
+    journal: Optional[str] = typer.Option(
+        None, help="Checkpoint journal path (default: <output>.journal.jsonl when --output is set)"
+    ),
+    resume: bool = typer.Option(
+        False, help="Reuse successful results from the journal; re-score only missing/errored segments"
+    ),
+    telemetry_output: Optional[str] = typer.Option(
+        None, help="Write request telemetry (latency, tokens, retries) to this file"
+    ),
+    telemetry_format: str = typer.Option("json", help="Telemetry file format: json or prometheus (textfile)"),
+    telemetry_requests: bool = typer.Option(
+        False, help="Include every request record in JSON telemetry (not just per-model totals)"
+    ),
+    target_ci: Optional[float] = typer.Option(
+        None, help="Sample random batches until each model's mean is known to +/- this many points"
+    ),
+    confidence: float = typer.Option(0.95, help="Confidence level for --target-ci"),
+    sample_batch_size: int = typer.Option(100, help="Segments per sampling round with --target-ci"),
+    sample_seed: int = typer.Option(0, help="Random seed for the --target-ci sampling order"),
+    cascade_cheap: Optional[str] = typer.Option(
+        None,
+        help="Cascade mode: cheap tiers tried first, comma-separated (a metric BLEU/chrF/TER and/or deployments)",
+    ),
+    cascade_band: str = typer.Option("30,70", help="Cheap scores within LOW,HIGH are escalated"),
+    cascade_disagreement: Optional[float] = typer.Option(
+        15.0, help="Escalate when cheap judges differ by more than this many points"
+    ),
+    cascade_audit: float = typer.Option(
+        0.0, help="Fraction of settled segments also judged by the expensive deployment to measure agreement"
+    ),
+    stream: bool = typer.Option(False, help="Stream responses and parse the JSON as it arrives"),
+    rationale: bool = typer.Option(
+        True, help="Ask for a free-text rationale; --no-rationale with --stream stops once the scores are in"
+    ),
+    shard: Optional[str] = typer.Option(
+        None, help="Score only shard i/N of the segments (by segment id hash; i is 0-based)"
+    ),
+    partial_output: Optional[str] = typer.Option(
+        None, help="Mergeable partial aggregate for `llm-eval merge` (default with --shard: <output>.partial.json)"
+    ),
+    raw_output: Optional[str] = typer.Option(
+        None, help="Write raw responses and rationales to this sidecar JSONL; results keep a raw_offset"
+    ),
+    columnar_output: Optional[str] = typer.Option(
+        None,
+        help="Keep results as compact columns and save them as .npz (JSONL records then omit raw text)",
+    ),
+    samples: int = typer.Option(
+        1, min=1, help="Judge each segment K times (n choices per request where supported); reports mean/median/variance"
+    ),
+    temperature: Optional[float] = typer.Option(
+        None, help="Sampling temperature (default: 0, or 1 with --samples > 1)"
+    ),
 ):
-    segments = read_tsv(data, has_reference=has_reference, header=header)
+    if telemetry_format not in ("json", "prometheus"):
+        typer.echo("--telemetry-format must be json or prometheus")
+        raise typer.Exit(code=1)
+    shard_spec = None
+    if shard is not None:
+        try:
+            shard_spec = parse_shard(shard)
+        except ValueError as e:
+            typer.echo(str(e))
+            raise typer.Exit(code=1)
+        if target_ci is not None or cascade_cheap:
+            typer.echo("--shard cannot be combined with --target-ci or --cascade-cheap")
+            raise typer.Exit(code=1)
+        partial_output = partial_output or (f"{output}.partial.json" if output else None)
+        if not partial_output:
+            typer.echo("--shard needs --output or --partial-output")
+            raise typer.Exit(code=1)
+    if (raw_output or columnar_output) and (target_ci is not None or cascade_cheap):
+        typer.echo("--raw-output/--columnar-output cannot be combined with --target-ci or --cascade-cheap")
+        raise typer.Exit(code=1)
+    if cascade_cheap and (journal or resume):
+        # cascade_score has no checkpointing; an auto-created journal would only wipe an existing one
+        typer.echo("--journal/--resume cannot be combined with --cascade-cheap")
+        raise typer.Exit(code=1)
+    if temperature is None:
+        temperature = 1.0 if samples > 1 else 0.0
+    TELEMETRY.reset(keep_records=telemetry_requests)
+    # The journal is implicit only for runs that stream results to a JSONL --output; without
+    # --jsonl the multi-model summary printed to stdout keeps every segment, as before
+    auto_journal = output and (jsonl or resume) and not cascade_cheap
+    journal_path = journal or (f"{output}.journal.jsonl" if auto_journal else None)
+    if resume and not journal_path:
+        typer.echo("--resume needs --journal or --output")
+        raise typer.Exit(code=1)
+    run_journal = RunJournal(journal_path) if journal_path else None
+    done = run_journal.completed() if run_journal is not None and resume else {}
+    segments = iter_segments(data, has_reference=has_reference, header=header, fmt=fmt)
+    if shard_spec is not None:
+        segments = select_shard(segments, *shard_spec)
+    metric_totals = MetricTotals() if partial_output and has_reference else None
+    if metric_totals is not None:
+        segments = metric_totals.observe(segments)
+    cache = None if no_cache else JudgmentCache(cache_path, max_age_days=cache_max_age_days)
     # Resolve model list
     resolved_models: Optional[list[str]] = None
     if models:
@@ -51,48 +235,529 @@ def score(
                 )
                 resolved_models = parts
 
+    if run_journal is not None:
+        run_journal.start(resume=resume)
+    writer = JsonlWriter(output) if jsonl and output else None
+    # Results replayed by --resume keep their raw_offset, so the sidecar must be appended to
+    sidecar = RawSidecar(raw_output, mode="ab" if resume else "wb") if raw_output else None
+
+    rpm_limits = _per_deployment(rpm, "--rpm")
+    tpm_limits = _per_deployment(tpm, "--tpm")
+    limits = None
+    if rpm_limits or tpm_limits:
+        names = set(rpm_limits) | set(tpm_limits)
+        limits = {
+            name: (rpm_limits.get(name, rpm_limits.get("*")), tpm_limits.get(name, tpm_limits.get("*")))
+            for name in names
+        }
+    endpoint_list = [e.strip() for e in endpoints.split(",") if e.strip()] if endpoints else configured_endpoints()
+    if profile_cache:
+        PROFILES.load(profile_cache)
+    dep_caps = {
+        name: int(cap)
+        for name, cap in _per_deployment(deployment_concurrency, "--deployment-concurrency").items()
+        if name != "*"
+    }
+    # Size each endpoint's connection pool to the requested parallelism so workers reuse connections
+    wanted = max_in_flight or sum(dep_caps.get(m, concurrency) for m in (resolved_models or [None]))
+    configure_clients(ClientConfig(max_connections=max(100, wanted), max_keepalive_connections=max(100, wanted)))
+    chat_fn = RateLimitedChat(
+        chat_completion,
+        limits=limits,
+        endpoints=endpoint_list or None,
+        retry=RetryPolicy(max_retries=max_retries),
+    )
+
+    if cascade_cheap:
+        if target_ci is not None or (resolved_models and len(resolved_models) > 1):
+            typer.echo("--cascade-cheap needs a single expensive deployment and no --target-ci")
+            raise typer.Exit(code=1)
+        tiers = [t.strip() for t in cascade_cheap.split(",") if t.strip()]
+        cheap_metrics = [t for t in tiers if t in METRICS]
+        try:
+            low, high = (float(v) for v in cascade_band.split(","))
+        except ValueError:
+            typer.echo("--cascade-band must be LOW,HIGH")
+            raise typer.Exit(code=1)
+        if len(cheap_metrics) > 1:
+            typer.echo("--cascade-cheap takes at most one metric")
+            raise typer.Exit(code=1)
+        expensive = resolved_models[0] if resolved_models else LLMScorer(deployment=deployment).deployment
+        cheap_deps = [t for t in tiers if t not in METRICS]
+        try:
+            cascaded = cascade_score(
+                list(segments),
+                expensive,
+                cheap_deployments=cheap_deps,
+                cheap_metric=cheap_metrics[0] if cheap_metrics else None,
+                band=(low, high),
+                max_disagreement=cascade_disagreement,
+                audit_rate=cascade_audit,
+                chat_fn=chat_fn,
+                concurrency={m: dep_caps.get(m, concurrency) for m in [expensive, *cheap_deps]},
+                max_workers=max_in_flight,
+                cache=cache,
+                segments_per_request=segments_per_request,
+                stream=stream,
+                rationale=rationale,
+                samples=samples,
+                temperature=temperature,
+            )
+            if writer is not None:
+                for seg in cascaded["segments"]:
+                    writer.write(seg)
+        finally:
+            if writer is not None:
+                writer.close()
+        summary = {"model": expensive, **cascaded["aggregate"], "cascade": cascaded["cascade"]}
+        if cache is not None:
+            summary["cache"] = cache.stats()
+            cache.close()
+        if profile_cache:
+            PROFILES.save(profile_cache)
+        summary["telemetry"] = _finish_telemetry(telemetry_output, telemetry_format)
+        typer.echo(json.dumps(summary, indent=2))
+        return
+
+    if target_ci is not None:
+        sample_models = resolved_models or [LLMScorer(deployment=deployment).deployment]
+        try:
+            sampled = sample_score(
+                list(segments),
+                sample_models,
+                target_ci,
+                confidence=confidence,
+                batch_size=sample_batch_size,
+                seed=sample_seed,
+                chat_fn=chat_fn,
+                concurrency={m: dep_caps.get(m, concurrency) for m in sample_models},
+                max_workers=max_in_flight,
+                cache=cache,
+                segments_per_request=segments_per_request,
+                done=done,
+                on_result=run_journal.append if run_journal is not None else None,
+                stream=stream,
+                rationale=rationale,
+                samples=samples,
+                temperature=temperature,
+            )
+            if writer is not None:
+                for model_results in sampled["segments"].values():
+                    for seg in model_results:
+                        writer.write(seg)
+        finally:
+            if writer is not None:
+                writer.close()
+            if run_journal is not None:
+                run_journal.close()
+        summary = {k: v for k, v in sampled.items() if k != "segments"}
+        if cache is not None:
+            summary["cache"] = cache.stats()
+            cache.close()
+        if profile_cache:
+            PROFILES.save(profile_cache)
+        summary["telemetry"] = _finish_telemetry(telemetry_output, telemetry_format)
+        typer.echo(json.dumps(summary, indent=2))
+        return
+
     if resolved_models and len(resolved_models) > 1:
-        multi = score_multiple(
-            segments,
-            deployments=resolved_models,
-            parallel=not no_parallel,
-        )
-        # Optionally write JSONL (includes model per segment)
-        if jsonl and output:
-            with open(output, "w", encoding="utf-8") as f:
+        caps = {m: dep_caps.get(m, concurrency) for m in resolved_models}
+        model_aggs = {m: RunningAggregate() for m in resolved_models}
+        seg_list = list(segments)
+        on_result = None
+        if run_journal is not None:
+            # Checkpoint mode: stream results to journal/output instead of holding them
+            def on_result(seg: dict) -> None:
+                run_journal.append(seg)
+                if writer is not None:
+                    writer.write(seg)
+
+            if writer is not None:
+                for model_name in resolved_models:
+                    model_done = done.get(model_name, {})
+                    for s in seg_list:
+                        if s.id in model_done:
+                            writer.write(model_done[s.id])
+        try:
+            multi = score_multiple(
+                seg_list,
+                deployments=resolved_models,
+                parallel=not no_parallel,
+                max_workers=max_in_flight,
+                chat_fn=chat_fn,
+                concurrency=caps,
+                scorer=partial(
+                    LLMScorer, cache=cache, stream=stream, rationale=rationale, samples=samples,
+                    temperature=temperature,
+                ),
+                segments_per_request=segments_per_request,
+                done=done,
+                on_result=on_result,
+                keep_segments=run_journal is None,
+                progress=None,
+                aggregates=model_aggs,
+                compact=bool(columnar_output),
+                sidecar=sidecar,
+            )
+            # Optionally write JSONL (includes model per segment)
+            if writer is not None and run_journal is None:
                 for model_name, model_block in multi["models"].items():
                     for seg in model_block["segments"]:
-                        f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+                        writer.write(seg)
+        finally:
+            if writer is not None:
+                writer.close()
+            if run_journal is not None:
+                run_journal.close()
+            if sidecar is not None:
+                sidecar.close()
+        if columnar_output:
+            save_npz(
+                columnar_output,
+                {m: block["segments"] for m, block in multi["models"].items() if block["segments"]},
+            )
+            for block in multi["models"].values():
+                block["segments"] = list(block["segments"]) if run_journal is None else []
+        if partial_output:
+            write_partial(partial_output, shard_spec or (0, 1), model_aggs, metric_totals)
+        if shard:
+            multi["summary"]["shard"] = shard
+        if cache is not None:
+            multi["summary"]["cache"] = cache.stats()
+            cache.close()
+        if profile_cache:
+            PROFILES.save(profile_cache)
+        multi["summary"]["telemetry"] = _finish_telemetry(telemetry_output, telemetry_format)
         typer.echo(json.dumps(multi, indent=2))
         return
 
     # Single model path (legacy behavior)
     single_deployment = resolved_models[0] if resolved_models else deployment
-    scorer = LLMScorer(deployment=single_deployment)
-    result = scorer.score(segments)
-    # Add model field to each segment for consistency
-    for seg in result["segments"]:
-        seg["model"] = scorer.deployment
-    if jsonl and output:
-        with open(output, "w", encoding="utf-8") as f:
-            for seg in result["segments"]:
-                f.write(json.dumps(seg, ensure_ascii=False) + "\n")
-    typer.echo(json.dumps({"model": scorer.deployment, **result["aggregate"]}, indent=2))
+    scorer = LLMScorer(
+        deployment=single_deployment,
+        cache=cache,
+        temperature=temperature,
+        stream=stream,
+        rationale=rationale,
+        samples=samples,
+    )
+    model_done = done.get(scorer.deployment, {})
+    # Stream: each finished segment is written immediately, only the aggregate is kept
+    agg = RunningAggregate()
+    columns = ResultColumns(scorer.deployment) if columnar_output else None
+    try:
+        for seg in scorer.iter_score(
+            segments,
+            concurrency=concurrency,
+            _chat_fn=chat_fn,
+            segments_per_request=segments_per_request,
+            record_errors=run_journal is not None,
+            done=model_done,
+        ):
+            # Add model field to each segment for consistency
+            seg["model"] = scorer.deployment
+            if sidecar is not None:
+                seg = sidecar.slim(seg)
+            agg.add(seg)
+            if columns is not None:
+                columns.append(seg)
+                seg = columns.record(len(columns) - 1)
+            if run_journal is not None and seg["id"] not in model_done:
+                run_journal.append(seg)
+            if writer is not None:
+                writer.write(seg)
+    finally:
+        if writer is not None:
+            writer.close()
+        if run_journal is not None:
+            run_journal.close()
+        if sidecar is not None:
+            sidecar.close()
+    if columns is not None:
+        save_npz(columnar_output, {scorer.deployment: columns})
+    summary = {"model": scorer.deployment, **agg.to_dict()}
+    if partial_output:
+        write_partial(partial_output, shard_spec or (0, 1), {scorer.deployment: agg}, metric_totals)
+    if shard:
+        summary["shard"] = shard
+    if cache is not None:
+        summary["cache"] = cache.stats()
+        cache.close()
+    if profile_cache:
+        PROFILES.save(profile_cache)
+    summary["telemetry"] = _finish_telemetry(telemetry_output, telemetry_format)
+    typer.echo(json.dumps(summary, indent=2))
 
 @app.command()
 def metrics(
-    data: str = typer.Option(..., help="Path to TSV file"),
+    data: str = typer.Option(..., help="Path to TSV/CSV/JSONL file"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="Input format: tsv, csv or jsonl (default: from file extension)"
+    ),
     has_reference: bool = typer.Option(True, help="File includes reference column"),
     header: bool = typer.Option(False, help="First row is header"),
+    metric_names: str = typer.Option(
+        ",".join(METRICS), "--metrics",
+        help="Comma-separated subset of BLEU,chrF,TER and the embedding similarities EMB (to reference), EMB-src",
+    ),
+    sentence_output: Optional[str] = typer.Option(
+        None, help="Write sentence-level scores as JSONL (one line per segment id)"
+    ),
+    chunk_size: int = typer.Option(10000, min=1, help="Segments per statistics chunk"),
+    processes: int = typer.Option(1, min=1, help="Worker processes for statistics chunks"),
+    embedding_backend: str = typer.Option("azure", help="Embedding backend for EMB: azure or sentence-transformers"),
+    embedding_deployment: str = typer.Option(
+        os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-3-small"),
+        help="Azure embeddings deployment (default: AZURE_OPENAI_EMBEDDING_DEPLOYMENT)",
+    ),
+    embedding_model: str = typer.Option(
+        "sentence-transformers/LaBSE", help="Model for --embedding-backend sentence-transformers"
+    ),
+    embedding_cache: str = typer.Option(
+        DEFAULT_EMBEDDING_CACHE, help="Embedding cache directory ('' keeps embeddings in memory only)"
+    ),
+    embedding_batch_size: int = typer.Option(512, min=1, help="Texts per embedding request"),
+    embedding_tpm: Optional[float] = typer.Option(None, help="Tokens/minute quota of the embeddings deployment"),
+    max_retries: int = typer.Option(6, min=0, help="Retries for 429/5xx/connection errors"),
+):
+    selected = tuple(m.strip() for m in metric_names.split(",") if m.strip())
+    lexical = tuple(m for m in selected if m not in EMBEDDING_METRICS)
+    embedded = tuple(m for m in selected if m in EMBEDDING_METRICS)
+    if not has_reference and (lexical or "EMB" in embedded):
+        typer.echo("Need references for BLEU/chrF/TER/EMB")
+        raise typer.Exit(code=1)
+    ids, srcs, hyps, refs = [], [], [], []
+    for seg in iter_segments(data, has_reference=has_reference, header=header, fmt=fmt):
+        ids.append(seg.id)
+        srcs.append(seg.source)
+        hyps.append(seg.hypothesis)
+        refs.append(seg.reference or "")
+    result: Dict[str, Any] = {"corpus": {}, "sentence": {}}
+    try:
+        if lexical:
+            result = compute_metrics(hyps, refs, metrics=lexical, chunk_size=chunk_size, processes=processes)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(code=1)
+    if embedded:
+        if embedding_backend == "azure":
+            backend: Any = AzureEmbeddingBackend(
+                embedding_deployment, retry=RetryPolicy(max_retries=max_retries), tpm=embedding_tpm
+            )
+        elif embedding_backend == "sentence-transformers":
+            try:
+                backend = SentenceTransformerBackend(embedding_model)
+            except ImportError as e:
+                typer.echo(str(e))
+                raise typer.Exit(code=1)
+        else:
+            typer.echo(f"Unknown embedding backend: {embedding_backend}")
+            raise typer.Exit(code=1)
+        cache = EmbeddingCache(cache_dir_for(embedding_cache, backend)) if embedding_cache else None
+        emb = embedding_similarity(
+            hyps,
+            references=refs if "EMB" in embedded else None,
+            sources=srcs if "EMB-src" in embedded else None,
+            backend=backend,
+            cache=cache,
+            batch_size=embedding_batch_size,
+        )
+        result["corpus"].update(emb["corpus"])
+        result["sentence"].update(emb["sentence"])
+        typer.echo(
+            f"[embeddings] {emb['embedding']['texts']} distinct texts: "
+            f"{emb['embedding']['embedded']} embedded, {emb['embedding']['cached']} cached",
+            err=True,
+        )
+    if sentence_output:
+        sentence = result["sentence"]
+        with JsonlWriter(sentence_output) as writer:
+            for i, seg_id in enumerate(ids):
+                row = {m: float(v[i]) for m, v in sentence.items()}
+                writer.write({"id": seg_id, **{m: (None if v != v else v) for m, v in row.items()}})
+    typer.echo(json.dumps(result["corpus"], indent=2))
+
+def _iter_records(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+@app.command()
+def compare(
+    results: List[str] = typer.Option(..., help="Scored JSONL file(s) from `score --jsonl` (repeatable)"),
+    resamples: int = typer.Option(1000, min=1, help="Paired bootstrap resamples"),
+    confidence: float = typer.Option(0.95, help="Confidence level for intervals"),
+    seed: int = typer.Option(0, help="Random seed for resampling"),
+    system_key: str = typer.Option("model", help="Record field naming the compared system"),
+    rater_key: Optional[str] = typer.Option(
+        None, help="Record field naming the rater for z-normalization (default: all scores together)"
+    ),
+):
+    """Confidence intervals, z-normalized means and paired significance from existing outputs."""
+    summary = compare_models(
+        _iter_records(results),
+        n_resamples=resamples,
+        confidence=confidence,
+        seed=seed,
+        system_key=system_key,
+        rater_key=rater_key,
+    )
+    typer.echo(json.dumps(summary, indent=2))
+
+
+@app.command()
+def merge(
+    partials: List[str] = typer.Argument(..., help="Partial aggregates written by `score --shard`"),
+    output: Optional[str] = typer.Option(None, help="Also write the merged summary (JSON) here"),
+    allow_missing: bool = typer.Option(False, help="Merge even if some shards are missing"),
 ):
-    if not has_reference:
-        typer.echo("Need references for BLEU")
+    """Combine shard partial aggregates into the numbers of a single-process run."""
+    loaded = []
+    for path in partials:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                loaded.append(json.load(f))
+        except (OSError, ValueError) as e:
+            typer.echo(f"Cannot read partial {path}: {e}")
+            raise typer.Exit(code=1)
+    try:
+        merged = merge_partials(loaded, allow_missing=allow_missing)
+    except ValueError as e:
+        typer.echo(str(e))
         raise typer.Exit(code=1)
-    segments = read_tsv(data, has_reference=True, header=header)
-    refs = [[*s.reference.split()] for s in segments if s.reference]  # type: ignore[arg-type]
-    hyps = [[*s.hypothesis.split()] for s in segments]
-    bleu = corpus_bleu(refs, hyps)
-    typer.echo(json.dumps({"BLEU": bleu}, indent=2))
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(merged, f, indent=2)
+    typer.echo(json.dumps(merged, indent=2))
+
+
+@app.command()
+def benchmark(
+    segments: int = typer.Option(200, help="Synthetic segments per case"),
+    models: str = typer.Option("bench-a,bench-b", help="Comma-separated fake deployment names"),
+    concurrency: int = typer.Option(8, help="Requests in flight per model"),
+    segments_per_request: int = typer.Option(1, help="Segments packed into each request"),
+    cases: str = typer.Option(",".join(BENCHMARK_CASES), help="Comma-separated subset of score,score_multiple,cli"),
+    latency: str = typer.Option("constant", help="Latency distribution: constant, uniform or lognormal"),
+    latency_ms: float = typer.Option(20.0, help="Mean (median for lognormal) service latency in ms"),
+    latency_spread: float = typer.Option(0.5, help="Uniform +/- fraction, or lognormal sigma"),
+    rate_429: float = typer.Option(0.0, help="Fraction of requests answered with 429"),
+    rate_5xx: float = typer.Option(0.0, help="Fraction of requests answered with 503"),
+    reject: Optional[str] = typer.Option(None, help="Comma-separated parameters to reject (max_tokens,temperature)"),
+    track_memory: bool = typer.Option(True, help="Track peak Python memory (tracemalloc adds overhead)"),
+):
+    """Throughput benchmark against a local fake OpenAI-compatible endpoint."""
+    config = FakeServerConfig(
+        latency=latency,
+        latency_ms=latency_ms,
+        latency_spread=latency_spread,
+        rate_429=rate_429,
+        rate_5xx=rate_5xx,
+        reject_params=tuple(p.strip() for p in (reject or "").split(",") if p.strip()),
+    )
+    results = run_benchmarks(
+        num_segments=segments,
+        models=[m.strip() for m in models.split(",") if m.strip()],
+        concurrency=concurrency,
+        segments_per_request=segments_per_request,
+        config=config,
+        cases=[c.strip() for c in cases.split(",") if c.strip()],
+        track_memory=track_memory,
+    )
+    typer.echo(json.dumps([r.to_dict() for r in results], indent=2))
+
+
+def _load_job(job: str) -> batch_jobs.BatchJob:
+    try:
+        return batch_jobs.BatchJob.load(job)
+    except (OSError, ValueError) as e:
+        typer.echo(f"Cannot read batch job {job}: {e}")
+        raise typer.Exit(code=1)
+
+
+@batch_app.command("submit")
+def batch_submit(
+    data: str = typer.Option(..., help="Path to TSV/CSV/JSONL file"),
+    job: str = typer.Option(..., help="Job manifest path; shard inputs are written next to it"),
+    fmt: Optional[str] = typer.Option(
+        None, "--format", help="Input format: tsv, csv or jsonl (default: from file extension)"
+    ),
+    has_reference: bool = typer.Option(True, help="File includes reference column"),
+    header: bool = typer.Option(False, help="First row is header"),
+    deployment: Optional[str] = typer.Option(None, help="Batch deployment/model name"),
+    rationale: bool = typer.Option(True, help="Ask for a free-text rationale"),
+    max_requests: int = typer.Option(
+        batch_jobs.DEFAULT_MAX_REQUESTS, min=1, help="Maximum requests per batch input file"
+    ),
+    max_bytes: int = typer.Option(batch_jobs.DEFAULT_MAX_BYTES, min=1, help="Maximum bytes per batch input file"),
+    profile_cache: str = typer.Option(
+        DEFAULT_PROFILE_PATH, help="Learned per-deployment request shapes (JSON); '' to disable"
+    ),
+    dry_run: bool = typer.Option(False, help="Only write the shard input files and manifest"),
+):
+    """Write batch input shards for DATA and submit one batch per shard."""
+    if profile_cache:
+        PROFILES.load(profile_cache)
+    scorer = LLMScorer(deployment=deployment, rationale=rationale)
+    segments = iter_segments(data, has_reference=has_reference, header=header, fmt=fmt)
+    try:
+        batch_job = batch_jobs.write_shards(
+            segments,
+            job,
+            scorer.deployment,
+            template=scorer.template,
+            gen_params=scorer.gen_params,
+            max_requests=max_requests,
+            max_bytes=max_bytes,
+        )
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(code=1)
+    if not dry_run:
+        batch_jobs.submit(batch_job)
+    typer.echo(json.dumps(batch_job.summary(), indent=2))
+
+
+@batch_app.command("status")
+def batch_status(job: str = typer.Option(..., help="Job manifest written by `batch submit`")):
+    """Poll the batches of a job and print their status."""
+    batch_job = batch_jobs.refresh(_load_job(job))
+    typer.echo(json.dumps(batch_job.summary(), indent=2))
+
+
+@batch_app.command("collect")
+def batch_collect(
+    job: str = typer.Option(..., help="Job manifest written by `batch submit`"),
+    output: Optional[str] = typer.Option(None, help="Write per-segment JSONL here"),
+    wait: bool = typer.Option(False, help="Poll until every batch has finished"),
+    poll_interval: float = typer.Option(60.0, help="Seconds between status polls with --wait"),
+    timeout: Optional[float] = typer.Option(None, help="Give up waiting after this many seconds"),
+):
+    """Download finished batch outputs, parse them and print the aggregate."""
+    batch_job = _load_job(job)
+    try:
+        if wait:
+            batch_jobs.wait(batch_job, poll_interval=poll_interval, timeout=timeout)
+        else:
+            batch_jobs.refresh(batch_job)
+    except TimeoutError as e:
+        typer.echo(str(e))
+        raise typer.Exit(code=1)
+    if not batch_job.done:
+        typer.echo(json.dumps(batch_job.summary(), indent=2))
+        typer.echo("Batches still running; re-run later or pass --wait")
+        raise typer.Exit(code=1)
+    writer = JsonlWriter(output) if output else None
+    try:
+        summary = batch_jobs.collect(batch_job, on_result=writer.write if writer is not None else None)
+    finally:
+        if writer is not None:
+            writer.close()
+    typer.echo(json.dumps(summary, indent=2))
+
 
 if __name__ == "__main__":  # pragma: no cover
     app()
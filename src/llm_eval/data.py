@@ -1,20 +1,26 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Optional, Iterable, Tuple
+from typing import Any, Dict, List, Optional, Iterable, Iterator, TextIO, Union
+from itertools import islice
 import csv
+import json
+import os
+import threading
 
 @dataclass
 class Segment:
-    id: int
+    id: Union[int, str]
     source: str
     hypothesis: str
     reference: Optional[str] = None
 
 
-def read_tsv(path: str, has_reference: bool = True, header: bool = False) -> List[Segment]:
-    segments: List[Segment] = []
-    with open(path, "r", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter="\t")
+def iter_tsv(
+    path: str, has_reference: bool = True, header: bool = False, delimiter: str = "\t"
+) -> Iterator[Segment]:
+    """Lazily yield segments from a delimited file (one row in memory at a time)."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter=delimiter)
         idx = 0
         for row in reader:
             if idx == 0 and header:
@@ -29,11 +35,82 @@ def read_tsv(path: str, has_reference: bool = True, header: bool = False) -> Lis
                     raise ValueError("Expected at least 2 columns: source, hypothesis")
                 source, hypothesis = row[0], row[1]
                 reference = None
-            segments.append(Segment(id=idx, source=source, reference=reference, hypothesis=hypothesis))
+            yield Segment(id=idx, source=source, reference=reference, hypothesis=hypothesis)
             idx += 1
-    return segments
 
 
-def iter_batches(items: List[Segment], batch_size: int) -> Iterable[List[Segment]]:
-    for i in range(0, len(items), batch_size):
-        yield items[i : i + batch_size]
+def read_tsv(path: str, has_reference: bool = True, header: bool = False) -> List[Segment]:
+    return list(iter_tsv(path, has_reference=has_reference, header=header))
+
+
+def iter_csv(path: str, has_reference: bool = True, header: bool = False) -> Iterator[Segment]:
+    return iter_tsv(path, has_reference=has_reference, header=header, delimiter=",")
+
+
+def iter_jsonl(path: str, has_reference: bool = True) -> Iterator[Segment]:
+    """Yield segments from JSONL objects with ``source``, ``hypothesis`` and optional
+    ``reference``/``id`` fields. Ids are kept exactly as given (``"007"`` stays a
+    string) and default to the (0-based) line number."""
+    with open(path, "r", encoding="utf-8") as f:
+        for idx, line in enumerate(f):
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if "source" not in obj or "hypothesis" not in obj:
+                raise ValueError(f"Line {idx + 1}: expected 'source' and 'hypothesis' fields")
+            reference = obj.get("reference") if has_reference else None
+            if has_reference and reference is None:
+                raise ValueError(f"Line {idx + 1}: expected a 'reference' field")
+            yield Segment(
+                id=obj.get("id", idx),
+                source=obj["source"],
+                hypothesis=obj["hypothesis"],
+                reference=reference,
+            )
+
+
+def iter_segments(
+    path: str, has_reference: bool = True, header: bool = False, fmt: Optional[str] = None
+) -> Iterator[Segment]:
+    """Stream segments from TSV, CSV or JSONL; ``fmt`` defaults to the file extension."""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl"}.get(ext, "tsv")
+    if fmt == "tsv":
+        return iter_tsv(path, has_reference=has_reference, header=header)
+    if fmt == "csv":
+        return iter_csv(path, has_reference=has_reference, header=header)
+    if fmt == "jsonl":
+        return iter_jsonl(path, has_reference=has_reference)
+    raise ValueError(f"Unsupported input format: {fmt!r} (expected tsv, csv or jsonl)")
+
+
+def iter_batches(items: Iterable[Segment], batch_size: int) -> Iterable[List[Segment]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class JsonlWriter:
+    """Thread-safe, line-buffered JSONL writer so each finished record hits disk at once."""
+
+    def __init__(self, path: str, mode: str = "w"):
+        self._f: TextIO = open(path, mode, encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -1,14 +1,138 @@
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
-from .data import Segment
-from .prompting import PromptTemplate, parse_score
-from .azure_client import chat_completion as default_chat_completion
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar, Union
+from .data import Segment, iter_batches
+from .prompting import PromptTemplate, parse_batch_scores, parse_samples, parse_score
+from .azure_client import chat_completion
+from .ratelimit import RateLimitedChat
+from .aggregate import RunningAggregate
+from .cache import JudgmentCache, cache_key
+from .results import RawSidecar, ResultColumns
+from .scheduler import WorkScheduler
+from .stats import compare
+from .telemetry import TELEMETRY
+from tqdm import tqdm
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from collections import OrderedDict, deque
+from functools import partial
+import json
 import os
-import statistics
+import threading
+
+# Retries throttling / transient errors with backoff; paces nothing unless limits are set
+default_chat_completion = RateLimitedChat(chat_completion)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _ordered_map(fn: Callable[[T], R], items: Iterable[T], concurrency: int = 1) -> Iterator[R]:
+    """Apply ``fn`` to ``items`` with at most ``concurrency`` calls in flight.
+
+    Results are yielded in input order. Finished results waiting behind a slow head
+    item are buffered (up to ``4 * concurrency`` outstanding), so one slow request does
+    not idle the remaining workers. With ``concurrency <= 1`` this is a plain
+    sequential loop and no threads are started.
+    """
+    if concurrency <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    window = 4 * concurrency
+    it = iter(items)
+    outstanding: Deque[Future] = deque()
+    running: set = set()
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        while True:
+            while not exhausted and len(running) < concurrency and len(outstanding) < window:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    exhausted = True
+                    break
+                fut = ex.submit(fn, item)
+                outstanding.append(fut)
+                running.add(fut)
+            if not outstanding:
+                return
+            while outstanding and outstanding[0].done():
+                running.discard(outstanding[0])
+                yield outstanding.popleft().result()
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                running.difference_update(done)
+
+
+def _recording_errors(fn: Callable[[Segment], Dict[str, Any]]) -> Callable[[Segment], Dict[str, Any]]:
+    def _wrapped(seg: Segment) -> Dict[str, Any]:
+        try:
+            return fn(seg)
+        except Exception as seg_err:  # noqa: BLE001
+            return {"id": seg.id, "error": str(seg_err)}
+
+    return _wrapped
+
+
+class _Pending:
+    def __init__(self) -> None:
+        self.ready = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+    def get(self, seg_id: Any) -> Dict[str, Any]:
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+        return {**self.result, "id": seg_id}  # type: ignore[dict-item]
+
+
+class _TripletMemo:
+    """Judgments of (source, hypothesis, reference) triplets scored or in flight in one run.
+
+    The first segment with a triplet claims it and is judged; later copies wait for
+    and reuse that result under their own id. Only the most recent ``max_entries``
+    triplets are remembered, so memory stays bounded on streamed input.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, Optional[str]], _Pending]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, seg: Segment) -> Tuple[_Pending, bool]:
+        """``(pending, owner)``: the owner must :meth:`publish`; others call ``pending.get``."""
+        key = (seg.source, seg.hypothesis, seg.reference)
+        with self._lock:
+            pending = self._entries.get(key)
+            if pending is not None:
+                self._entries.move_to_end(key)
+                return pending, False
+            pending = self._entries[key] = _Pending()
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return pending, True
+
+    @staticmethod
+    def publish(
+        pending: _Pending, result: Optional[Dict[str, Any]] = None, error: Optional[BaseException] = None
+    ) -> None:
+        pending.result, pending.error = result, error
+        pending.ready.set()
+
 
 class LLMScorer:
-    def __init__(self, deployment: Optional[str] = None, template: Optional[PromptTemplate] = None):
+    def __init__(
+        self,
+        deployment: Optional[str] = None,
+        template: Optional[PromptTemplate] = None,
+        cache: Optional[JudgmentCache] = None,
+        temperature: float = 0.0,
+        max_tokens: int = 1024,
+        dedup: bool = True,
+        stream: bool = False,
+        rationale: bool = True,
+        samples: int = 1,
+    ):
         raw_dep = deployment or os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt4o")
         # Strip accidental surrounding quotes
         raw_dep = raw_dep.strip().strip("'").strip('"')
@@ -22,24 +146,238 @@ class LLMScorer:
                 self.deployment = raw_dep
         else:
             self.deployment = raw_dep
-        self.template = template or PromptTemplate()
+        self.template = template or (PromptTemplate() if rationale else PromptTemplate.score_only())
+        self.cache = cache
+        self.gen_params: Dict[str, Any] = {"temperature": temperature, "max_tokens": max_tokens}
+        # Judge identical (source, hypothesis, reference) triplets once per run
+        self.dedup = dedup
+        # Transport options: passed to the chat function but not part of cache keys.
+        # Without a rationale the stream is closed once the score fields are parsed.
+        self.stream_params: Dict[str, Any] = {"stream": True, "early_stop": not rationale} if stream else {}
+        # Self-consistency: judge each segment this many times and report mean/median/variance
+        self.samples = samples
+
+    def _sample(self, prompt: Dict[str, str], _chat_fn: Callable[..., Any]) -> List[str]:
+        """``self.samples`` responses: one request with ``n`` choices, topped up with
+        single requests if the chat function returned fewer.
+
+        Top-up requests run one after another in the calling worker, so a segment never
+        holds more than one request in flight and the per-deployment concurrency cap
+        still bounds the total.
+        """
+        request = {"deployment": self.deployment, "system": prompt["system"], "user": prompt["user"]}
+        raw = _chat_fn(**request, **self.gen_params, n=self.samples)
+        raws = list(raw) if isinstance(raw, list) else [raw]
+        while len(raws) < self.samples:
+            raws.append(_chat_fn(**request, **self.gen_params))
+        return raws[: self.samples]
 
     def score_segment(self, seg: Segment, _chat_fn=default_chat_completion) -> Dict[str, Any]:
+        key = None
+        params = self.gen_params if self.samples == 1 else {**self.gen_params, "samples": self.samples}
+        if self.cache is not None:
+            key = cache_key(self.deployment, self.template, params, seg.source, seg.hypothesis, seg.reference)
+            cached = self.cache.get(key)
+            if cached is not None:
+                parsed = parse_score(cached) if self.samples == 1 else parse_samples(json.loads(cached))
+                parsed.update({"id": seg.id})
+                return parsed
         prompt = self.template.build(seg.source, seg.hypothesis, seg.reference)
-        raw = _chat_fn(deployment=self.deployment, system=prompt["system"], user=prompt["user"])
+        if self.samples > 1:
+            raws = self._sample(prompt, _chat_fn)
+            parsed = parse_samples(raws)
+            if "error" in parsed:
+                TELEMETRY.parse_error(self.deployment)
+            elif key is not None:
+                self.cache.put(key, json.dumps(raws))
+            parsed.update({"id": seg.id})
+            return parsed
+        raw = _chat_fn(
+            deployment=self.deployment, system=prompt["system"], user=prompt["user"],
+            **self.gen_params, **self.stream_params,
+        )
         parsed = parse_score(raw)
+        if "error" in parsed:
+            TELEMETRY.parse_error(self.deployment)
+        # Only cache usable judgments so malformed responses are retried next run
+        elif key is not None:
+            self.cache.put(key, raw)
         parsed.update({"id": seg.id})
         return parsed
 
-    def score(self, segments: List[Segment]) -> Dict[str, Any]:
-        results = [self.score_segment(s) for s in segments]
-        scores = [r["score"] for r in results if isinstance(r.get("score"), (int, float))]
-        aggregate = {
-            "mean_score": statistics.fmean(scores) if scores else None,
-            "num_segments": len(segments),
-            "num_scored": len(scores),
-        }
-        return {"segments": results, "aggregate": aggregate}
+    def _batch_key(self, seg: Segment) -> str:
+        params = {**self.gen_params, "batch_template": self.template.batch_user_template}
+        return cache_key(self.deployment, self.template, params, seg.source, seg.hypothesis, seg.reference)
+
+    def score_batch(
+        self,
+        segs: List[Segment],
+        _chat_fn=default_chat_completion,
+        fallback: Optional[Callable[[Segment], Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Judge several segments with a single chat completion.
+
+        Entries that are missing or malformed in the batched answer (or all of them, if
+        the request itself fails) are re-scored one at a time through ``fallback``,
+        which defaults to :meth:`score_segment`.
+        """
+        if fallback is None:
+            fallback = partial(self.score_segment, _chat_fn=_chat_fn)
+        found: Dict[int, Dict[str, Any]] = {}
+        keys: Dict[int, str] = {}
+        if self.cache is not None:
+            for seg in segs:
+                keys[seg.id] = self._batch_key(seg)
+                cached = self.cache.get(keys[seg.id])
+                if cached is not None:
+                    found[seg.id] = parse_score(cached)
+        pending = [seg for seg in segs if seg.id not in found]
+        if len(pending) > 1:
+            prompt = self.template.build_batch(
+                (seg.id, seg.source, seg.hypothesis, seg.reference) for seg in pending
+            )
+            params = {
+                **self.gen_params,
+                **self.stream_params,
+                "max_tokens": self.gen_params["max_tokens"] * len(pending),
+            }
+            try:
+                raw = _chat_fn(
+                    deployment=self.deployment, system=prompt["system"], user=prompt["user"], **params
+                )
+            except Exception:  # noqa: BLE001
+                raw = ""
+            for seg_id, parsed in parse_batch_scores(raw, [seg.id for seg in pending]).items():
+                if self.cache is not None:
+                    self.cache.put(keys[seg_id], parsed["raw_response"])
+                found[seg_id] = parsed
+        results = []
+        for seg in segs:
+            if seg.id in found:
+                parsed = found[seg.id]
+                parsed.update({"id": seg.id})
+                results.append(parsed)
+            else:
+                results.append(fallback(seg))
+        return results
+
+    def plan(
+        self,
+        segments: Iterable[Segment],
+        _chat_fn=None,
+        segments_per_request: int = 1,
+        record_errors: bool = False,
+        done: Optional[Mapping[int, Dict[str, Any]]] = None,
+    ) -> Tuple[Iterable[List[Segment]], Callable[[List[Segment]], List[Dict[str, Any]]]]:
+        """Split ``segments`` into work units and return ``(units, run_unit)``.
+
+        Each unit is a list of segments judged by one request (one segment unless
+        ``segments_per_request > 1``); ``run_unit`` returns their results in order.
+        With ``record_errors`` a failing segment yields ``{"id", "error"}`` instead of
+        raising. Segments whose id is in ``done`` (e.g. from a
+        :class:`~llm_eval.journal.RunJournal`) are replayed without a request.
+        """
+        done = done or {}
+        score_one = self.score_segment if _chat_fn is None else partial(self.score_segment, _chat_fn=_chat_fn)
+        if record_errors:
+            score_one = _recording_errors(score_one)
+        memo = _TripletMemo() if self.dedup else None
+
+        def owned(segs: List[Segment]) -> Tuple[List[Segment], List[_Pending], Dict[Any, _Pending]]:
+            """Split ``segs`` into triplets this call judges and copies judged elsewhere."""
+            if memo is None:
+                return segs, [], {}
+            mine, claims, copies = [], [], {}
+            for seg in segs:
+                pending, owner = memo.claim(seg)
+                if owner:
+                    mine.append(seg)
+                    claims.append(pending)
+                else:
+                    copies[seg.id] = pending
+            if copies:
+                TELEMETRY.deduplicated(self.deployment, len(copies))
+            return mine, claims, copies
+
+        def judged(segs: List[Segment], claims: List[_Pending], fn: Callable[[], List[Dict[str, Any]]]):
+            try:
+                results = fn()
+            except BaseException as e:
+                for pending in claims:
+                    _TripletMemo.publish(pending, error=e)
+                raise
+            for pending, result in zip(claims, results):
+                _TripletMemo.publish(pending, result=result)
+            return {seg.id: result for seg, result in zip(segs, results)}
+
+        if segments_per_request > 1 and self.samples == 1:
+            batch_kwargs = {} if _chat_fn is None else {"_chat_fn": _chat_fn}
+
+            def run_batch(batch: List[Segment]) -> List[Dict[str, Any]]:
+                todo, claims, copies = owned([seg for seg in batch if seg.id not in done])
+                fresh = judged(
+                    todo,
+                    claims,
+                    lambda: self.score_batch(todo, fallback=score_one, **batch_kwargs) if todo else [],
+                )
+                return [
+                    dict(done[seg.id]) if seg.id in done
+                    else copies[seg.id].get(seg.id) if seg.id in copies
+                    else fresh[seg.id]
+                    for seg in batch
+                ]
+
+            return iter_batches(segments, segments_per_request), run_batch
+
+        def run_one(unit: List[Segment]) -> List[Dict[str, Any]]:
+            seg = unit[0]
+            if seg.id in done:
+                return [dict(done[seg.id])]
+            mine, claims, copies = owned(unit)
+            if copies:
+                return [copies[seg.id].get(seg.id)]
+            return [judged(mine, claims, lambda: [score_one(seg)])[seg.id]]
+
+        return ([seg] for seg in segments), run_one
+
+    def iter_score(
+        self,
+        segments: Iterable[Segment],
+        concurrency: int = 1,
+        _chat_fn=None,
+        segments_per_request: int = 1,
+        record_errors: bool = False,
+        done: Optional[Mapping[int, Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily score ``segments``, yielding each result in input order.
+
+        Only a bounded window of segments is held at a time, so arbitrarily large
+        inputs (e.g. from :func:`~llm_eval.data.iter_segments`) run in flat memory.
+        See :meth:`plan` for ``record_errors`` and ``done``.
+        """
+        units, run_unit = self.plan(segments, _chat_fn, segments_per_request, record_errors, done)
+        for unit_results in _ordered_map(run_unit, units, concurrency):
+            yield from unit_results
+
+    def score(
+        self,
+        segments: Iterable[Segment],
+        concurrency: int = 1,
+        _chat_fn=None,
+        segments_per_request: int = 1,
+    ) -> Dict[str, Any]:
+        """Score ``segments``, keeping up to ``concurrency`` requests in flight.
+
+        With ``segments_per_request > 1`` segments are judged in packed prompts (see
+        :meth:`score_batch`). Segment results are returned in input order regardless
+        of completion order.
+        """
+        results = []
+        agg = RunningAggregate()
+        for r in self.iter_score(segments, concurrency, _chat_fn, segments_per_request):
+            agg.add(r)
+            results.append(r)
+        return {"segments": results, "aggregate": agg.to_dict()}
 
 
 def score_multiple(
@@ -48,9 +386,25 @@ def score_multiple(
     parallel: bool = True,
     max_workers: Optional[int] = None,
     chat_fn=default_chat_completion,
+    concurrency: Union[int, Mapping[str, int]] = 1,
+    scorer: Callable[[str], LLMScorer] = LLMScorer,
+    segments_per_request: int = 1,
+    done: Optional[Mapping[str, Mapping[int, Dict[str, Any]]]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    keep_segments: bool = True,
+    progress: Optional[bool] = False,
+    bootstrap_resamples: int = 1000,
+    confidence: float = 0.95,
+    aggregates: Optional[Mapping[str, RunningAggregate]] = None,
+    compact: bool = False,
+    sidecar: Optional[RawSidecar] = None,
 ) -> Dict[str, Any]:
     """Score the same set of segments with multiple model deployments.
 
+    All (deployment, segment) work items go through one :class:`WorkScheduler`, so a
+    deployment that finishes early hands its share of the in-flight budget to the
+    slower ones instead of leaving them to run alone.
+
     Parameters
     ----------
     segments : list[Segment]
@@ -58,9 +412,47 @@ def score_multiple(
     deployments : list[str]
         Deployment / model names.
     parallel : bool, default True
-        If True, evaluate models concurrently (one thread per model).
+        If True, evaluate models concurrently through the shared scheduler; if False,
+        run them one after another.
     max_workers : int | None
-        Cap workers; defaults to len(deployments) when parallel.
+        Global cap on in-flight requests across all models; defaults to the sum of
+        the per-deployment caps.
+    concurrency : int | mapping, default 1
+        Requests in flight per model, or a ``{deployment: cap}`` mapping (missing
+        deployments get 1). Segment results keep input order.
+    scorer : callable, default LLMScorer
+        Builds the :class:`LLMScorer` for a deployment name, e.g.
+        ``partial(LLMScorer, cache=cache, samples=3)`` to share a judgment cache (keys
+        include the deployment, so models never collide) or set the prompt, sampling
+        and streaming options for every model.
+    segments_per_request : int, default 1
+        Pack this many segments into each chat completion (see ``LLMScorer.score_batch``).
+    done : mapping | None
+        Already-scored results per deployment and segment id (see ``RunJournal.completed``);
+        these are replayed into the output and aggregate without new requests.
+    on_result : callable | None
+        Called with every freshly scored segment result, e.g. ``RunJournal.append``
+        to checkpoint progress.
+    keep_segments : bool, default True
+        If False, per-model ``segments`` lists stay empty and only the aggregates are
+        kept in memory; pair with ``on_result`` to persist segment results.
+    progress : bool | None, default False
+        Show one tqdm bar per model; ``None`` lets tqdm decide (shown on a TTY only).
+    bootstrap_resamples : int, default 1000
+        Paired bootstrap resamples for the ``comparison`` block (see ``stats.compare``);
+        0 skips it.
+    confidence : float, default 0.95
+        Confidence level of the bootstrap intervals.
+    aggregates : mapping | None
+        ``{deployment: RunningAggregate}`` to accumulate into, e.g. to write mergeable
+        partial aggregates (see ``shard.write_partial``); created internally by default.
+    compact : bool, default False
+        Keep each model's ``segments`` as a :class:`~llm_eval.results.ResultColumns`
+        (parallel arrays; iterating yields compact dicts) instead of a list of dicts,
+        even with ``keep_segments=False``.
+    sidecar : RawSidecar | None
+        Move raw responses and rationales of every result to this file; results keep
+        a ``raw_offset`` into it.
 
     Returns
     -------
@@ -69,58 +461,95 @@ def score_multiple(
           "models": {
               deployment: {"segments": [...], "aggregate": {...}}
           },
-          "summary": {"model_aggregates": [ {"model": deployment, ...aggregate...}, ... ]}
+          "summary": {
+              "model_aggregates": [ {"model": deployment, ...aggregate...}, ... ],
+              "comparison": {...CIs, z-normalized means, pairwise p-values...}
+          }
         }
     """
-    results: Dict[str, Dict[str, Any]] = {}
+    aggs = {dep: (aggregates or {}).get(dep) or RunningAggregate() for dep in deployments}
+    # Unit results per deployment keyed by unit index, assembled in order at the end
+    kept: Dict[str, Dict[int, List[Dict[str, Any]]]] = {dep: {} for dep in deployments}
+    columns = {dep: ResultColumns(dep) for dep in deployments} if compact else {}
+    failures: Dict[str, BaseException] = {}
+    # Just (id, score) per deployment, so the comparison works without keep_segments
+    scored: Dict[str, Tuple[List[Any], List[float]]] = {dep: ([], []) for dep in deployments}
+    bars = {
+        dep: tqdm(total=len(segments), desc=dep, position=i, leave=True, disable=None if progress is None else not progress)
+        for i, dep in enumerate(deployments)
+    }
 
-    def _run(dep: str) -> tuple[str, Dict[str, Any]]:
-        scorer = LLMScorer(deployment=dep)
-        # Use injection by wrapping scorer.score_segment
-        model_result: Dict[str, Any] = {"segments": [], "aggregate": {}}
-        try:
-            for s in segments:
-                try:
-                    seg_res = scorer.score_segment(s, _chat_fn=chat_fn)
-                except Exception as seg_err:  # noqa: BLE001
-                    seg_res = {"id": s.id, "error": str(seg_err)}
-                seg_res["model"] = dep
-                model_result["segments"].append(seg_res)
-            scores = [r["score"] for r in model_result["segments"] if isinstance(r.get("score"), (int, float))]
-            model_result["aggregate"] = {
-                "mean_score": statistics.fmean(scores) if scores else None,
-                "num_segments": len(segments),
-                "num_scored": len(scores),
-                "num_errors": sum(1 for r in model_result["segments"] if "error" in r),
-            }
-        except Exception as model_err:  # noqa: BLE001
+    def _plan(dep: str) -> Tuple[Iterable[List[Segment]], Callable[[List[Segment]], List[Dict[str, Any]]]]:
+        return scorer(dep).plan(
+            segments,
+            _chat_fn=chat_fn,
+            segments_per_request=segments_per_request,
+            record_errors=True,
+            done=(done or {}).get(dep) or {},
+        )
+
+    groups = [deployments] if parallel else [[d] for d in deployments]
+    try:
+        for group in groups:
+            scheduler = WorkScheduler(concurrency, max_in_flight=max_workers)
+            for dep, idx, unit_results in scheduler.run({d: _plan(d) for d in group}):
+                model_done = (done or {}).get(dep) or {}
+                if sidecar is not None:
+                    unit_results = [sidecar.slim({**r, "model": dep}) for r in unit_results]
+                for k, seg_res in enumerate(unit_results):
+                    seg_res["model"] = dep
+                    if compact:
+                        columns[dep].append(seg_res, idx, k)
+                    if on_result is not None and seg_res["id"] not in model_done:
+                        on_result(seg_res)
+                    aggs[dep].add(seg_res)
+                    score = seg_res.get("score")
+                    if isinstance(score, (int, float)) and "error" not in seg_res:
+                        scored[dep][0].append(seg_res["id"])
+                        scored[dep][1].append(float(score))
+                if keep_segments and not compact:
+                    kept[dep][idx] = unit_results
+                bars[dep].update(len(unit_results))
+            failures.update(scheduler.failures)
+    finally:
+        for bar in bars.values():
+            bar.close()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for dep in deployments:
+        if dep in failures:
             # Catastrophic model failure (e.g., auth / model not deployed)
-            model_result = {
+            results[dep] = {
                 "segments": [],
                 "aggregate": {
                     "mean_score": None,
                     "num_segments": len(segments),
                     "num_scored": 0,
                     "num_errors": len(segments),
-                    "error": str(model_err),
+                    "error": str(failures[dep]),
                 },
             }
-        return dep, model_result
-
-    if parallel and len(deployments) > 1:
-        with ThreadPoolExecutor(max_workers=max_workers or len(deployments)) as ex:
-            future_map = {ex.submit(_run, d): d for d in deployments}
-            for fut in as_completed(future_map):
-                dep, res = fut.result()
-                results[dep] = res
-    else:
-        for d in deployments:
-            dep, res = _run(d)
-            results[dep] = res
+            continue
+        units = kept[dep]
+        results[dep] = {
+            "segments": columns[dep].finish() if compact else [r for i in sorted(units) for r in units[i]],
+            "aggregate": aggs[dep].to_dict(),
+        }
 
     summary = {
         "model_aggregates": [
             {"model": dep, **res["aggregate"]} for dep, res in results.items()
         ]
     }
+    if bootstrap_resamples > 0:
+        summary["comparison"] = compare(
+            (
+                {"model": dep, "id": seg_id, "score": score}
+                for dep in deployments
+                if dep not in failures
+                for seg_id, score in zip(*scored[dep])
+            ),
+            n_resamples=bootstrap_resamples,
+            confidence=confidence,
+        )
     return {"models": results, "summary": summary}
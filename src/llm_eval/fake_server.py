@@ -0,0 +1,521 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from email.parser import BytesParser
+from email.policy import HTTP
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .ratelimit import estimate_tokens
+
+# A local stand-in for the Azure OpenAI v1 chat completions endpoint, for tests and
+# benchmarks. Point ``AZURE_OPENAI_ENDPOINT`` at ``FakeOpenAIServer.url``; responses are
+# deterministic judge JSON (single object, or an array for packed ``[id=...]`` prompts).
+# The Files and Batches endpoints are emulated too: an uploaded batch input is answered
+# line by line through the same chat completion logic once the batch completes.
+# ``/embeddings`` returns bag-of-words vectors, so texts sharing words are similar.
+
+_BATCH_ID = re.compile(r"^\[id=([^\]]+)\]", re.MULTILINE)
+
+_REJECTIONS = {
+    "max_tokens": (
+        "Unsupported parameter: 'max_tokens' is not supported with this model. "
+        "Use 'max_completion_tokens' instead."
+    ),
+    "temperature": (
+        "Unsupported value: 'temperature' does not support 0.0 with this model. "
+        "Only the default (1) value is supported."
+    ),
+    "n": "Unsupported parameter: 'n' is not supported with this model.",
+}
+
+
+@dataclass
+class FakeServerConfig:
+    """Behaviour of :class:`FakeOpenAIServer`.
+
+    ``latency`` is ``"constant"``, ``"uniform"`` (``latency_ms`` +/- ``latency_spread``
+    as a fraction) or ``"lognormal"`` (median ``latency_ms``, sigma ``latency_spread``).
+    ``reject_params`` lists request parameters answered with a 400 like models that do
+    not accept them (``"max_tokens"``, ``"temperature"``). Prompt prefixes seen before
+    are reported as ``cached_tokens`` in ``cache_block_tokens`` steps once at least
+    ``cache_min_tokens`` long, like the provider's automatic prefix cache. Streamed
+    responses (``"stream": true``) send ``stream_chunk_chars`` of content per event,
+    ``token_latency_ms`` apart; a rationale is only generated if the prompt asks for one.
+    Batches report ``in_progress`` for ``batch_polls`` status requests before completing;
+    inputs with more than ``batch_max_requests`` lines fail validation. Embeddings are
+    deterministic ``embedding_dim``-wide bag-of-words vectors.
+    """
+
+    latency: str = "constant"
+    latency_ms: float = 0.0
+    latency_spread: float = 0.5
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after: float = 0.0
+    reject_params: Tuple[str, ...] = ()
+    rationale_words: int = 8
+    token_latency_ms: float = 0.0
+    stream_chunk_chars: int = 4
+    cache_min_tokens: int = 1024
+    cache_block_tokens: int = 128
+    batch_polls: int = 1
+    batch_max_requests: int = 50_000
+    embedding_dim: int = 64
+    seed: int = 0
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    status: Dict[int, int] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    streamed_chars: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "status": {str(k): v for k, v in sorted(self.status.items())},
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "streamed_chars": self.streamed_chars,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+
+def fake_judgment(text: str, words: int = 8, sample: int = 0) -> Dict[str, Any]:
+    """Deterministic judge output for ``text`` (no rationale when ``words`` is 0).
+
+    Further samples (``sample > 0``, e.g. choices of an ``n > 1`` request) move the
+    score by up to 5 points, like a judge sampled at non-zero temperature.
+    """
+    h = zlib.crc32(text.encode("utf-8"))
+    score = h % 101
+    if sample:
+        score = min(100, max(0, score + zlib.crc32(f"{sample}:{text}".encode("utf-8")) % 11 - 5))
+    out: Dict[str, Any] = {
+        "score": float(score),
+        "adequacy": float(h % 6),
+        "fluency": float((h >> 8) % 6),
+    }
+    if words:
+        out["rationale"] = " ".join(["fine"] * words)
+    return out
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server speaking enough of the chat completions API for the client."""
+
+    def __init__(self, config: Optional[FakeServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeServerConfig()
+        self.stats = ServerStats()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._prefixes: set = set()
+        self._samples: Dict[str, int] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/openai/v1/"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = ServerStats()
+
+    # --- behaviour -------------------------------------------------------------------
+
+    def _delay(self) -> float:
+        cfg = self.config
+        with self._lock:
+            if cfg.latency == "uniform":
+                factor = self._rng.uniform(1 - cfg.latency_spread, 1 + cfg.latency_spread)
+            elif cfg.latency == "lognormal":
+                factor = self._rng.lognormvariate(0.0, cfg.latency_spread)
+            else:
+                factor = 1.0
+        return max(0.0, cfg.latency_ms * factor) / 1000.0
+
+    def _fault(self) -> Optional[int]:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.config.rate_429:
+            return 429
+        if roll < self.config.rate_429 + self.config.rate_5xx:
+            return 503
+        return None
+
+    def _cached_tokens(self, prompt: str) -> int:
+        """Longest previously seen block-aligned prefix, then remember this prompt's."""
+        block = self.config.cache_block_tokens * 4
+        boundaries = range(block, len(prompt) + 1, block)
+        digests = []
+        h = hashlib.sha1()
+        last = 0
+        for end in boundaries:
+            h.update(prompt[last:end].encode("utf-8"))
+            last = end
+            digests.append(h.copy().digest())
+        with self._lock:
+            hit = 0
+            for i, d in enumerate(digests):
+                if d not in self._prefixes:
+                    break
+                hit = i + 1
+            self._prefixes.update(digests)
+        cached = hit * self.config.cache_block_tokens
+        return cached if cached >= self.config.cache_min_tokens else 0
+
+    def complete(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """Answer one request body: ``(status, json payload, extra headers)``."""
+        for param in self.config.reject_params:
+            if param in body:
+                error = {"message": _REJECTIONS[param], "type": "invalid_request_error", "param": param}
+                return 400, {"error": error}, {}
+        fault = self._fault()
+        if fault is not None:
+            headers = {"retry-after": str(self.config.retry_after)} if fault == 429 else {}
+            return fault, {"error": {"message": "Simulated fault", "code": str(fault)}}, headers
+
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        user = str(messages[-1].get("content", "")) if messages else ""
+        words = self.config.rationale_words if "rationale" in user else 0
+        ids = _BATCH_ID.findall(user)
+        n = int(body.get("n") or 1)
+        first = 0
+        if (body.get("temperature") or 0) > 0:
+            # Sampled requests: repeating a prompt gives new samples, as with a real judge
+            with self._lock:
+                first = self._samples.get(prompt, 0)
+                self._samples[prompt] = first + n
+        limit = body.get("max_completion_tokens", body.get("max_tokens"))
+        choices = []
+        completion_tokens = 0
+        for index in range(n):
+            sample = first + index
+            if ids:
+                parts = _BATCH_ID.split(user)[1:]
+                # split() alternates captured id and the block text that follows it
+                blocks = dict(zip(parts[::2], parts[1::2]))
+                content = json.dumps(
+                    [{"id": i, **fake_judgment(blocks[i], words, sample)} for i in ids]
+                )
+            else:
+                content = json.dumps(fake_judgment(user, words, sample))
+            tokens = estimate_tokens(content)
+            finish = "stop"
+            if isinstance(limit, int) and tokens > limit:
+                content = content[: max(0, (limit - 8) * 4)]
+                tokens, finish = limit, "length"
+            completion_tokens += tokens
+            choices.append(
+                {"index": index, "message": {"role": "assistant", "content": content}, "finish_reason": finish}
+            )
+        prompt_tokens = estimate_tokens(prompt)
+        cached = self._cached_tokens(prompt)
+        with self._lock:
+            self.stats.prompt_tokens += prompt_tokens
+            self.stats.completion_tokens += completion_tokens
+            self.stats.cached_tokens += cached
+        payload = {
+            "id": f"chatcmpl-{zlib.crc32(prompt.encode('utf-8')):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached},
+            },
+        }
+        return 200, payload, {}
+
+    def embed(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """Answer one embeddings request body like :meth:`complete`."""
+        fault = self._fault()
+        if fault is not None:
+            headers = {"retry-after": str(self.config.retry_after)} if fault == 429 else {}
+            return fault, {"error": {"message": "Simulated fault", "code": str(fault)}}, headers
+        texts = body.get("input")
+        texts = [texts] if isinstance(texts, str) else list(texts or [])
+        data = []
+        for index, text in enumerate(texts):
+            vector = np.zeros(self.config.embedding_dim, dtype=np.float32)
+            for word in re.findall(r"\w+", str(text).lower()):
+                vector[zlib.crc32(word.encode("utf-8")) % self.config.embedding_dim] += 1.0
+            if body.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(estimate_tokens(str(t)) for t in texts)
+        with self._lock:
+            self.stats.prompt_tokens += tokens
+        usage = {"prompt_tokens": tokens, "total_tokens": tokens}
+        return 200, {"object": "list", "data": data, "model": body.get("model"), "usage": usage}, {}
+
+    # --- files and batches --------------------------------------------------------------
+
+    def upload_file(self, filename: str, content: bytes, purpose: str) -> Dict[str, Any]:
+        with self._lock:
+            file_id = f"file-{len(self.files):06d}"
+            self.files[file_id] = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(content),
+                "created_at": int(time.time()),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+                "content": content,
+            }
+        return self.file_info(file_id)
+
+    def file_info(self, file_id: str) -> Dict[str, Any]:
+        return {k: v for k, v in self.files[file_id].items() if k != "content"}
+
+    def create_batch(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        file_id = body.get("input_file_id")
+        if file_id not in self.files:
+            return 404, {"error": {"message": f"File {file_id} not found"}}
+        with self._lock:
+            batch_id = f"batch-{len(self.batches):06d}"
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": body.get("endpoint"),
+                "input_file_id": file_id,
+                "completion_window": body.get("completion_window", "24h"),
+                "status": "validating",
+                "created_at": int(time.time()),
+                "output_file_id": None,
+                "error_file_id": None,
+                "errors": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                "metadata": body.get("metadata"),
+                "_polls": 0,
+            }
+        return 200, self.batch_info(batch_id)
+
+    def batch_info(self, batch_id: str) -> Dict[str, Any]:
+        return {k: v for k, v in self.batches[batch_id].items() if not k.startswith("_")}
+
+    def poll_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Status request: advance the batch, running it once ``batch_polls`` have passed."""
+        batch = self.batches[batch_id]
+        if batch["status"] in ("validating", "in_progress"):
+            batch["_polls"] += 1
+            if batch["_polls"] > self.config.batch_polls:
+                self._run_batch(batch)
+            else:
+                batch["status"] = "in_progress"
+        return self.batch_info(batch_id)
+
+    def _run_batch(self, batch: Dict[str, Any]) -> None:
+        lines = [l for l in self.files[batch["input_file_id"]]["content"].splitlines() if l.strip()]
+        if len(lines) > self.config.batch_max_requests:
+            batch["status"] = "failed"
+            batch["errors"] = {
+                "object": "list",
+                "data": [{"code": "too_many_requests", "message": f"{len(lines)} requests exceed the limit"}],
+            }
+            return
+        out, err = [], []
+        for n, line in enumerate(lines):
+            request = json.loads(line)
+            status, payload, _ = self.complete(request.get("body") or {})
+            result = {
+                "id": f"batch_req_{n:06d}",
+                "custom_id": request.get("custom_id"),
+                "response": {"status_code": status, "request_id": f"req-{n}", "body": payload},
+                "error": None,
+            }
+            (out if status == 200 else err).append(json.dumps(result))
+        for kind, rows in (("output", out), ("error", err)):
+            if rows:
+                content = ("\n".join(rows) + "\n").encode("utf-8")
+                info = self.upload_file(f"{batch['id']}_{kind}.jsonl", content, "batch_output")
+                batch[f"{kind}_file_id"] = info["id"]
+        batch["request_counts"] = {"total": len(lines), "completed": len(out), "failed": len(err)}
+        batch["status"] = "completed"
+
+
+def _parse_multipart(content_type: str, raw: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """Form fields of a multipart body: ``{name: (filename, data)}``."""
+    header = b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n"
+    message = BytesParser(policy=HTTP).parsebytes(header + raw)
+    fields: Dict[str, Tuple[Optional[str], bytes]] = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[str(name)] = (part.get_filename(), part.get_payload(decode=True) or b"")
+    return fields
+
+
+def _make_handler(server: FakeOpenAIServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def log_message(self, *args: Any) -> None:  # silence per-request logging
+            pass
+
+        def _send(self, status: int, payload: Dict[str, Any], headers: Dict[str, str]) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+        def _stream(self, body: Dict[str, Any], payload: Dict[str, Any]) -> None:
+            """Send ``payload`` as server-sent chat.completion.chunk events."""
+            content = payload["choices"][0]["message"]["content"]
+            step = max(1, server.config.stream_chunk_chars)
+            base = {k: payload[k] for k in ("id", "created", "model")}
+            base["object"] = "chat.completion.chunk"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            sent = 0
+            try:
+                for start in range(0, len(content), step):
+                    time.sleep(server.config.token_latency_ms / 1000.0)
+                    piece = content[start : start + step]
+                    event = {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    sent += len(piece)
+                final = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": payload["choices"][0]["finish_reason"]}]}
+                self._chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    usage = {**base, "choices": [], "usage": payload["usage"]}
+                    self._chunk(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            finally:
+                # Only what was generated before the client hung up is billed
+                unsent = payload["usage"]["completion_tokens"] - estimate_tokens(content[:sent])
+                with server._lock:
+                    server.stats.completion_tokens -= max(0, unsent)
+                    server.stats.streamed_chars += sent
+
+        def _route(self) -> str:
+            return self.path.split("?", 1)[0].rstrip("/")
+
+        def do_GET(self) -> None:
+            path = self._route()
+            parts = path.split("/")
+            if "/batches/" in path and parts[-1] in server.batches:
+                self._send(200, server.poll_batch(parts[-1]), {})
+            elif path.endswith("/content") and parts[-2] in server.files:
+                data = server.files[parts[-2]]["content"]
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            elif "/files/" in path and parts[-1] in server.files:
+                self._send(200, server.file_info(parts[-1]), {})
+            else:
+                self._send(404, {"error": {"message": f"No route {self.path}"}}, {})
+
+        def _files_or_batches(self, path: str, raw: bytes) -> None:
+            if path.endswith("/files"):
+                fields = _parse_multipart(self.headers.get("Content-Type", ""), raw)
+                filename, content = fields.get("file", (None, b""))
+                purpose = fields.get("purpose", (None, b""))[1].decode("utf-8")
+                self._send(200, server.upload_file(filename or "upload.jsonl", content, purpose), {})
+            else:
+                try:
+                    status, payload = server.create_batch(json.loads(raw or b"{}"))
+                except ValueError:
+                    status, payload = 400, {"error": {"message": "Invalid JSON body"}}
+                self._send(status, payload, {})
+
+        def do_POST(self) -> None:
+            with server._lock:
+                server.stats.in_flight += 1
+                server.stats.peak_in_flight = max(server.stats.peak_in_flight, server.stats.in_flight)
+            try:
+                self._post()
+            finally:
+                with server._lock:
+                    server.stats.in_flight -= 1
+
+        def _post(self) -> None:
+            start = time.perf_counter()
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+            path = self._route()
+            if path.endswith("/files") or path.endswith("/batches"):
+                self._files_or_batches(path, raw)
+                return
+            if not path.endswith(("/chat/completions", "/embeddings")):
+                status, payload, headers = 404, {"error": {"message": f"No route {self.path}"}}, {}
+            else:
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    status, payload, headers = 400, {"error": {"message": "Invalid JSON body"}}, {}
+                else:
+                    time.sleep(server._delay())
+                    answer = server.embed if path.endswith("/embeddings") else server.complete
+                    status, payload, headers = answer(body)
+            if status == 200 and body.get("stream"):
+                self._stream(body, payload)
+            else:
+                self._send(status, payload, headers)
+            with server._lock:
+                server.stats.requests += 1
+                server.stats.status[status] = server.stats.status.get(status, 0) + 1
+                server.stats.latencies.append(time.perf_counter() - start)
+
+    return Handler
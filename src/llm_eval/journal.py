@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, Optional
+import json
+import os
+
+from .data import JsonlWriter
+
+
+class RunJournal:
+    """Append-only JSONL checkpoint of per-segment results keyed by (model, id).
+
+    Every freshly scored result is appended as soon as it is available. On resume,
+    the latest record per key wins, so a successful retry supersedes an earlier
+    error. A truncated final line (job killed mid-write) is ignored.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writer: Optional[JsonlWriter] = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and "id" in record and "model" in record:
+                    yield record
+
+    def completed(self) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """Successful results per model and segment id (errored segments excluded)."""
+        latest: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for record in self:
+            latest.setdefault(record["model"], {})[record["id"]] = record
+        return {
+            model: {seg_id: r for seg_id, r in by_id.items() if "error" not in r}
+            for model, by_id in latest.items()
+        }
+
+    def start(self, resume: bool = False) -> "RunJournal":
+        """Open for appending; without ``resume`` any previous journal is discarded."""
+        if resume and os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Terminate a torn last line so the next record starts cleanly
+                    f.write(b"\n")
+        self._writer = JsonlWriter(self.path, mode="a" if resume else "w")
+        return self
+
+    def append(self, result: Dict[str, Any]) -> None:
+        if self._writer is None:
+            raise RuntimeError("RunJournal.start() must be called before append()")
+        self._writer.write(result)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -1 +1,3 @@
-from .basic import corpus_bleu  # noqa: F401
\ No newline at end of file
+from .basic import corpus_bleu  # noqa: F401
+from .engine import compute_metrics, segment_statistics, corpus_scores, sentence_scores  # noqa: F401
+from .embedding import EmbeddingCache, embedding_similarity  # noqa: F401
@@ -0,0 +1,315 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: in-process locking only
+    fcntl = None  # type: ignore[assignment]
+
+from ..ratelimit import RateLimiter, RetryPolicy, estimate_tokens, is_retryable, retry_after_seconds
+
+# Embedding-similarity auxiliary metric: cosine similarity of hypothesis embeddings to
+# reference (``EMB``) and source (``EMB-src``, cross-lingual) embeddings. Texts are
+# de-duplicated across all three columns and embedded in large batches by a pluggable
+# backend (any callable ``texts -> (n, dim) array``); vectors are kept in an on-disk
+# cache keyed by a hash of the text, stored as one append-only float32 matrix that is
+# memory-mapped for reads, so text seen in earlier runs or by other systems is never
+# embedded twice.
+
+EMBEDDING_METRICS = ("EMB", "EMB-src")
+DEFAULT_EMBEDDING_CACHE = os.path.join("~", ".cache", "llm-eval", "embeddings")
+_DIGEST = 16
+_RECORD = _DIGEST + 8
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=_DIGEST).digest()
+
+
+class EmbeddingCache:
+    """Content-hashed embedding store in ``directory``.
+
+    ``vectors.f32`` holds the rows (memory-mapped for reads); ``keys.bin`` holds one
+    record per stored text: its 16-byte digest and the row of its vector. Rows are
+    taken from the size of ``vectors.f32`` under an exclusive file lock, and a key
+    is written only after its vector, so several processes may append to one cache
+    and an interrupted write leaves at most unreferenced rows. One cache directory
+    holds embeddings of one backend/model only.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._keys_path = os.path.join(self.directory, "keys.bin")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        self._lock_path = os.path.join(self.directory, "lock")
+        self._lock = threading.Lock()
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._consumed = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._load()
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Thread lock plus an inter-process lock on the cache directory (POSIX)."""
+        with self._lock, open(self._lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        self._rows = {}
+        self._consumed = 0  # bytes of keys.bin already parsed into _rows
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Parse only the key records appended since the last call (by any process)."""
+        if self.dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.dim = int(json.load(f)["dim"])
+        records = b""
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._consumed)
+                records = f.read()
+        n = 0
+        if self.dim and os.path.exists(self._vectors_path):
+            n = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        whole = len(records) // _RECORD
+        for i in range(whole):
+            record = records[i * _RECORD : (i + 1) * _RECORD]
+            row = int.from_bytes(record[_DIGEST:], "little")
+            if row < n:
+                self._rows.setdefault(record[:_DIGEST], row)
+        self._consumed += whole * _RECORD
+        self._map(n)
+
+    def _map(self, n: int) -> None:
+        if self._matrix is not None and len(self._matrix) == n:
+            return
+        self._matrix = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim)) if n else None
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def rows(self, keys: Sequence[bytes]) -> List[Optional[int]]:
+        return [self._rows.get(k) for k in keys]
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        """Rows of the memory-mapped matrix, as an in-memory float32 array."""
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.asarray(self._matrix[np.asarray(rows, dtype=np.int64)])
+
+    def add(self, keys: Sequence[bytes], vectors: np.ndarray) -> List[int]:
+        """Append ``vectors`` for ``keys`` (skipping keys already stored) and return their rows."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._exclusive():
+            self._refresh()  # pick up rows appended by other processes
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache ({self.dim})")
+            new: List[int] = []
+            seen = set(self._rows)
+            for i, k in enumerate(keys):
+                if k not in seen:
+                    seen.add(k)
+                    new.append(i)
+            if new:
+                with open(self._vectors_path, "ab") as f:
+                    # Drop a partially written row so the new rows start on a row boundary
+                    start = f.tell() // (4 * self.dim)
+                    f.truncate(start * 4 * self.dim)
+                    f.write(vectors[new].tobytes())
+                with open(self._keys_path, "ab") as f:
+                    f.truncate(f.tell() // _RECORD * _RECORD)
+                    f.write(
+                        b"".join(keys[i] + (start + j).to_bytes(8, "little") for j, i in enumerate(new))
+                    )
+                    self._consumed = f.tell()
+                for j, i in enumerate(new):
+                    self._rows[keys[i]] = start + j
+                self._map(start + len(new))
+            return [self._rows[k] for k in keys]
+
+
+class AzureEmbeddingBackend:
+    """Embeddings from an Azure OpenAI (v1 API) embeddings deployment.
+
+    Requests are paced by a :class:`~llm_eval.ratelimit.RateLimiter` (``rpm``/``tpm``)
+    and throttling or transient errors are retried per ``retry``, as for judge calls.
+    """
+
+    def __init__(
+        self,
+        deployment: str,
+        endpoint: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.deployment = deployment
+        self.endpoint = endpoint
+        self.name = f"azure-{deployment}"
+        self.retry = retry or RetryPolicy()
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm, sleep=sleep)
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        from ..azure_client import get_client
+
+        tokens = sum(estimate_tokens(t) for t in texts)
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens)
+            try:
+                response = get_client(self.endpoint).embeddings.create(model=self.deployment, input=texts)
+            except Exception as e:  # noqa: BLE001
+                if attempt >= self.retry.max_retries or not is_retryable(e):
+                    raise
+                self.limiter.pause(self.retry.backoff(attempt, retry_after_seconds(e)))
+                attempt += 1
+                continue
+            data = sorted(response.data, key=lambda d: d.index)
+            return np.asarray([d.embedding for d in data], dtype=np.float32)
+
+
+class SentenceTransformerBackend:
+    """Local embeddings with sentence-transformers (the ``embed`` extra)."""
+
+    def __init__(self, model: str = "sentence-transformers/LaBSE"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:  # pragma: no cover
+            raise ImportError(
+                "sentence-transformers not installed. Install with `pip install llm-eval[embed]`."
+            ) from e
+        self._model = SentenceTransformer(model)
+        self.name = f"st-{model}"
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+
+
+def cache_dir_for(root: str, backend: Any) -> str:
+    """Per-backend cache directory under ``root`` (embeddings of different models never mix)."""
+    name = getattr(backend, "name", None) or type(backend).__name__
+    return os.path.join(os.path.expanduser(root), re.sub(r"[^A-Za-z0-9._-]+", "_", name))
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def embedding_similarity(
+    hypotheses: Sequence[str],
+    references: Optional[Sequence[Optional[str]]] = None,
+    sources: Optional[Sequence[str]] = None,
+    backend: Optional[Callable[[List[str]], np.ndarray]] = None,
+    cache: Optional[EmbeddingCache] = None,
+    batch_size: int = 512,
+) -> Dict[str, Any]:
+    """Cosine similarity of each hypothesis to its reference (``EMB``) and source (``EMB-src``).
+
+    Every distinct text is embedded once, ``batch_size`` texts per backend call, and
+    only if ``cache`` does not already hold it. Empty texts are never sent to the
+    backend: segments without a reference (source) get NaN for ``EMB`` (``EMB-src``)
+    and are left out of its corpus mean; an empty hypothesis scores 0.
+
+    Returns ``{"corpus": {metric: mean}, "sentence": {metric: np.ndarray}, "embedding":
+    {"texts", "embedded", "cached"}}``.
+    """
+    if backend is None:
+        raise ValueError("embedding_similarity needs a backend")
+    cache = cache if cache is not None else _MemoryCache()
+    columns = {"hyp": list(hypotheses)}
+    if references is not None:
+        columns["ref"] = [r or "" for r in references]
+    if sources is not None:
+        columns["src"] = [t or "" for t in sources]
+    unique: Dict[bytes, str] = {}
+    keys = {name: [text_key(t) for t in texts] for name, texts in columns.items()}
+    for name, texts in columns.items():
+        for k, t in zip(keys[name], texts):
+            if t:
+                unique.setdefault(k, t)
+    ordered = list(unique)
+    missing = [k for k, row in zip(ordered, cache.rows(ordered)) if row is None]
+    for i in range(0, len(missing), batch_size):
+        chunk = missing[i : i + batch_size]
+        cache.add(chunk, backend([unique[k] for k in chunk]))
+
+    def matrix(name: str) -> np.ndarray:
+        rows = cache.rows(keys[name])
+        present = [i for i, row in enumerate(rows) if row is not None]
+        out = np.zeros((len(rows), cache.dim or 1), dtype=np.float64)
+        if present:
+            out[present] = cache.vectors([rows[i] for i in present])
+        return _unit(out)
+
+    def similarity(name: str) -> np.ndarray:
+        sim = np.einsum("ij,ij->i", hyp, matrix(name))
+        return np.where([bool(t) for t in columns[name]], sim, np.nan)
+
+    hyp = matrix("hyp")
+    sentence: Dict[str, np.ndarray] = {}
+    if references is not None:
+        sentence["EMB"] = similarity("ref")
+    if sources is not None:
+        sentence["EMB-src"] = similarity("src")
+    corpus = {
+        name: float(np.nanmean(values)) if np.any(~np.isnan(values)) else None
+        for name, values in sentence.items()
+    }
+    return {
+        "corpus": corpus,
+        "sentence": sentence,
+        "embedding": {"texts": len(ordered), "embedded": len(missing), "cached": len(ordered) - len(missing)},
+    }
+
+
+class _MemoryCache(EmbeddingCache):
+    """Process-local store with the cache interface, used when no cache is given."""
+
+    def __init__(self) -> None:
+        self.dim = None
+        self._rows = {}
+        self._chunks: List[np.ndarray] = []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def vectors(self, rows: Sequence[int]) -> np.ndarray:
+        if self._matrix is None or len(self._matrix) != len(self._rows):
+            self._matrix = np.concatenate(self._chunks) if self._chunks else None
+        return super().vectors(rows)
+
+    def add(self, keys: Sequence[bytes], vectors: np.ndarray) -> List[int]:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            self.dim = self.dim or int(vectors.shape[1])
+            for k, v in zip(keys, vectors):
+                if k not in self._rows:
+                    self._rows[k] = len(self._rows)
+                    self._chunks.append(v[None, :])
+            return [self._rows[k] for k in keys]
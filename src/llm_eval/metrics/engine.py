@@ -0,0 +1,464 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import re
+
+import numpy as np
+
+# Sentence- and corpus-level BLEU, chrF and TER from one pass over the data.
+#
+# Scores follow SacreBLEU's defaults for a single reference:
+#   BLEU  13a tokenization, exp smoothing (effective order at sentence level)
+#   chrF  character n-grams up to 6, beta=2, whitespace ignored
+#   TER   case-insensitive, whitespace tokenization, tercom-style shifts
+#
+# n-grams are never materialized as tuples/strings: tokens become integer ids and
+# the n-gram of order n is the dense id of the pair (id of its (n-1)-gram prefix,
+# last token), computed for a whole chunk at once with np.unique. Clipped match
+# counts are then set intersections over (segment, n-gram id) keys.
+
+BLEU_ORDER = 4
+CHRF_ORDER = 6
+CHRF_BETA = 2.0
+METRICS = ("BLEU", "chrF", "TER")
+
+# The 13a rules, applied as "split around the match and join with spaces" where that is
+# equivalent: SacreBLEU's backreference templates cost a Python-level call per match.
+# Whitespace is collapsed at the end, so rule 1 need not pad spaces themselves, and the
+# digit-dash rule can never overlap itself. The period/comma rules consume the
+# neighbouring character, which only matters when two of [.,] are adjacent; such lines
+# keep the original sequential substitutions.
+_13A_PUNCT = re.compile(r"([\{-\~\[-\`!-\&\(-\+\:-\@\/])")
+_13A_PERIOD_COMMA = re.compile(r"([\.,])(?:(?<=[^0-9][\.,])|(?=[^0-9]))")
+_13A_PERIOD_COMMA_RUN = re.compile(r"[\.,][\.,]")
+_13A_PERIOD_COMMA_RULES = [
+    (re.compile(r"([^0-9])([\.,])"), r"\1 \2 "),
+    (re.compile(r"([\.,])([^0-9])"), r" \1 \2"),
+]
+_13A_DASH = re.compile(r"(-)(?<=[0-9]-)")
+
+
+@lru_cache(maxsize=2**16)
+def tokenize_13a(line: str) -> str:
+    """mteval-v13a tokenization (as used by WMT and SacreBLEU's default)."""
+    line = line.replace("<skipped>", "").replace("-\n", "").replace("\n", " ")
+    if "&" in line:
+        line = line.replace("&quot;", '"').replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+    line = " ".join(_13A_PUNCT.split(f" {line} "))
+    if _13A_PERIOD_COMMA_RUN.search(line):
+        for pattern, repl in _13A_PERIOD_COMMA_RULES:
+            line = pattern.sub(repl, line)
+    else:
+        line = " ".join(_13A_PERIOD_COMMA.split(line))
+    line = " ".join(_13A_DASH.split(line))
+    return " ".join(line.split())
+
+
+def _ngram_match_stats(
+    seqs: Sequence[np.ndarray], n_segments: int, max_order: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Clipped n-gram matches for ``seqs = hyps + refs`` (hyp i pairs with ref i).
+
+    Returns ``(matches, hyp_counts, ref_counts)``, each of shape (n_segments, max_order).
+    """
+    matches = np.zeros((n_segments, max_order), dtype=np.int64)
+    hyp_counts = np.zeros((n_segments, max_order), dtype=np.int64)
+    ref_counts = np.zeros((n_segments, max_order), dtype=np.int64)
+    lengths = np.fromiter((len(s) for s in seqs), dtype=np.int64, count=len(seqs))
+    if lengths.sum() == 0:
+        return matches, hyp_counts, ref_counts
+    tok = np.concatenate([np.asarray(s, dtype=np.int64) for s in seqs])
+    seq_of = np.repeat(np.arange(len(seqs), dtype=np.int64), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    pos = np.arange(tok.size, dtype=np.int64) - np.repeat(starts, lengths)
+    seq_len = lengths[seq_of]
+    radix = int(tok.max()) + 1
+
+    ids = tok
+    for n in range(1, max_order + 1):
+        valid = np.nonzero(pos + n <= seq_len)[0]
+        if valid.size == 0:
+            break
+        if n > 1:
+            # Dense id of (prefix n-gram id, next token); exact, no hashing collisions
+            _, dense = np.unique(ids[valid] * radix + tok[valid + n - 1], return_inverse=True)
+            ids = np.full(tok.size, -1, dtype=np.int64)
+            ids[valid] = dense.ravel()
+        gram = ids[valid]
+        seq = seq_of[valid]
+        n_grams = int(gram.max()) + 1
+        is_hyp = seq < n_segments
+        seg = np.where(is_hyp, seq, seq - n_segments)
+        keys = seg * n_grams + gram
+        hyp_keys, hyp_cnt = np.unique(keys[is_hyp], return_counts=True)
+        ref_keys, ref_cnt = np.unique(keys[~is_hyp], return_counts=True)
+        hyp_counts[:, n - 1] = np.bincount(seg[is_hyp], minlength=n_segments)
+        ref_counts[:, n - 1] = np.bincount(seg[~is_hyp], minlength=n_segments)
+        common, hi, ri = np.intersect1d(hyp_keys, ref_keys, assume_unique=True, return_indices=True)
+        if common.size:
+            clipped = np.minimum(hyp_cnt[hi], ref_cnt[ri])
+            matches[:, n - 1] = np.bincount(common // n_grams, weights=clipped, minlength=n_segments)
+    return matches, hyp_counts, ref_counts
+
+
+def _word_ids(sentences: Sequence[str], vocab: Dict[str, int]) -> List[np.ndarray]:
+    return [
+        np.fromiter((vocab.setdefault(w, len(vocab)) for w in s.split()), dtype=np.int64)
+        for s in sentences
+    ]
+
+
+def _char_ids(sentences: Sequence[str]) -> List[np.ndarray]:
+    return [np.frombuffer("".join(s.split()).encode("utf-32-le"), dtype=np.uint32).astype(np.int64) for s in sentences]
+
+
+# --- TER (port of the tercom algorithm as implemented in SacreBLEU) ------------------
+
+_TER_MAX_SHIFT_SIZE = 10
+_TER_MAX_SHIFT_DIST = 50
+_TER_BEAM_WIDTH = 25
+_TER_MAX_CACHE_SIZE = 10000
+_TER_MAX_SHIFT_CANDIDATES = 1000
+_INF = int(1e16)
+_NOP, _SUB, _INS, _DEL, _UNDEF = " ", "s", "i", "d", "x"
+_FLIP = str.maketrans(_INS + _DEL, _DEL + _INS)
+
+
+class _BeamEditDistance:
+    """Beam-limited word edit distance against a fixed reference, with a prefix cache."""
+
+    def __init__(self, ref: List[int]):
+        self.ref = ref
+        self.n_ref = len(ref)
+        self.initial_row = [(j, _INS) for j in range(self.n_ref + 1)]
+        self.empty_row = [(_INF, _UNDEF)] * (self.n_ref + 1)
+        self.cache: Dict[int, Tuple[dict, tuple]] = {}
+        self.cache_size = 0
+
+    def __call__(self, hyp: List[int]) -> Tuple[int, str]:
+        node, start, dist = self.cache, 0, [self.initial_row]
+        for w in hyp:
+            if w not in node:
+                break
+            node, row = node[w]
+            dist.append(row)
+            start += 1
+        n_hyp = len(hyp)
+        dist = dist + [list(self.empty_row) for _ in range(n_hyp - start)]
+        ratio = self.n_ref / n_hyp if hyp else 1
+        beam = math.ceil(ratio / 2 + _TER_BEAM_WIDTH) if _TER_BEAM_WIDTH < ratio / 2 else _TER_BEAM_WIDTH
+        ref = self.ref
+        for i in range(start + 1, n_hyp + 1):
+            diag = math.floor(i * ratio)
+            lo = max(0, diag - beam)
+            hi = self.n_ref + 1 if i == n_hyp else min(self.n_ref + 1, diag + beam)
+            prev, cur = dist[i - 1], dist[i]
+            h = hyp[i - 1]
+            for j in range(lo, hi):
+                if j == 0:
+                    cur[j] = (prev[j][0] + 1, _DEL)
+                    continue
+                if h == ref[j - 1]:
+                    best = (prev[j - 1][0], _NOP)
+                else:
+                    best = (prev[j - 1][0] + 1, _SUB)
+                if best[0] > prev[j][0] + 1:
+                    best = (prev[j][0] + 1, _DEL)
+                if best[0] > cur[j - 1][0] + 1:
+                    best = (cur[j - 1][0] + 1, _INS)
+                cur[j] = best
+        trace = []
+        i, j = n_hyp, self.n_ref
+        while i > 0 or j > 0:
+            op = dist[i][j][1]
+            trace.append(op)
+            if op in (_SUB, _NOP):
+                i, j = i - 1, j - 1
+            elif op == _INS:
+                j -= 1
+            else:
+                i -= 1
+        if self.cache_size < _TER_MAX_CACHE_SIZE:
+            node = self.cache
+            for w in hyp[:start]:
+                node = node[w][0]
+            for w, row in zip(hyp[start:], dist[start + 1 :]):
+                if w not in node:
+                    node[w] = ({}, tuple(row))
+                    self.cache_size += 1
+                node = node[w][0]
+        return dist[-1][-1][0], "".join(reversed(trace))
+
+
+def _shift_candidates(hyp: List[int], ref: List[int]):
+    n_h, n_r = len(hyp), len(ref)
+    for sh in range(n_h):
+        for sr in range(max(0, sh - _TER_MAX_SHIFT_DIST), min(n_r, sh + _TER_MAX_SHIFT_DIST + 1)):
+            length = 0
+            while hyp[sh + length] == ref[sr + length] and length < _TER_MAX_SHIFT_SIZE:
+                length += 1
+                yield sh, sr, length
+                if n_h == sh + length or n_r == sr + length:
+                    break
+
+
+def _perform_shift(words: List[int], start: int, length: int, target: int) -> List[int]:
+    if target < start:
+        return words[:target] + words[start : start + length] + words[target:start] + words[start + length :]
+    if target > start + length:
+        return words[:start] + words[start + length : target] + words[start : start + length] + words[target:]
+    return (
+        words[:start]
+        + words[start + length : length + target]
+        + words[start : start + length]
+        + words[length + target :]
+    )
+
+
+def _best_shift(hyp: List[int], ref: List[int], ed: _BeamEditDistance, checked: int):
+    pre_score, inv_trace = ed(hyp)
+    align: Dict[int, int] = {}
+    ref_err: List[int] = []
+    hyp_err: List[int] = []
+    ph = pr = -1
+    for op in inv_trace.translate(_FLIP):
+        if op in (_NOP, _SUB):
+            ph += 1
+            pr += 1
+            align[pr] = ph
+            err = 0 if op == _NOP else 1
+            hyp_err.append(err)
+            ref_err.append(err)
+        elif op == _INS:
+            ph += 1
+            hyp_err.append(1)
+        else:
+            pr += 1
+            align[pr] = ph
+            ref_err.append(1)
+
+    best = None
+    for sh, sr, length in _shift_candidates(hyp, ref):
+        if not any(hyp_err[sh : sh + length]) or not any(ref_err[sr : sr + length]):
+            continue
+        if sh <= align[sr] < sh + length:
+            continue
+        prev_idx = -1
+        for offset in range(-1, length):
+            if sr + offset == -1:
+                idx = 0
+            elif sr + offset in align:
+                idx = align[sr + offset] + 1
+            else:
+                break
+            if idx == prev_idx:
+                continue
+            prev_idx = idx
+            shifted = _perform_shift(hyp, sh, length, idx)
+            candidate = (pre_score - ed(shifted)[0], length, -sh, -idx, shifted)
+            checked += 1
+            if best is None or candidate > best:
+                best = candidate
+        if checked >= _TER_MAX_SHIFT_CANDIDATES:
+            break
+    if best is None:
+        return 0, hyp, checked
+    return best[0], best[4], checked
+
+
+def translation_edit_rate(hyp: List[int], ref: List[int]) -> Tuple[int, int]:
+    """``(edits, reference length)`` with tercom's greedy block shifts."""
+    if not ref:
+        return len(hyp), 0
+    ed = _BeamEditDistance(ref)
+    shifts, checked = 0, 0
+    while True:
+        delta, shifted, checked = _best_shift(hyp, ref, ed, checked)
+        if checked >= _TER_MAX_SHIFT_CANDIDATES or delta <= 0:
+            break
+        shifts += 1
+        hyp = shifted
+    return shifts + ed(hyp)[0], len(ref)
+
+
+# --- sufficient statistics -------------------------------------------------------------
+
+
+@dataclass
+class MetricStats:
+    """Per-segment sufficient statistics; summing rows gives corpus statistics.
+
+    ``bleu``: (n, 10) = matches[1..4], hyp n-gram counts[1..4], hyp length, ref length
+    ``chrf``: (n, 18) = (hyp, ref, match) counts for character orders 1..6
+    ``ter``:  (n, 2)  = edits, reference length
+    """
+
+    bleu: Optional[np.ndarray] = None
+    chrf: Optional[np.ndarray] = None
+    ter: Optional[np.ndarray] = None
+    size: int = field(default=0)
+
+    @classmethod
+    def concat(cls, parts: Sequence["MetricStats"]) -> "MetricStats":
+        def cat(name: str) -> Optional[np.ndarray]:
+            arrays = [getattr(p, name) for p in parts if getattr(p, name) is not None]
+            return np.concatenate(arrays) if arrays else None
+
+        return cls(cat("bleu"), cat("chrf"), cat("ter"), sum(p.size for p in parts))
+
+    def total(self) -> "MetricStats":
+        """Corpus-level statistics (a single row)."""
+
+        def tot(a: Optional[np.ndarray]) -> Optional[np.ndarray]:
+            return None if a is None else a.sum(axis=0, keepdims=True)
+
+        return MetricStats(tot(self.bleu), tot(self.chrf), tot(self.ter), 1)
+
+
+def segment_statistics(
+    hypotheses: Sequence[str], references: Sequence[str], metrics: Sequence[str] = METRICS
+) -> MetricStats:
+    """Sufficient statistics for each (hypothesis, reference) pair."""
+    if len(hypotheses) != len(references):
+        raise ValueError("hypotheses and references must have the same length")
+    n = len(hypotheses)
+    stats = MetricStats(size=n)
+    if "BLEU" in metrics:
+        vocab: Dict[str, int] = {}
+        hyp_ids = _word_ids([tokenize_13a(h) for h in hypotheses], vocab)
+        ref_ids = _word_ids([tokenize_13a(r) for r in references], vocab)
+        matches, totals, _ = _ngram_match_stats(hyp_ids + ref_ids, n, BLEU_ORDER)
+        lens = np.array([[len(h), len(r)] for h, r in zip(hyp_ids, ref_ids)], dtype=np.int64).reshape(n, 2)
+        stats.bleu = np.hstack([matches, totals, lens])
+    if "chrF" in metrics:
+        matches, hyp_counts, ref_counts = _ngram_match_stats(
+            _char_ids(hypotheses) + _char_ids(references), n, CHRF_ORDER
+        )
+        # As in chrF++: hypothesis n-grams only count if the reference has any of that order
+        hyp_counts = np.where(ref_counts > 0, hyp_counts, 0)
+        stats.chrf = np.stack([hyp_counts, ref_counts, matches], axis=2).reshape(n, 3 * CHRF_ORDER)
+    if "TER" in metrics:
+        vocab = {}
+        ter = np.zeros((n, 2), dtype=np.int64)
+        for i, (h, r) in enumerate(zip(hypotheses, references)):
+            h_ids = [vocab.setdefault(w, len(vocab)) for w in h.lower().split()]
+            r_ids = [vocab.setdefault(w, len(vocab)) for w in r.lower().split()]
+            ter[i] = translation_edit_rate(h_ids, r_ids)
+        stats.ter = ter
+    return stats
+
+
+# --- scores from statistics (vectorized over rows) --------------------------------------
+
+
+def bleu_from_stats(stats: np.ndarray, effective_order: bool = False) -> np.ndarray:
+    """BLEU (0-100) per row with exp smoothing; use ``effective_order`` for sentences."""
+    stats = np.atleast_2d(stats).astype(np.float64)
+    correct, total = stats[:, :BLEU_ORDER], stats[:, BLEU_ORDER : 2 * BLEU_ORDER]
+    sys_len, ref_len = stats[:, 2 * BLEU_ORDER], stats[:, 2 * BLEU_ORDER + 1]
+    rows = stats.shape[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bp = np.where(sys_len < ref_len, np.where(sys_len > 0, np.exp(1 - ref_len / np.maximum(sys_len, 1)), 0.0), 1.0)
+        log_p = np.full((rows, BLEU_ORDER), -9999999999.0)
+        active = np.ones(rows, dtype=bool)
+        smooth = np.ones(rows)
+        eff = np.full(rows, BLEU_ORDER if not effective_order else 0, dtype=np.int64)
+        for n in range(BLEU_ORDER):
+            active &= total[:, n] > 0
+            if effective_order:
+                eff = np.where(active, n + 1, eff)
+            zero = active & (correct[:, n] == 0)
+            smooth = np.where(zero, smooth * 2, smooth)
+            prec = np.where(correct[:, n] == 0, 100.0 / (smooth * total[:, n]), 100.0 * correct[:, n] / total[:, n])
+            log_p[:, n] = np.where(active, np.log(prec), log_p[:, n])
+        mask = np.arange(BLEU_ORDER)[None, :] < eff[:, None]
+        mean_log = np.where(mask, log_p, 0.0).sum(axis=1) / np.maximum(eff, 1)
+        score = bp * np.exp(mean_log)
+    return np.where(correct.sum(axis=1) > 0, score, 0.0)
+
+
+def chrf_from_stats(stats: np.ndarray, beta: float = CHRF_BETA) -> np.ndarray:
+    """chrF (0-100) per row with SacreBLEU's effective-order averaging."""
+    stats = np.atleast_2d(stats).astype(np.float64).reshape(-1, CHRF_ORDER, 3)
+    n_hyp, n_ref, n_match = stats[:, :, 0], stats[:, :, 1], stats[:, :, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(n_hyp > 0, n_match / n_hyp, 1e-16)
+        rec = np.where(n_ref > 0, n_match / n_ref, 1e-16)
+        effective = (n_hyp > 0) & (n_ref > 0)
+        eff = effective.sum(axis=1)
+        avg_prec = np.where(eff > 0, np.where(effective, prec, 0.0).sum(axis=1) / np.maximum(eff, 1), 0.0)
+        avg_rec = np.where(eff > 0, np.where(effective, rec, 0.0).sum(axis=1) / np.maximum(eff, 1), 0.0)
+        factor = beta**2
+        denom = factor * avg_prec + avg_rec
+        score = np.where(denom > 0, 100 * ((1 + factor) * avg_prec * avg_rec / np.where(denom > 0, denom, 1)), 0.0)
+    return score
+
+
+def ter_from_stats(stats: np.ndarray) -> np.ndarray:
+    """TER (0-100, lower is better) per row."""
+    stats = np.atleast_2d(stats).astype(np.float64)
+    edits, ref_len = stats[:, 0], stats[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * np.where(ref_len > 0, edits / np.where(ref_len > 0, ref_len, 1), np.where(edits > 0, 1.0, 0.0))
+
+
+def corpus_scores(stats: MetricStats) -> Dict[str, float]:
+    """Corpus-level scores from (per-segment or already summed) statistics."""
+    tot = stats.total()
+    out: Dict[str, float] = {}
+    if tot.bleu is not None:
+        out["BLEU"] = float(bleu_from_stats(tot.bleu)[0])
+    if tot.chrf is not None:
+        out["chrF"] = float(chrf_from_stats(tot.chrf)[0])
+    if tot.ter is not None:
+        out["TER"] = float(ter_from_stats(tot.ter)[0])
+    return out
+
+
+def sentence_scores(stats: MetricStats) -> Dict[str, np.ndarray]:
+    out: Dict[str, np.ndarray] = {}
+    if stats.bleu is not None:
+        out["BLEU"] = bleu_from_stats(stats.bleu, effective_order=True)
+    if stats.chrf is not None:
+        out["chrF"] = chrf_from_stats(stats.chrf)
+    if stats.ter is not None:
+        out["TER"] = ter_from_stats(stats.ter)
+    return out
+
+
+def _chunk_statistics(args: Tuple[List[str], List[str], Tuple[str, ...]]) -> MetricStats:
+    hyps, refs, metrics = args
+    return segment_statistics(hyps, refs, metrics)
+
+
+def compute_metrics(
+    hypotheses: Sequence[str],
+    references: Sequence[str],
+    metrics: Sequence[str] = METRICS,
+    chunk_size: int = 10000,
+    processes: int = 1,
+) -> Dict[str, object]:
+    """Sentence- and corpus-level scores in a single pass.
+
+    The corpus is processed in chunks of ``chunk_size`` segments; with
+    ``processes > 1`` chunks are spread over worker processes.
+
+    Returns ``{"corpus": {metric: float}, "sentence": {metric: np.ndarray}, "stats": MetricStats}``.
+    """
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {sorted(unknown)} (expected some of {METRICS})")
+    chunks = [
+        (list(hypotheses[i : i + chunk_size]), list(references[i : i + chunk_size]), tuple(metrics))
+        for i in range(0, len(hypotheses), chunk_size)
+    ]
+    if processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as ex:
+            parts = list(ex.map(_chunk_statistics, chunks))
+    else:
+        parts = [_chunk_statistics(c) for c in chunks]
+    stats = MetricStats.concat(parts) if parts else segment_statistics([], [], metrics)
+    return {"corpus": corpus_scores(stats), "sentence": sentence_scores(stats), "stats": stats}
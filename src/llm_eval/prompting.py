@@ -1,21 +1,58 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Sequence, Tuple
 import json
+import statistics
 
 DEFAULT_SYSTEM = """You are an expert bilingual evaluator of machine translation quality. Be strict but fair."""
 
+# Static instructions come first and per-segment fields last, so consecutive requests
+# share the longest possible prompt prefix (provider-side prefix caching).
 DEFAULT_USER_TEMPLATE = """Evaluate the quality of the following machine translation.
 Return ONLY a JSON object with these fields:
 score: holistic quality 0-100 (float)
 adequacy: 0-5
 fluency: 0-5
 rationale: short explanation
+IMPORTANT: Output valid JSON only, no markdown fences.
 
 Source: {source}
 Hypothesis: {hypothesis}
 {reference_block}
-IMPORTANT: Output valid JSON only, no markdown fences.
+"""
+
+# Score-only variant for runs that do not need a rationale: fewer completion tokens, and
+# with streaming the response can be closed as soon as the three numbers are in.
+SCORE_ONLY_USER_TEMPLATE = """Evaluate the quality of the following machine translation.
+Return ONLY a JSON object with exactly these fields, in this order:
+score: holistic quality 0-100 (float)
+adequacy: 0-5
+fluency: 0-5
+IMPORTANT: Output valid JSON only, no markdown fences, no explanation.
+
+Source: {source}
+Hypothesis: {hypothesis}
+{reference_block}
+"""
+
+SCORE_FIELDS = ("score", "adequacy", "fluency")
+
+DEFAULT_BATCH_USER_TEMPLATE = """Evaluate the quality of each of the following machine translations independently.
+Return ONLY a JSON array with one object per segment, each with these fields:
+id: the segment id exactly as given
+score: holistic quality 0-100 (float)
+adequacy: 0-5
+fluency: 0-5
+rationale: short explanation
+IMPORTANT: Output valid JSON only, no markdown fences. Include every id exactly once.
+
+{segments}
+"""
+
+DEFAULT_BATCH_SEGMENT_TEMPLATE = """[id={id}]
+Source: {source}
+Hypothesis: {hypothesis}
+{reference_block}
 """
 
 @dataclass
@@ -23,6 +60,22 @@ class PromptTemplate:
     name: str = "default"
     system: str = DEFAULT_SYSTEM
     user_template: str = DEFAULT_USER_TEMPLATE
+    batch_user_template: str = DEFAULT_BATCH_USER_TEMPLATE
+    batch_segment_template: str = DEFAULT_BATCH_SEGMENT_TEMPLATE
+
+    @classmethod
+    def score_only(cls) -> "PromptTemplate":
+        """Default template without the rationale field."""
+        return cls(name="score_only", user_template=SCORE_ONLY_USER_TEMPLATE)
+
+    @property
+    def static_prefix(self) -> str:
+        """System prompt plus the user template up to its first per-segment field.
+
+        This part is identical across requests; keeping it long and the fields at the
+        end lets the provider's prompt-prefix cache serve it.
+        """
+        return self.system + "\n" + _before_first_field(self.user_template)
 
     def build(self, source: str, hypothesis: str, reference: Optional[str]) -> Dict[str, str]:
         reference_block = f"Reference: {reference}" if reference else ""
@@ -31,6 +84,108 @@ class PromptTemplate:
         )
         return {"system": self.system, "user": user}
 
+    def build_batch(
+        self, items: Iterable[Tuple[Any, str, str, Optional[str]]]
+    ) -> Dict[str, str]:
+        """Build one prompt judging several ``(id, source, hypothesis, reference)`` items."""
+        blocks = []
+        for seg_id, source, hypothesis, reference in items:
+            reference_block = f"Reference: {reference}" if reference else ""
+            blocks.append(
+                self.batch_segment_template.format(
+                    id=seg_id,
+                    source=source.strip(),
+                    hypothesis=hypothesis.strip(),
+                    reference_block=reference_block,
+                )
+            )
+        user = self.batch_user_template.format(segments="\n".join(blocks))
+        return {"system": self.system, "user": user}
+
+
+class JsonFieldScanner:
+    """Find top-level fields of the first JSON object in text that arrives in pieces.
+
+    ``feed`` returns True once every name in ``fields`` has a complete value, so a
+    streamed response can be closed early; :meth:`complete_json` then returns the
+    text received so far, cut after the last of those values and closed with ``}``.
+    Responses whose top level is not an object (e.g. batch arrays) never complete.
+    """
+
+    def __init__(self, fields: Sequence[str] = SCORE_FIELDS):
+        self.fields = tuple(fields)
+        self.values: Dict[str, Any] = {}
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._root: Optional[str] = None
+        self._stopped = False  # top level is not an object, or the object already closed
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._end = 0
+
+    def _finish_value(self, end: int) -> None:
+        if self._key is not None and self._value_start is not None and self._key in self.fields:
+            try:
+                self.values[self._key] = json.loads(self.text[self._value_start : end])
+            except ValueError:
+                pass
+            else:
+                self._end = max(self._end, end)
+        self._key, self._value_start = None, None
+        if all(f in self.values for f in self.fields):
+            self.done = True
+
+    def feed(self, chunk: str) -> bool:
+        self.text += chunk
+        text = self.text
+        while self._pos < len(text) and not self.done and not self._stopped:
+            i, ch = self._pos, text[self._pos]
+            self._pos += 1
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._depth == 1 and self._value_start is None:
+                        self._key = json.loads(text[self._str_start : i + 1])
+                continue
+            if self._root is None:
+                if ch in "{[":
+                    self._root, self._depth = ch, 1
+                    self._stopped = ch == "["
+                continue
+            if ch == '"':
+                self._in_str, self._str_start = True, i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_value(i)
+                    self._stopped = True
+            elif self._depth == 1 and ch == ":":
+                self._value_start = i + 1
+            elif self._depth == 1 and ch == ",":
+                self._finish_value(i)
+        return self.done
+
+    def complete_json(self) -> str:
+        """Received text up to the last required value, closed into a parseable object."""
+        return self.text[: self._end] + "}"
+
+
+def _before_first_field(template: str) -> str:
+    positions = [template.find("{" + f + "}") for f in ("source", "hypothesis", "reference_block")]
+    found = [p for p in positions if p != -1]
+    return template[: min(found)] if found else template
+
 
 def parse_score(raw: str) -> Dict[str, Any]:
     # attempt to extract json
@@ -54,3 +209,70 @@ def parse_score(raw: str) -> Dict[str, Any]:
         "raw_response": raw,
     }
     return result
+
+
+def parse_samples(raws: Sequence[str]) -> Dict[str, Any]:
+    """Combine several responses to the same prompt (self-consistency).
+
+    ``score``/``adequacy``/``fluency`` are means over the parseable samples;
+    ``score_median``, ``score_var`` (sample variance, 0 for one sample), ``samples``
+    and ``num_samples`` describe their spread. Rationale and ``raw_response`` come
+    from the first parseable sample; if none parses, its error is returned.
+    """
+    parsed = [parse_score(raw) for raw in raws]
+    ok = [p for p in parsed if "error" not in p and p.get("score") is not None]
+    if not ok:
+        return parsed[0] if parsed else {"error": "no_samples"}
+    scores = [p["score"] for p in ok]
+    result = dict(ok[0])
+    result["score"] = statistics.fmean(scores)
+    for name in ("adequacy", "fluency"):
+        values = [p[name] for p in ok if p.get(name) is not None]
+        result[name] = statistics.fmean(values) if values else None
+    result["score_median"] = statistics.median(scores)
+    result["score_var"] = statistics.variance(scores) if len(scores) > 1 else 0.0
+    result["samples"] = scores
+    result["num_samples"] = len(scores)
+    return result
+
+
+def parse_batch_scores(raw: str, ids: Sequence[Any]) -> Dict[Any, Dict[str, Any]]:
+    """Map a batched JSON-array response back to the requested segment ``ids``.
+
+    Only entries with a recognised id and a numeric score are returned; ids that are
+    missing, duplicated or malformed are left out so callers can re-score them.
+    """
+    by_key = {str(i): i for i in ids}
+    raw_stripped = raw.strip()
+    first = raw_stripped.find("[")
+    last = raw_stripped.rfind("]")
+    if first == -1 or last == -1:
+        return {}
+    try:
+        data = json.loads(raw_stripped[first : last + 1])
+    except Exception:  # noqa: BLE001
+        return {}
+    if not isinstance(data, list):
+        return {}
+
+    results: Dict[Any, Dict[str, Any]] = {}
+    seen: List[Any] = []
+    for entry in data:
+        if not isinstance(entry, dict):
+            continue
+        seg_id = by_key.get(str(entry.get("id")))
+        if seg_id is None:
+            continue
+        if seg_id in seen:
+            results.pop(seg_id, None)
+            continue
+        seen.append(seg_id)
+        item = {k: v for k, v in entry.items() if k != "id"}
+        try:
+            parsed = parse_score(json.dumps(item, ensure_ascii=False))
+        except (TypeError, ValueError):
+            continue
+        if "error" in parsed or parsed.get("score") is None:
+            continue
+        results[seg_id] = parsed
+    return results
@@ -0,0 +1,247 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+import email.utils
+import random
+import threading
+import time
+
+from .telemetry import TELEMETRY
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap prompt-size estimate (~4 characters per token plus message overhead)."""
+    return len(text) // 4 + 8
+
+
+def _iter_causes(exc: BaseException):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__  # type: ignore[assignment]
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of an (possibly wrapped) API error, if any."""
+    for e in _iter_causes(exc):
+        code = getattr(e, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    # Connection resets / timeouts carry no status code
+    return any(
+        type(e).__name__ in ("APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout")
+        for e in _iter_causes(exc)
+    )
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Parse ``retry-after-ms`` / ``retry-after`` (seconds or HTTP date) from the error response."""
+    for e in _iter_causes(exc):
+        headers = getattr(getattr(e, "response", None), "headers", None)
+        if not headers:
+            continue
+        for header, divisor in (("retry-after-ms", 1000.0), ("retry-after", 1.0)):
+            value = headers.get(header)
+            if value is None:
+                continue
+            try:
+                return max(0.0, float(value) / divisor)
+            except ValueError:
+                parsed = email.utils.parsedate_tz(value)
+                if parsed is not None:
+                    return max(0.0, float(email.utils.mktime_tz(parsed) - time.time()))
+    return None
+
+
+class RateLimiter:
+    """Token-bucket pacing for one deployment on one endpoint.
+
+    ``rpm``/``tpm`` are the quota per minute; up to ``burst_seconds`` worth of quota
+    may be spent at once (Azure evaluates limits over short windows, so a full
+    minute of burst would just trade for 429s). ``pause`` holds back every caller
+    until a server-imposed Retry-After has elapsed.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        burst_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._req_cap = max(1.0, rpm * burst_seconds / 60.0) if rpm else None
+        self._tok_cap = max(1.0, tpm * burst_seconds / 60.0) if tpm else None
+        self._req = self._req_cap or 0.0
+        self._tok = self._tok_cap or 0.0
+        self._last = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._last)
+        self._last = now
+        if self._req_cap is not None:
+            self._req = min(self._req_cap, self._req + elapsed * self.rpm / 60.0)  # type: ignore[operator]
+        if self._tok_cap is not None:
+            self._tok = min(self._tok_cap, self._tok + elapsed * self.tpm / 60.0)  # type: ignore[operator]
+
+    def delay(self, tokens: int = 0) -> float:
+        """Seconds until a request of ``tokens`` could be admitted (0 if now)."""
+        with self._lock:
+            return self._delay_locked(tokens, self._clock())
+
+    def _delay_locked(self, tokens: int, now: float) -> float:
+        self._refill(now)
+        wait = max(0.0, self._blocked_until - now)
+        if self._req_cap is not None and self._req < 1.0:
+            wait = max(wait, (1.0 - self._req) * 60.0 / self.rpm)  # type: ignore[operator]
+        if self._tok_cap is not None:
+            need = min(float(tokens), self._tok_cap)
+            if self._tok < need:
+                wait = max(wait, (need - self._tok) * 60.0 / self.tpm)  # type: ignore[operator]
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until the request fits the budget, then spend it. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._delay_locked(tokens, now)
+                if wait <= 0.0:
+                    if self._req_cap is not None:
+                        self._req -= 1.0
+                    if self._tok_cap is not None:
+                        self._tok -= min(float(tokens), self._tok_cap)
+                    return waited
+            self._sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the real usage of a request is known."""
+        if self._tok_cap is None:
+            return
+        with self._lock:
+            self._tok = min(self._tok_cap, self._tok + min(float(estimated), self._tok_cap) - actual)
+
+
+@dataclass
+class RetryPolicy:
+    """Retries for throttling (429), transient 5xx and connection errors."""
+
+    max_retries: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            # Honor the server's hint, spreading callers slightly so they don't return in lockstep
+            return retry_after * (1.0 + random.uniform(0.0, 0.1))
+        return random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+
+Limits = Union[Tuple[Optional[float], Optional[float]], Mapping[str, Tuple[Optional[float], Optional[float]]]]
+
+
+class RateLimitedChat:
+    """Chat function wrapper that paces requests to stay under RPM/TPM quotas.
+
+    It has the same call signature as :func:`~llm_eval.azure_client.chat_completion`,
+    so it can be used anywhere a ``chat_fn``/``_chat_fn`` is accepted. ``limits`` is
+    an ``(rpm, tpm)`` pair applied to every deployment, or a mapping from deployment
+    name (``"*"`` for the default) to such a pair. With several ``endpoints`` serving the same deployments,
+    each request goes to the endpoint that can admit it soonest (and a throttled
+    endpoint is avoided while its Retry-After runs). Throttling and transient errors
+    are retried according to ``retry``.
+    """
+
+    def __init__(
+        self,
+        chat_fn: Callable[..., Any],
+        limits: Optional[Limits] = None,
+        endpoints: Optional[Sequence[str]] = None,
+        retry: Optional[RetryPolicy] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.chat_fn = chat_fn
+        self.limits = limits
+        self.endpoints: List[Optional[str]] = list(endpoints) if endpoints else [None]
+        self.retry = retry or RetryPolicy()
+        self._sleep = sleep
+        self._limiters: Dict[Tuple[Optional[str], str], RateLimiter] = {}
+        self._lock = threading.Lock()
+        self._rr = 0
+
+    def _limits_for(self, deployment: str) -> Tuple[Optional[float], Optional[float]]:
+        if self.limits is None:
+            return None, None
+        if isinstance(self.limits, Mapping):
+            return self.limits.get(deployment, self.limits.get("*", (None, None)))
+        return self.limits
+
+    def limiter(self, deployment: str, endpoint: Optional[str] = None) -> RateLimiter:
+        key = (endpoint, deployment)
+        with self._lock:
+            if key not in self._limiters:
+                rpm, tpm = self._limits_for(deployment)
+                self._limiters[key] = RateLimiter(rpm=rpm, tpm=tpm, sleep=self._sleep)
+            return self._limiters[key]
+
+    def _pick_endpoint(self, deployment: str, tokens: int) -> Optional[str]:
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        with self._lock:
+            self._rr += 1
+            start = self._rr
+        order = [self.endpoints[(start + i) % len(self.endpoints)] for i in range(len(self.endpoints))]
+        return min(order, key=lambda ep: self.limiter(deployment, ep).delay(tokens))
+
+    def __call__(self, deployment: str, system: str, user: str, **kwargs: Any) -> Any:
+        tokens = estimate_tokens(system) + estimate_tokens(user)
+        tokens += int(kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0) * int(kwargs.get("n") or 1)
+        attempt = 0
+        with TELEMETRY.request(deployment) as rec:
+            while True:
+                endpoint = self._pick_endpoint(deployment, tokens)
+                limiter = self.limiter(deployment, endpoint)
+                rec.queue_wait += limiter.acquire(tokens)
+                rec.endpoint = endpoint
+                call_kwargs = dict(kwargs)
+                if endpoint is not None:
+                    call_kwargs["endpoint"] = endpoint
+                try:
+                    result = self.chat_fn(deployment=deployment, system=system, user=user, **call_kwargs)
+                except Exception as e:  # noqa: BLE001
+                    if attempt >= self.retry.max_retries or not is_retryable(e):
+                        raise
+                    hint = retry_after_seconds(e)
+                    delay = self.retry.backoff(attempt, hint)
+                    # Hold back every caller of this deployment/endpoint; with several
+                    # endpoints the retry moves to whichever one is available first
+                    limiter.pause(delay)
+                    attempt += 1
+                    rec.retries = attempt
+                    continue
+                if rec.prompt_tokens is not None:
+                    # Give back the unused part of the max_tokens reservation
+                    limiter.settle(tokens, rec.prompt_tokens + (rec.completion_tokens or 0))
+                return result
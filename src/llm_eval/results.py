@@ -0,0 +1,160 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union, overload
+import json
+import threading
+
+import numpy as np
+
+# Compact result storage. A parsed judgment dict carries the full model output
+# (``raw_response``, or ``raw``/``exception`` on failures) and the rationale, which
+# dominate memory on large multi-model runs. ``RawSidecar`` moves those fields to an
+# append-only JSONL file and leaves a byte ``raw_offset`` in the record; ``ResultColumns``
+# keeps the numeric fields of one model as parallel arrays and can be saved as ``.npz``.
+
+HEAVY_FIELDS = ("raw_response", "rationale", "raw", "exception")
+NUMERIC_FIELDS = ("score", "adequacy", "fluency")
+
+
+class RawSidecar:
+    """Append-only JSONL file of the bulky result fields, addressed by byte offset."""
+
+    def __init__(self, path: str, mode: str = "wb"):
+        self.path = path
+        self._f = open(path, mode)
+        self._lock = threading.Lock()
+
+    def slim(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """``result`` without its heavy fields, which are written here (``raw_offset``)."""
+        heavy = {k: result[k] for k in HEAVY_FIELDS if result.get(k) is not None}
+        slim = {k: v for k, v in result.items() if k not in HEAVY_FIELDS}
+        if heavy:
+            line = json.dumps({"id": result.get("id"), "model": result.get("model"), **heavy}, ensure_ascii=False)
+            with self._lock:
+                slim["raw_offset"] = self._f.tell()
+                self._f.write(line.encode("utf-8") + b"\n")
+        return slim
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "RawSidecar":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_raw(path: str, offset: int) -> Dict[str, Any]:
+    """The sidecar entry written at ``offset``."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+
+class ResultColumns(Sequence[Dict[str, Any]]):
+    """One model's results as parallel arrays (NaN for missing numbers).
+
+    Indexing and iteration give compact dicts (``id``, ``model``, the numeric fields,
+    and ``error``/``raw_offset`` where present), so it can stand in for a list of
+    result dicts. Results may be appended out of order with a ``(unit, offset)``
+    position; :meth:`finish` restores input order.
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self.ids: List[Any] = []
+        self.columns = {name: array("d") for name in NUMERIC_FIELDS}
+        self.raw_offsets = array("q")
+        self.errors: Dict[int, str] = {}
+        self._unit = array("q")
+        self._offset = array("q")
+
+    def append(self, result: Dict[str, Any], unit: int = 0, offset: int = 0) -> None:
+        row = len(self.ids)
+        self.ids.append(result.get("id"))
+        for name, col in self.columns.items():
+            value = result.get(name)
+            col.append(float(value) if isinstance(value, (int, float)) else float("nan"))
+        self.raw_offsets.append(int(result.get("raw_offset", -1)))
+        if "error" in result:
+            self.errors[row] = str(result["error"])
+        self._unit.append(unit)
+        self._offset.append(offset)
+
+    def finish(self) -> "ResultColumns":
+        """Reorder rows by the positions given to :meth:`append`."""
+        order = np.lexsort((np.frombuffer(self._offset, dtype=np.int64), np.frombuffer(self._unit, dtype=np.int64)))
+        if len(order) and not np.all(order[1:] > order[:-1]):
+            self.ids = [self.ids[i] for i in order]
+            for name in self.columns:
+                self.columns[name] = array("d", np.frombuffer(self.columns[name], dtype=np.float64)[order].tobytes())
+            self.raw_offsets = array("q", np.frombuffer(self.raw_offsets, dtype=np.int64)[order].tobytes())
+            where = {int(old): new for new, old in enumerate(order)}
+            self.errors = {where[row]: err for row, err in self.errors.items()}
+        self._unit, self._offset = array("q"), array("q")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"id": self.ids[row]}
+        if self.model is not None:
+            out["model"] = self.model
+        for name, col in self.columns.items():
+            value = col[row]
+            out[name] = None if value != value else value
+        if row in self.errors:
+            out["error"] = self.errors[row]
+        if self.raw_offsets[row] >= 0:
+            out["raw_offset"] = self.raw_offsets[row]
+        return out
+
+    @overload
+    def __getitem__(self, row: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, row: slice) -> List[Dict[str, Any]]: ...
+
+    def __getitem__(self, row: Union[int, slice]) -> Any:
+        if isinstance(row, slice):
+            return [self.record(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self.record(row)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.record(i) for i in range(len(self)))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Columns as NumPy arrays: ``id``, numeric fields, ``error`` ('' if none), ``raw_offset``."""
+        ids = np.asarray([str(i) for i in self.ids])
+        if all(isinstance(i, int) and not isinstance(i, bool) for i in self.ids):
+            try:
+                ids = np.asarray(self.ids, dtype=np.int64)
+            except OverflowError:
+                pass
+        out = {"id": ids}
+        out.update({name: np.frombuffer(col, dtype=np.float64).copy() for name, col in self.columns.items()})
+        out["error"] = np.asarray([self.errors.get(i, "") for i in range(len(self))], dtype=str)
+        out["raw_offset"] = np.frombuffer(self.raw_offsets, dtype=np.int64).copy()
+        return out
+
+
+def save_npz(path: str, results: Mapping[str, ResultColumns]) -> None:
+    """Write ``{model: columns}`` as one ``.npz`` with ``<model>/<column>`` arrays."""
+    arrays = {f"{model}/{name}": arr for model, cols in results.items() for name, arr in cols.arrays().items()}
+    np.savez(path, **arrays)
+
+
+def load_npz(path: str) -> Dict[str, Dict[str, np.ndarray]]:
+    """``{model: {column: array}}`` from :func:`save_npz` output."""
+    out: Dict[str, Dict[str, np.ndarray]] = {}
+    with np.load(path) as data:
+        for key in data.files:
+            model, _, name = key.rpartition("/")
+            out.setdefault(model, {})[name] = data[key]
+    return out
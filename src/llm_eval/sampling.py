@@ -0,0 +1,190 @@
+from __future__ import annotations
+from functools import partial
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+import math
+
+import numpy as np
+
+from .cache import JudgmentCache
+from .data import Segment
+
+# Sequential sampling: judge a random permutation of the corpus batch by batch and
+# stop once every model's corpus mean is known to within ``target_ci`` points.
+# All models judge the same sampled segments, so differences between them are
+# paired; intervals use the normal approximation with a finite population
+# correction (the interval closes to zero once the whole corpus is scored). With
+# several judge samples per segment the per-segment judge noise is added on top.
+
+
+def half_width(values: np.ndarray, population: int, confidence: float = 0.95, noise: float = 0.0) -> float:
+    """Half-width of the confidence interval of the population mean from ``values``.
+
+    ``noise`` is the summed variance of the values themselves (``score_var /
+    num_samples`` per segment). It is part of the spread of ``values``, so it is taken
+    out of the between-segment term (which the finite population correction shrinks)
+    and added back undiminished: unlike sampling error it remains with the full corpus.
+    """
+    n = len(values)
+    if n < 2:
+        return math.inf
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    fpc2 = max(0.0, (population - n) / (population - 1)) if population > 1 else 0.0
+    between = max(0.0, float(np.var(values, ddof=1)) - noise / n)
+    return float(z * math.sqrt(between / n * fpc2 + noise / (n * n)))
+
+
+def sequential_sample(
+    segments: Sequence[Segment],
+    score_batch: Callable[[List[Segment]], Mapping[str, List[Dict[str, Any]]]],
+    target_ci: float,
+    confidence: float = 0.95,
+    batch_size: int = 100,
+    min_segments: int = 30,
+    seed: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """Score random batches of ``segments`` until every model's mean is within ``target_ci``.
+
+    ``score_batch`` judges a list of segments and returns ``{model: results}`` with one
+    result per segment in order. A model without a single successful score (e.g. a
+    missing deployment) is left out of the stopping rule and listed in ``failed``;
+    sampling stops after ``min_segments`` if every model failed. Returns the estimate
+    and interval per model, paired differences between models, the fraction of the
+    corpus scored and all results.
+    """
+    population = len(segments)
+    order = np.random.default_rng(seed).permutation(population)
+    scores: Dict[str, np.ndarray] = {}
+    noise: Dict[str, np.ndarray] = {}
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    errors: Dict[str, int] = {}
+    sampled = 0
+    widths: Dict[str, float] = {}
+    failed: List[str] = []
+    active: List[float] = []
+    while sampled < population:
+        take = max(batch_size, min_segments - sampled)
+        idx = order[sampled : sampled + take]
+        batch_results = score_batch([segments[i] for i in idx])
+        for model, model_results in batch_results.items():
+            arr = scores.setdefault(model, np.full(population, np.nan))
+            var = noise.setdefault(model, np.zeros(population))
+            results.setdefault(model, []).extend(model_results)
+            for i, res in zip(idx, model_results):
+                score = res.get("score")
+                if isinstance(score, (int, float)) and "error" not in res:
+                    arr[i] = float(score)
+                    if isinstance(res.get("score_var"), (int, float)) and res.get("num_samples"):
+                        var[i] = float(res["score_var"]) / int(res["num_samples"])
+                else:
+                    errors[model] = errors.get(model, 0) + 1
+        sampled += len(idx)
+        widths = {
+            m: half_width(arr[~np.isnan(arr)], population, confidence, float(noise[m].sum()))
+            for m, arr in scores.items()
+        }
+        failed = [m for m, arr in scores.items() if np.isnan(arr).all()]
+        active = [w for m, w in widths.items() if m not in failed]
+        if sampled >= min_segments and (not active or max(active) <= target_ci):
+            break
+
+    models: Dict[str, Dict[str, Any]] = {}
+    for model, arr in scores.items():
+        values = arr[~np.isnan(arr)]
+        estimate = float(values.mean()) if len(values) else None
+        width = widths.get(model, math.inf)
+        models[model] = {
+            "estimate": estimate,
+            "ci_low": None if estimate is None or math.isinf(width) else estimate - width,
+            "ci_high": None if estimate is None or math.isinf(width) else estimate + width,
+            "half_width": None if math.isinf(width) else width,
+            "num_scored": int(len(values)),
+            "num_errors": errors.get(model, 0),
+        }
+    pairwise = []
+    names = list(scores)
+    for a in range(len(names)):
+        for b in range(a + 1, len(names)):
+            diff = scores[names[a]] - scores[names[b]]
+            paired = ~np.isnan(diff)  # segments both models scored
+            diff = diff[paired]
+            delta = float(diff.mean()) if len(diff) else None
+            pair_noise = float((noise[names[a]] + noise[names[b]])[paired].sum())
+            width = half_width(diff, population, confidence, pair_noise)
+            pairwise.append(
+                {
+                    "model_a": names[a],
+                    "model_b": names[b],
+                    "delta": delta,
+                    "ci_low": None if delta is None or math.isinf(width) else delta - width,
+                    "ci_high": None if delta is None or math.isinf(width) else delta + width,
+                    "num_paired": int(len(diff)),
+                }
+            )
+    return {
+        "target_ci": target_ci,
+        "confidence": confidence,
+        "reached": bool(active) and max(active) <= target_ci,
+        "failed": failed,
+        "num_segments": population,
+        "num_sampled": sampled,
+        "fraction_scored": sampled / population if population else 0.0,
+        "models": models,
+        "pairwise": pairwise,
+        "segments": results,
+    }
+
+
+def sample_score(
+    segments: Sequence[Segment],
+    deployments: List[str],
+    target_ci: float,
+    confidence: float = 0.95,
+    batch_size: int = 100,
+    min_segments: int = 30,
+    seed: Optional[int] = 0,
+    chat_fn: Optional[Callable[..., Any]] = None,
+    concurrency: Union[int, Mapping[str, int]] = 1,
+    max_workers: Optional[int] = None,
+    cache: Optional[JudgmentCache] = None,
+    segments_per_request: int = 1,
+    stream: bool = False,
+    rationale: bool = True,
+    samples: int = 1,
+    temperature: float = 0.0,
+    done: Optional[Mapping[str, Mapping[int, Dict[str, Any]]]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """:func:`sequential_sample` with each batch judged by :func:`~llm_eval.evaluator.score_multiple`.
+
+    ``cache``, ``stream``, ``rationale``, ``samples`` and ``temperature`` configure the
+    :class:`~llm_eval.evaluator.LLMScorer` of every deployment.
+    """
+    from .evaluator import LLMScorer, default_chat_completion, score_multiple
+
+    scorer = partial(
+        LLMScorer, cache=cache, stream=stream, rationale=rationale, samples=samples, temperature=temperature
+    )
+
+    def score_batch(batch: List[Segment]) -> Dict[str, List[Dict[str, Any]]]:
+        out = score_multiple(
+            batch,
+            deployments,
+            max_workers=max_workers,
+            chat_fn=chat_fn or default_chat_completion,
+            concurrency=concurrency,
+            scorer=scorer,
+            segments_per_request=segments_per_request,
+            done=done,
+            on_result=on_result,
+            bootstrap_resamples=0,
+        )
+        return {
+            dep: block["segments"] or [{"id": s.id, "error": block["aggregate"].get("error")} for s in batch]
+            for dep, block in out["models"].items()
+        }
+
+    return sequential_sample(
+        segments, score_batch, target_ci, confidence=confidence, batch_size=batch_size,
+        min_segments=min_segments, seed=seed,
+    )
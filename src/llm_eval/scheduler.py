@@ -0,0 +1,85 @@
+from __future__ import annotations
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple, Union
+
+
+class WorkScheduler:
+    """Shared work queue over several deployments with per-deployment in-flight caps.
+
+    Each deployment contributes a stream of work items and a function to run them.
+    Items are dispatched round-robin into one thread pool, subject to the
+    deployment's own cap and a global in-flight budget (``max_in_flight``, default:
+    sum of caps). When a fast deployment runs out of work its share of the budget
+    is released to the remaining ones, so slow deployments end up with more
+    requests in flight, up to their cap.
+
+    A work function that raises marks its deployment as failed (see ``failures``);
+    no further items are dispatched for it and the others continue.
+    """
+
+    def __init__(
+        self,
+        caps: Union[int, Mapping[str, int]] = 1,
+        max_in_flight: Optional[int] = None,
+    ):
+        self.caps = caps
+        self.max_in_flight = max_in_flight
+        self.failures: Dict[str, BaseException] = {}
+
+    def cap(self, key: str) -> int:
+        if isinstance(self.caps, Mapping):
+            return max(1, int(self.caps.get(key, 1)))
+        return max(1, int(self.caps))
+
+    def run(
+        self,
+        work: Mapping[str, Tuple[Iterable[Any], Callable[[Any], Any]]],
+    ) -> Iterator[Tuple[str, int, Any]]:
+        """Yield ``(key, item_index, result)`` for every item, in completion order."""
+        keys = list(work)
+        streams = {k: enumerate(work[k][0]) for k in keys}
+        fns = {k: work[k][1] for k in keys}
+        caps = {k: self.cap(k) for k in keys}
+        budget = self.max_in_flight or sum(caps.values())
+        in_flight = {k: 0 for k in keys}
+        running: Dict[Future, Tuple[str, int]] = {}
+        active = list(keys)
+        turn = 0
+
+        with ThreadPoolExecutor(max_workers=max(1, budget)) as ex:
+            while True:
+                # Round-robin one item at a time so deployments share the budget fairly
+                stalled = 0
+                while active and len(running) < budget and stalled < len(active):
+                    turn %= len(active)
+                    key = active[turn]
+                    if in_flight[key] >= caps[key]:
+                        stalled += 1
+                        turn += 1
+                        continue
+                    nxt = next(streams[key], None)
+                    if nxt is None:
+                        active.remove(key)
+                        stalled = 0
+                        continue
+                    idx, item = nxt
+                    running[ex.submit(fns[key], item)] = (key, idx)
+                    in_flight[key] += 1
+                    stalled = 0
+                    turn += 1
+                if not running:
+                    return
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    key, idx = running.pop(fut)
+                    in_flight[key] -= 1
+                    exc = fut.exception()
+                    if exc is not None:
+                        if key not in self.failures:
+                            self.failures[key] = exc
+                        if key in active:
+                            active.remove(key)
+                        continue
+                    if key in self.failures:
+                        continue
+                    yield key, idx, fut.result()
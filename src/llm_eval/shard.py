@@ -0,0 +1,146 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+import json
+import os
+import zlib
+
+import numpy as np
+
+from .aggregate import RunningAggregate
+from .data import Segment
+from .metrics.engine import MetricStats, corpus_scores, segment_statistics
+
+# Multi-node scoring: each worker scores the segments of one shard (chosen by a stable
+# hash of the segment id, so every worker agrees without coordination) and writes a
+# partial aggregate next to its JSONL. Partials hold exact running sums and summed
+# metric sufficient statistics, so `merge` reproduces the single-process numbers
+# without reading any per-segment output.
+
+PARTIAL_VERSION = 1
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """``"i/N"`` -> ``(i, N)`` with ``0 <= i < N``."""
+    index, sep, count = spec.partition("/")
+    try:
+        i, n = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec!r}; expected i/N, e.g. 0/4") from None
+    if not sep or n < 1 or not 0 <= i < n:
+        raise ValueError(f"Invalid shard {spec!r}; expected i/N with 0 <= i < N")
+    return i, n
+
+
+def shard_of(seg_id: Any, count: int) -> int:
+    """Shard of a segment id; stable across processes and Python versions."""
+    return zlib.crc32(json.dumps(seg_id).encode("utf-8")) % count
+
+
+def select_shard(segments: Iterable[Segment], index: int, count: int) -> Iterator[Segment]:
+    return (seg for seg in segments if shard_of(seg.id, count) == index)
+
+
+class MetricTotals:
+    """Summed sufficient statistics of the segments passing through :meth:`observe`."""
+
+    def __init__(self, metrics: Sequence[str] = ("BLEU",), chunk_size: int = 10000):
+        self.metrics = tuple(metrics)
+        self.chunk_size = chunk_size
+        self.totals: Dict[str, np.ndarray] = {}
+        self.skipped = 0
+
+    def _add(self, hyps: List[str], refs: List[str]) -> None:
+        if not hyps:
+            return
+        tot = segment_statistics(hyps, refs, self.metrics).total()
+        for name, attr in (("BLEU", "bleu"), ("chrF", "chrf"), ("TER", "ter")):
+            value = getattr(tot, attr)
+            if value is not None:
+                self.totals[name] = self.totals.get(name, 0) + value[0]
+
+    def observe(self, segments: Iterable[Segment]) -> Iterator[Segment]:
+        """Pass ``segments`` through, accumulating statistics of those with a reference."""
+        hyps: List[str] = []
+        refs: List[str] = []
+        for seg in segments:
+            if seg.reference is None:
+                self.skipped += 1
+            else:
+                hyps.append(seg.hypothesis)
+                refs.append(seg.reference)
+                if len(hyps) >= self.chunk_size:
+                    self._add(hyps, refs)
+                    hyps, refs = [], []
+            yield seg
+        self._add(hyps, refs)
+
+    def to_partial(self) -> Dict[str, List[int]]:
+        return {name: [int(x) for x in value] for name, value in self.totals.items()}
+
+
+def metric_scores(totals: Mapping[str, Sequence[int]]) -> Dict[str, float]:
+    """Corpus scores from summed statistics as stored in partials."""
+    stats = MetricStats(size=1)
+    for name, attr in (("BLEU", "bleu"), ("chrF", "chrf"), ("TER", "ter")):
+        if name in totals:
+            setattr(stats, attr, np.asarray(totals[name], dtype=np.int64).reshape(1, -1))
+    return corpus_scores(stats)
+
+
+def write_partial(
+    path: str,
+    shard: Tuple[int, int],
+    aggregates: Mapping[str, RunningAggregate],
+    metrics: Optional[MetricTotals] = None,
+) -> None:
+    data = {
+        "version": PARTIAL_VERSION,
+        "shard": list(shard),
+        "models": {model: agg.to_partial() for model, agg in aggregates.items()},
+        "metrics": metrics.to_partial() if metrics is not None else {},
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def merge_partials(partials: Sequence[Dict[str, Any]], allow_missing: bool = False) -> Dict[str, Any]:
+    """Combine shard partials into ``score``-style output.
+
+    One model gives ``{"model", ...aggregate}``, several give ``{"models": {model:
+    {"aggregate"}}}``; corpus ``metrics`` and the merged ``shards`` are added to both.
+    Raises ``ValueError`` for mixed shard counts, duplicate shards or (unless
+    ``allow_missing``) missing ones.
+    """
+    if not partials:
+        raise ValueError("No partials to merge")
+    counts = {int(p["shard"][1]) for p in partials}
+    if len(counts) != 1:
+        raise ValueError(f"Partials come from different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indices = [int(p["shard"][0]) for p in partials]
+    duplicates = sorted({i for i in indices if indices.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate shards: {duplicates}")
+    missing = sorted(set(range(count)) - set(indices))
+    if missing and not allow_missing:
+        raise ValueError(f"Missing shards: {missing} of {count}")
+
+    aggs: Dict[str, RunningAggregate] = {}
+    totals: Dict[str, np.ndarray] = {}
+    for partial in sorted(partials, key=lambda p: p["shard"][0]):
+        for model, data in partial["models"].items():
+            aggs.setdefault(model, RunningAggregate()).merge(RunningAggregate.from_partial(data))
+        for name, values in (partial.get("metrics") or {}).items():
+            totals[name] = totals.get(name, 0) + np.asarray(values, dtype=np.int64)
+    info = {"count": count, "merged": sorted(indices), "missing": missing}
+    metrics = metric_scores(totals)
+    if len(aggs) == 1:
+        model, agg = next(iter(aggs.items()))
+        return {"model": model, **agg.to_dict(), "metrics": metrics, "shards": info}
+    return {
+        "models": {model: {"aggregate": agg.to_dict()} for model, agg in aggs.items()},
+        "metrics": metrics,
+        "shards": info,
+    }
@@ -0,0 +1,209 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import math
+
+import numpy as np
+
+# Significance and normalization for comparing deployments on the same segments.
+#
+# Every statistic works on a (systems x segments) score matrix restricted to the
+# segments all systems scored, so comparisons are paired. Bootstrap resamples are
+# drawn as per-segment multiplicity counts, and the resampled means of every system
+# come out of a single (resamples x segments) @ (segments x systems) product.
+
+
+def z_normalize(scores: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Standardize ``scores`` within each group label (NaN scores are ignored)."""
+    scores = np.asarray(scores, dtype=np.float64)
+    labels, inverse = np.unique(np.asarray(groups), return_inverse=True)
+    valid = ~np.isnan(scores)
+    values = np.where(valid, scores, 0.0)
+    counts = np.bincount(inverse, weights=valid, minlength=len(labels))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(inverse, weights=values, minlength=len(labels)) / counts
+        centered = np.where(valid, scores - mean[inverse], 0.0)
+        std = np.sqrt(np.bincount(inverse, weights=centered**2, minlength=len(labels)) / counts)
+        z = centered / std[inverse]
+    # A rater that gives every segment the same score carries no scale information
+    z = np.where(std[inverse] > 0, z, 0.0)
+    return np.where(valid, z, np.nan)
+
+
+def bootstrap_counts(
+    n: int, n_resamples: int, seed: Optional[int] = 0, block_size: int = 4_000_000
+) -> Iterable[np.ndarray]:
+    """Yield (b, n) blocks of resample multiplicities, ``n_resamples`` rows in total."""
+    rng = np.random.default_rng(seed)
+    rows = max(1, block_size // max(n, 1))
+    for start in range(0, n_resamples, rows):
+        b = min(rows, n_resamples - start)
+        idx = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+        yield np.bincount(idx.ravel(), minlength=b * n).reshape(b, n)
+
+
+def bootstrap_means(matrix: np.ndarray, n_resamples: int = 1000, seed: Optional[int] = 0) -> np.ndarray:
+    """Resampled means, shape (n_resamples, systems), using the same resamples for every system."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    n = matrix.shape[1]
+    if n == 0:
+        return np.full((n_resamples, matrix.shape[0]), np.nan)
+    blocks = [counts @ matrix.T for counts in bootstrap_counts(n, n_resamples, seed)]
+    return np.vstack(blocks) / n
+
+
+def percentile_interval(samples: np.ndarray, confidence: float = 0.95) -> Tuple[np.ndarray, np.ndarray]:
+    """Percentile interval of ``samples`` along axis 0."""
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def paired_bootstrap(
+    matrix: np.ndarray, n_resamples: int = 1000, confidence: float = 0.95, seed: Optional[int] = 0
+) -> Dict[str, np.ndarray]:
+    """Means, percentile CIs and all pairwise differences from one set of resamples.
+
+    ``delta[i, j]`` is ``mean[i] - mean[j]``; ``p_value[i, j]`` is the two-sided paired
+    bootstrap p-value for "no difference", comparing each resampled difference to the
+    resampled mean difference (as SacreBLEU's paired bootstrap does). Without segments
+    every statistic, p-values included, is NaN.
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float64))
+    means = matrix.mean(axis=1) if matrix.shape[1] else np.full(matrix.shape[0], np.nan)
+    samples = bootstrap_means(matrix, n_resamples, seed)
+    low, high = percentile_interval(samples, confidence)
+    # (R, S, S) resampled differences; S is the number of deployments, so this stays small
+    diffs = samples[:, :, None] - samples[:, None, :]
+    delta = means[:, None] - means[None, :]
+    extreme = np.abs(diffs - diffs.mean(axis=0)) >= np.abs(delta)[None, :, :]
+    p_value = (extreme.sum(axis=0) + 1) / (n_resamples + 1)
+    if not matrix.shape[1]:
+        p_value = np.full_like(delta, np.nan)
+    delta_low, delta_high = percentile_interval(diffs, confidence)
+    return {
+        "mean": means,
+        "ci_low": low,
+        "ci_high": high,
+        "delta": delta,
+        "delta_ci_low": delta_low,
+        "delta_ci_high": delta_high,
+        "p_value": p_value,
+    }
+
+
+def score_matrix(
+    records: Iterable[Dict[str, Any]], system_key: str = "model", rater_key: Optional[str] = None
+) -> Tuple[List[str], List[Any], np.ndarray, np.ndarray]:
+    """Collect scored records into paired (systems x common segments) matrices.
+
+    Returns ``(systems, ids, raw, z)``. ``z`` holds scores z-normalized per rater when
+    ``rater_key`` is given (records without it share one default rater), and over all
+    systems' scores together otherwise, so differences between systems survive the
+    normalization. Several records for one (system, id) are averaged; records without
+    a numeric score are skipped.
+    """
+    systems: List[str] = []
+    ids: List[Any] = []
+    sys_index: Dict[str, int] = {}
+    id_index: Dict[Any, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    values: List[float] = []
+    raters: List[str] = []
+    for rec in records:
+        score = rec.get("score")
+        if not isinstance(score, (int, float)) or isinstance(score, bool) or "error" in rec:
+            continue
+        system = str(rec.get(system_key))
+        if system not in sys_index:
+            sys_index[system] = len(systems)
+            systems.append(system)
+        seg_id = rec.get("id")
+        if seg_id not in id_index:
+            id_index[seg_id] = len(ids)
+            ids.append(seg_id)
+        rows.append(sys_index[system])
+        cols.append(id_index[seg_id])
+        values.append(float(score))
+        raters.append(str(rec.get(rater_key, "")) if rater_key else "")
+
+    shape = (len(systems), len(ids))
+    row_arr, col_arr = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    raw_values = np.asarray(values, dtype=np.float64)
+    z_values = z_normalize(raw_values, np.asarray(raters)) if values else raw_values
+
+    def mean_matrix(v: np.ndarray) -> np.ndarray:
+        sums, counts = np.zeros(shape), np.zeros(shape)
+        np.add.at(sums, (row_arr, col_arr), v)
+        np.add.at(counts, (row_arr, col_arr), 1)
+        with np.errstate(invalid="ignore"):
+            return sums / counts
+
+    raw, z = mean_matrix(raw_values), mean_matrix(z_values)
+    common = ~np.isnan(raw).any(axis=0)
+    return systems, [i for i, keep in zip(ids, common) if keep], raw[:, common], z[:, common]
+
+
+def _num(x: float) -> Optional[float]:
+    return None if math.isnan(x) else float(x)
+
+
+def compare(
+    records: Iterable[Dict[str, Any]],
+    n_resamples: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = 0,
+    system_key: str = "model",
+    rater_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Bootstrap CIs, z-normalized means and pairwise significance per system.
+
+    Only segments scored by every system are used. Pairwise entries also report the
+    Pearson correlation of the two systems' scores (the mean product of their
+    per-system z-scores over the shared segments).
+    """
+    if n_resamples < 1:
+        raise ValueError("compare needs at least one bootstrap resample")
+    systems, ids, raw, z = score_matrix(records, system_key=system_key, rater_key=rater_key)
+    n = len(ids)
+    out: Dict[str, Any] = {
+        "num_segments": n,
+        "num_resamples": n_resamples,
+        "confidence": confidence,
+        "z_normalization": rater_key or "all",
+        "models": [],
+        "pairwise": [],
+    }
+    if not systems:
+        return out
+    boot = paired_bootstrap(raw, n_resamples, confidence, seed)
+    z_boot = paired_bootstrap(z, n_resamples, confidence, seed)
+    for i, name in enumerate(systems):
+        out["models"].append(
+            {
+                "model": name,
+                "mean_score": _num(boot["mean"][i]),
+                "ci_low": _num(boot["ci_low"][i]),
+                "ci_high": _num(boot["ci_high"][i]),
+                "mean_z": _num(z_boot["mean"][i]),
+                "z_ci_low": _num(z_boot["ci_low"][i]),
+                "z_ci_high": _num(z_boot["ci_high"][i]),
+            }
+        )
+    own_z = z_normalize(raw.ravel(), np.repeat(np.arange(len(systems)), n)).reshape(raw.shape)
+    for i in range(len(systems)):
+        for j in range(i + 1, len(systems)):
+            out["pairwise"].append(
+                {
+                    "model_a": systems[i],
+                    "model_b": systems[j],
+                    "delta": _num(boot["delta"][i, j]),
+                    "ci_low": _num(boot["delta_ci_low"][i, j]),
+                    "ci_high": _num(boot["delta_ci_high"][i, j]),
+                    "p_value": _num(boot["p_value"][i, j]),
+                    "z_delta": _num(z_boot["delta"][i, j]),
+                    "z_p_value": _num(z_boot["p_value"][i, j]),
+                    "pearson": _num(float(np.mean(own_z[i] * own_z[j]))) if n else None,
+                }
+            )
+    return out
@@ -0,0 +1,249 @@
+from __future__ import annotations
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import json
+import os
+import threading
+
+# Per-request telemetry for the chat completion hot path.
+#
+# RateLimitedChat opens a record for each logical request (covering its retries) and
+# chat_completion fills in what it learns from the client; both find the record through
+# a thread-local, so the chat_fn protocol (text in, text out) stays unchanged. Totals
+# and fixed-bucket histograms are kept per deployment, so memory does not grow with
+# the number of requests unless individual records are asked for.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+@dataclass
+class RequestRecord:
+    deployment: str
+    endpoint: Optional[str] = None
+    queue_wait: float = 0.0
+    latency: float = 0.0
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    transforms: List[str] = field(default_factory=list)
+    retries: int = 0
+    error: Optional[str] = None
+
+
+class Histogram:
+    """Cumulative-style histogram with fixed upper bounds (Prometheus semantics)."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile ``q`` (None if empty or beyond the last bound)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {str(b): c for b, c in zip([*self.bounds, "+Inf"], self.counts)},
+        }
+
+
+class DeploymentStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.parse_errors = 0
+        self.deduplicated = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.transforms: Dict[str, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.completion_size = Histogram(TOKEN_BUCKETS)
+
+    def add(self, rec: RequestRecord) -> None:
+        self.requests += 1
+        self.errors += rec.error is not None
+        self.retries += rec.retries
+        self.prompt_tokens += rec.prompt_tokens or 0
+        self.completion_tokens += rec.completion_tokens or 0
+        self.cached_tokens += rec.cached_tokens or 0
+        for name in rec.transforms:
+            self.transforms[name] = self.transforms.get(name, 0) + 1
+        self.latency.observe(rec.latency)
+        self.queue_wait.observe(rec.queue_wait)
+        if rec.completion_tokens is not None:
+            self.completion_size.observe(rec.completion_tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "parse_errors": self.parse_errors,
+            "deduplicated": self.deduplicated,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_token_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else None,
+            "transforms": dict(self.transforms),
+            "latency_seconds": self.latency.to_dict(),
+            "queue_wait_seconds": self.queue_wait.to_dict(),
+            "completion_tokens_per_request": self.completion_size.to_dict(),
+        }
+
+
+class Telemetry:
+    """Thread-safe collector of :class:`RequestRecord` s, aggregated per deployment."""
+
+    def __init__(self, keep_records: bool = False):
+        self.keep_records = keep_records
+        self.records: List[RequestRecord] = []
+        self._stats: Dict[str, DeploymentStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def reset(self, keep_records: Optional[bool] = None) -> None:
+        with self._lock:
+            if keep_records is not None:
+                self.keep_records = keep_records
+            self.records = []
+            self._stats = {}
+
+    def current(self) -> Optional[RequestRecord]:
+        """The record of the request running on this thread, if any."""
+        return getattr(self._local, "record", None)
+
+    @contextmanager
+    def request(self, deployment: str) -> Iterator[RequestRecord]:
+        """Track one logical request; nested calls on the same thread share the outer record."""
+        outer = self.current()
+        if outer is not None:
+            yield outer
+            return
+        rec = RequestRecord(deployment=deployment)
+        self._local.record = rec
+        try:
+            yield rec
+        except BaseException as e:
+            rec.error = type(e).__name__
+            raise
+        finally:
+            self._local.record = None
+            self.add(rec)
+
+    def add(self, rec: RequestRecord) -> None:
+        with self._lock:
+            self._stats.setdefault(rec.deployment, DeploymentStats()).add(rec)
+            if self.keep_records:
+                self.records.append(rec)
+
+    def parse_error(self, deployment: str) -> None:
+        with self._lock:
+            self._stats.setdefault(deployment, DeploymentStats()).parse_errors += 1
+
+    def deduplicated(self, deployment: str, n: int = 1) -> None:
+        """Count segments answered from an identical triplet instead of a request."""
+        with self._lock:
+            self._stats.setdefault(deployment, DeploymentStats()).deduplicated += n
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {dep: stats.to_dict() for dep, stats in self._stats.items()}
+
+    def write_json(self, path: str) -> None:
+        with self._lock:
+            records = [asdict(r) for r in self.records] if self.keep_records else None
+        data: Dict[str, Any] = {"deployments": self.summary()}
+        if records is not None:
+            data["requests"] = records
+        _atomic_write(path, json.dumps(data, indent=2))
+
+    def write_prometheus(self, path: str, prefix: str = "llm_eval") -> None:
+        """Write a Prometheus textfile-collector file (replaced atomically)."""
+        _atomic_write(path, self.prometheus_text(prefix))
+
+    def prometheus_text(self, prefix: str = "llm_eval") -> str:
+        with self._lock:
+            stats = dict(self._stats)
+        lines: List[str] = []
+
+        def counter(name: str, help_text: str, attr: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for dep, s in stats.items():
+                lines.append(f'{prefix}_{name}{{deployment="{_escape(dep)}"}} {getattr(s, attr)}')
+
+        counter("requests_total", "Chat completion requests.", "requests")
+        counter("request_errors_total", "Requests that failed after retries.", "errors")
+        counter("retries_total", "Retried attempts (throttling and transient errors).", "retries")
+        counter("parse_errors_total", "Responses that could not be parsed as a judgment.", "parse_errors")
+        counter("deduplicated_total", "Segments reusing the judgment of an identical triplet.", "deduplicated")
+        lines.append(f"# HELP {prefix}_tokens_total Token usage reported by the service.")
+        lines.append(f"# TYPE {prefix}_tokens_total counter")
+        for dep, s in stats.items():
+            for kind in ("prompt", "completion", "cached"):
+                value = getattr(s, f"{kind}_tokens")
+                lines.append(f'{prefix}_tokens_total{{deployment="{_escape(dep)}",kind="{kind}"}} {value}')
+        lines.append(f"# HELP {prefix}_transforms_total Adaptive request-shape transforms applied.")
+        lines.append(f"# TYPE {prefix}_transforms_total counter")
+        for dep, s in stats.items():
+            for name, value in s.transforms.items():
+                labels = f'deployment="{_escape(dep)}",transform="{_escape(name)}"'
+                lines.append(f"{prefix}_transforms_total{{{labels}}} {value}")
+        for name, help_text, attr in (
+            ("request_latency_seconds", "Network latency per request.", "latency"),
+            ("queue_wait_seconds", "Time spent waiting for rate-limit budget.", "queue_wait"),
+            ("completion_tokens", "Completion tokens per request.", "completion_size"),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} histogram")
+            for dep, s in stats.items():
+                h: Histogram = getattr(s, attr)
+                dep_label = f'deployment="{_escape(dep)}"'
+                cumulative = 0
+                for bound, n in zip([*h.bounds, "+Inf"], h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_{name}_bucket{{{dep_label},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_{name}_sum{{{dep_label}}} {h.sum}")
+                lines.append(f"{prefix}_{name}_count{{{dep_label}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _atomic_write(path: str, text: str) -> None:
+    path = os.path.expanduser(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+TELEMETRY = Telemetry()
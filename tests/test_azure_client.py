@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from llm_eval import azure_client
+from llm_eval.azure_client import CapabilityProfiles, ClientConfig, ClientPool
+
+
+class ShapeStrictClient:
+    """Rejects max_tokens and temperature the way o-series deployments do."""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.requests.append(dict(kwargs))
+        if "max_tokens" in kwargs:
+            raise RuntimeError(
+                "Unsupported parameter: 'max_tokens' is not supported with this model. "
+                "Use 'max_completion_tokens' instead."
+            )
+        if "temperature" in kwargs:
+            raise RuntimeError("Unsupported value: 'temperature' does not support 0.0 with this model.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))])
+
+
+def test_learned_shape_is_reused(monkeypatch):
+    client = ShapeStrictClient()
+    monkeypatch.setattr(azure_client, "get_client", lambda *a, **k: client)
+    monkeypatch.setattr(azure_client, "PROFILES", CapabilityProfiles())
+
+    azure_client.chat_completion("o3-mini", "sys", "user")
+    assert len(client.requests) == 3
+    azure_client.chat_completion("o3-mini", "sys", "user")
+    assert len(client.requests) == 4
+    last = client.requests[-1]
+    assert "max_completion_tokens" in last and "temperature" not in last
+    # Other deployments are unaffected
+    assert "max_tokens" in azure_client.build_request("gpt-4.1", "s", "u")
+
+
+def test_profiles_round_trip(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    profiles = CapabilityProfiles()
+    profiles.record("o3", "https://a/", ["max_tokens->max_completion_tokens", "drop-temperature"])
+    profiles.save(path)
+    loaded = CapabilityProfiles()
+    loaded.load(path)
+    assert loaded.get("o3", "https://a/") == ["max_tokens->max_completion_tokens", "drop-temperature"]
+    assert loaded.get("o3", "https://b/") == []
+
+
+def test_client_pool_reuses_one_client_per_endpoint(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://default.example/openai/v1/")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "key")
+    pool = ClientPool(ClientConfig(max_connections=7))
+    default = pool.get()
+    assert pool.get() is default
+    other = pool.get("https://other.example/openai/v1/")
+    assert other is not default
+    assert str(other.base_url) == "https://other.example/openai/v1/"
+    pool.close()
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval import batch
+from llm_eval.azure_client import PROFILES, chat_completion
+from llm_eval.benchmark import pointed_at, synthetic_segments
+from llm_eval.cli import app
+from llm_eval.evaluator import LLMScorer
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+
+
+def test_shards_respect_request_and_byte_limits(tmp_path):
+    segs = synthetic_segments(25)
+    job = batch.write_shards(segs, str(tmp_path / "job.json"), "m", max_requests=10)
+    assert [s.num_requests for s in job.shards] == [10, 10, 5]
+    line_bytes = job.shards[0].bytes // 10
+    job = batch.write_shards(segs, str(tmp_path / "job2.json"), "m", max_bytes=int(line_bytes * 4.5))
+    assert all(s.bytes <= line_bytes * 4.5 for s in job.shards)
+    assert sum(s.num_requests for s in job.shards) == 25
+    with pytest.raises(ValueError):
+        batch.write_shards(segs, str(tmp_path / "job3.json"), "m", max_bytes=10)
+
+
+def test_request_lines_use_prompt_template_and_learned_shape(tmp_path, monkeypatch):
+    monkeypatch.setattr(PROFILES, "_profiles", {})
+    seg = synthetic_segments(1)[0]
+    scorer = LLMScorer(deployment="o3", cache=None)
+    PROFILES.record("o3", None, ["max_tokens->max_completion_tokens", "drop-temperature"])
+    line = batch.request_line(seg, "o3", scorer.template, scorer.gen_params)
+    prompt = scorer.template.build(seg.source, seg.hypothesis, seg.reference)
+    assert line["custom_id"] == "0" and line["url"] == batch.BATCH_ENDPOINT
+    assert line["body"]["messages"][1]["content"] == prompt["user"]
+    assert line["body"]["max_completion_tokens"] == 1024 and "temperature" not in line["body"]
+
+
+def test_submit_status_collect_against_fake_server(tmp_path):
+    segs = synthetic_segments(30)
+    config = FakeServerConfig(batch_polls=1, reject_params=("temperature",))
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        job = batch.write_shards(segs, str(tmp_path / "job.json"), "m", max_requests=12)
+        batch.submit(job)
+        assert [s.status for s in job.shards] == ["validating"] * 3
+        batch.refresh(job)
+        assert not job.done and {s.status for s in job.shards} == {"in_progress"}
+        batch.wait(job, poll_interval=0)
+        assert job.done and job.shards[0].request_counts == {"total": 12, "completed": 0, "failed": 12}
+        # Every line carried temperature, which this "deployment" rejects
+        results = list(batch.iter_results(batch.BatchJob.load(job.path)))
+    assert [r["id"] for r in results] == list(range(30))
+    assert all("temperature" in r["error"] for r in results)
+
+
+def test_cli_batch_round_trip_matches_interactive_scores(tmp_path):
+    segs = synthetic_segments(20)
+    data = tmp_path / "data.tsv"
+    data.write_text("".join(f"{s.source}\t{s.reference}\t{s.hypothesis}\n" for s in segs), encoding="utf-8")
+    job, output = tmp_path / "job.json", tmp_path / "scores.jsonl"
+    runner = CliRunner()
+    common = ["--profile-cache", ""]
+    with FakeOpenAIServer(FakeServerConfig(batch_polls=2, batch_max_requests=8)) as server, pointed_at(server):
+        result = runner.invoke(app, ["batch", "submit", "--data", str(data), "--job", str(job), "--deployment", "m",
+                                     "--max-requests", "8", *common])
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output)["num_shards"] == 3
+        result = runner.invoke(app, ["batch", "collect", "--job", str(job)])
+        assert result.exit_code == 1 and "still running" in result.output
+        result = runner.invoke(app, ["batch", "status", "--job", str(job)])
+        assert json.loads(result.output)["statuses"] == {"in_progress": 3}
+        result = runner.invoke(app, ["batch", "collect", "--job", str(job), "--output", str(output), "--wait",
+                                     "--poll-interval", "0"])
+        assert result.exit_code == 0, result.output
+        interactive = LLMScorer(deployment="m", cache=None).score(segs, _chat_fn=chat_completion)
+    summary = json.loads(result.output)
+    assert summary["model"] == "m" and summary["num_scored"] == 20
+    assert summary["mean_score"] == pytest.approx(interactive["aggregate"]["mean_score"])
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [r["score"] for r in rows] == [s["score"] for s in interactive["segments"]]
@@ -0,0 +1,53 @@
+import json
+import re
+
+from llm_eval.data import Segment
+from llm_eval.evaluator import LLMScorer
+from llm_eval.prompting import PromptTemplate, parse_batch_scores
+
+
+def test_parse_batch_scores_maps_ids_and_drops_bad_entries():
+    raw = json.dumps(
+        [
+            {"id": 1, "score": 90, "adequacy": 5, "fluency": 5, "rationale": "good"},
+            {"id": "2", "score": 40, "adequacy": 2, "fluency": 3, "rationale": "meh"},
+            {"id": 3, "adequacy": 2},  # no score
+            {"id": 4, "score": "n/a"},  # malformed
+            {"id": 99, "score": 10},  # unknown id
+            {"id": 5, "score": 1},
+            {"id": 5, "score": 2},  # ambiguous duplicate
+        ]
+    )
+    parsed = parse_batch_scores("```json\n" + raw + "\n```", ids=[1, 2, 3, 4, 5])
+    assert sorted(parsed) == [1, 2]
+    assert parsed[1]["score"] == 90.0 and parsed[1]["rationale"] == "good"
+    assert parsed[2]["fluency"] == 3.0
+    assert parse_batch_scores("no array", ids=[1]) == {}
+
+
+def test_build_batch_lists_every_segment():
+    prompt = PromptTemplate().build_batch([(7, "a", "b", "c"), (8, "d", "e", None)])
+    assert "[id=7]" in prompt["user"] and "[id=8]" in prompt["user"]
+    assert "Reference: c" in prompt["user"]
+
+
+def test_batched_scoring_rescored_missing_individually():
+    calls = []
+
+    def fake_chat_completion(deployment: str, system: str, user: str, **_: object) -> str:
+        calls.append(user)
+        ids = [int(i) for i in re.findall(r"\[id=(\d+)\]", user)]
+        if ids:
+            # Drop the last id of every batch to force a single-segment retry
+            return json.dumps([{"id": i, "score": i, "adequacy": 1, "fluency": 1} for i in ids[:-1]])
+        hyp = re.search(r"Hypothesis: h(\d+)", user).group(1)
+        return '{"score": %s, "adequacy": 1, "fluency": 1}' % hyp
+
+    segs = [Segment(id=i, source=f"s{i}", hypothesis=f"h{i}") for i in range(7)]
+    scorer = LLMScorer(deployment="m")
+    result = scorer.score(segs, _chat_fn=fake_chat_completion, segments_per_request=3, concurrency=2)
+    assert [r["id"] for r in result["segments"]] == list(range(7))
+    assert [r["score"] for r in result["segments"]] == [float(i) for i in range(7)]
+    # Two packed requests plus one retry each; the trailing lone segment goes out singly
+    assert len(calls) == 2 + 2 + 1
+    assert result["aggregate"]["mean_score"] == 3.0
@@ -0,0 +1,59 @@
+import time
+
+from llm_eval.cache import JudgmentCache, cache_key
+from llm_eval.data import Segment
+from llm_eval.evaluator import LLMScorer
+from llm_eval.prompting import PromptTemplate
+
+
+def _counting_fake(calls: list):
+    def fake_chat_completion(deployment: str, system: str, user: str, **_: object) -> str:
+        calls.append(user)
+        return '{"score": 70, "adequacy": 4, "fluency": 4, "rationale": "ok"}'
+
+    return fake_chat_completion
+
+
+def test_cache_hit_skips_request(tmp_path):
+    cache = JudgmentCache(str(tmp_path / "cache.sqlite3"))
+    segs = [Segment(id=i, source="src", hypothesis=f"hyp {i}", reference="ref") for i in range(3)]
+    calls: list = []
+    first = LLMScorer(deployment="m", cache=cache).score(segs, _chat_fn=_counting_fake(calls))
+    assert len(calls) == 3 and cache.stats()["misses"] == 3
+    cache.close()
+
+    reopened = JudgmentCache(str(tmp_path / "cache.sqlite3"))
+    second = LLMScorer(deployment="m", cache=reopened).score(segs, _chat_fn=_counting_fake(calls))
+    assert len(calls) == 3
+    assert reopened.stats()["hits"] == 3
+    assert second == first
+
+
+def test_malformed_response_not_cached(tmp_path):
+    cache = JudgmentCache(str(tmp_path / "cache.sqlite3"))
+    scorer = LLMScorer(deployment="m", cache=cache)
+    seg = Segment(id=0, source="a", hypothesis="b")
+    scorer.score_segment(seg, _chat_fn=lambda **_: "not json")
+    assert cache.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+    assert scorer.score_segment(seg, _chat_fn=_counting_fake([]))["score"] == 70.0
+
+
+def test_key_covers_deployment_template_and_params():
+    base = cache_key("m", PromptTemplate(), {"temperature": 0.0}, "s", "h", "r")
+    assert base == cache_key("m", PromptTemplate(), {"temperature": 0.0}, "s", "h", "r")
+    assert base != cache_key("other", PromptTemplate(), {"temperature": 0.0}, "s", "h", "r")
+    assert base != cache_key("m", PromptTemplate(name="v2"), {"temperature": 0.0}, "s", "h", "r")
+    assert base != cache_key("m", PromptTemplate(), {"temperature": 0.5}, "s", "h", "r")
+    assert base != cache_key("m", PromptTemplate(), {"temperature": 0.0}, "s", "h", None)
+
+
+def test_eviction_by_size_and_age(tmp_path):
+    cache = JudgmentCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for i in range(4):
+        cache.put(f"k{i}", "{}")
+        time.sleep(0.01)
+    assert cache.evict() == 2
+    assert cache.get("k0") is None and cache.get("k3") == "{}"
+
+    aged = JudgmentCache(str(tmp_path / "cache.sqlite3"), max_age_days=-1)
+    assert aged.get("k3") is None
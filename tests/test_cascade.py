@@ -0,0 +1,104 @@
+import json
+import re
+
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.cascade import cascade_score
+from llm_eval.cli import app
+from llm_eval.data import Segment
+
+# Cheap judge scores per hypothesis; the expensive judge always answers 55
+CHEAP = {"great": 95, "awful": 5, "unsure": 50, "split": 80}
+
+
+def fake_chat(deployment, system, user, **_):
+    hyp = re.search(r"Hypothesis: (\w+)", user).group(1)
+    if deployment == "big":
+        score = 55
+    elif hyp == "broken" and deployment == "mini":
+        raise RuntimeError("boom")
+    else:
+        score = CHEAP.get(hyp, 90)
+        if hyp == "split" and deployment == "mini2":
+            score = 20
+    return '{"score": %d, "adequacy": 1, "fluency": 1, "rationale": "r"}' % score
+
+
+def _segs(*hyps):
+    return [Segment(id=i, source="s", hypothesis=h, reference="r") for i, h in enumerate(hyps)]
+
+
+def test_only_uncertain_segments_are_escalated():
+    calls = []
+
+    def chat(deployment, **kw):
+        calls.append(deployment)
+        return fake_chat(deployment, **kw)
+
+    out = cascade_score(_segs("great", "awful", "unsure", "broken"), "big", cheap_deployments=["mini"], chat_fn=chat)
+    tiers = [s["tier"] for s in out["segments"]]
+    assert tiers == ["cheap", "cheap", "expensive", "expensive"]
+    assert [s["score"] for s in out["segments"]] == [95, 5, 55, 55]
+    assert out["segments"][0]["cheap_scores"] == {"mini": 95.0}
+    assert out["segments"][0]["judged_by"] == ["mini"] and out["segments"][2]["judged_by"] == ["big"]
+    assert "rationale" not in out["segments"][0] and "adequacy" not in out["segments"][0]
+    assert calls.count("big") == 2 == out["cascade"]["expensive_calls"]
+    assert out["cascade"]["escalation_rate"] == 0.5
+    assert out["aggregate"]["mean_score"] == pytest.approx((95 + 5 + 55 + 55) / 4)
+
+
+def test_disagreeing_cheap_judges_escalate():
+    out = cascade_score(_segs("great", "split"), "big", cheap_deployments=["mini", "mini2"], chat_fn=fake_chat)
+    assert [s["tier"] for s in out["segments"]] == ["cheap", "expensive"]
+    assert out["segments"][1]["cheap_scores"] == {"mini": 80.0, "mini2": 20.0}
+
+
+def test_metric_tier_and_audit_sample():
+    segs = [
+        Segment(id=0, source="s", hypothesis="the cat sat on the mat", reference="the cat sat on the mat"),
+        Segment(id=1, source="s", hypothesis="xyz", reference="the cat sat on the mat"),
+        Segment(id=2, source="s", hypothesis="the cat sat", reference="the cat sat on the mat"),
+        Segment(id=3, source="s", hypothesis="no reference", reference=None),
+    ]
+    out = cascade_score(segs, "big", cheap_metric="chrF", band=(20, 80), audit_rate=1.0, chat_fn=fake_chat)
+    by_id = {s["id"]: s for s in out["segments"]}
+    assert by_id[0]["tier"] == "cheap" and by_id[0]["score"] == pytest.approx(100.0)
+    assert by_id[1]["tier"] == "cheap" and by_id[1]["score"] < 20
+    assert by_id[2]["tier"] == "expensive"
+    assert by_id[3]["tier"] == "expensive" and by_id[3]["cheap_scores"] == {"chrF": None}
+    # Settled segments were audited: they keep the cheap score but record the expensive one
+    assert by_id[0]["audit_score"] == 55
+    assert out["cascade"]["agreement"]["num_audited"] == 2
+    assert out["cascade"]["expensive_calls"] == 4
+    with pytest.raises(ValueError):
+        cascade_score(segs, "big")
+
+
+def test_cli_cascade_writes_tiers(tmp_path, monkeypatch):
+    monkeypatch.setattr("llm_eval.cli.chat_completion", fake_chat)
+    out = tmp_path / "scores.jsonl"
+    result = CliRunner().invoke(
+        app,
+        ["score", "--data", "data/sample.tsv", "--deployment", "big", "--no-cache", "--cascade-cheap", "chrF",
+         "--cascade-band", "0,60", "--output", str(out), "--jsonl", "--profile-cache", str(tmp_path / "p.json")],
+    )
+    assert result.exit_code == 0, result.output
+    summary = json.loads(result.output)
+    assert summary["model"] == "big" and summary["cascade"]["cheap_judges"] == ["chrF"]
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert rows[0]["tier"] == "cheap" and rows[0]["score"] == pytest.approx(100.0)
+    assert {r["tier"] for r in rows} == {"cheap", "expensive"}
+
+
+def test_cli_cascade_rejects_resume_and_keeps_existing_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr("llm_eval.cli.chat_completion", fake_chat)
+    out = tmp_path / "scores.jsonl"
+    journal = tmp_path / "scores.jsonl.journal.jsonl"
+    journal.write_text('{"id": 0, "model": "big", "score": 1}\n', encoding="utf-8")
+    args = ["score", "--data", "data/sample.tsv", "--deployment", "big", "--no-cache", "--cascade-cheap", "chrF",
+            "--output", str(out), "--profile-cache", ""]
+    rejected = CliRunner().invoke(app, [*args, "--resume"])
+    assert rejected.exit_code == 1 and "--cascade-cheap" in rejected.output
+    assert CliRunner().invoke(app, args).exit_code == 0
+    assert journal.read_text(encoding="utf-8") == '{"id": 0, "model": "big", "score": 1}\n'
@@ -0,0 +1,52 @@
+import random
+import threading
+import time
+
+from llm_eval.data import Segment
+from llm_eval.evaluator import LLMScorer, score_multiple
+
+
+def _make_fake(max_seen: list):
+    lock = threading.Lock()
+    in_flight = [0]
+
+    def fake_chat_completion(deployment: str, system: str, user: str, **_: object) -> str:
+        with lock:
+            in_flight[0] += 1
+            max_seen[0] = max(max_seen[0], in_flight[0])
+        try:
+            time.sleep(random.uniform(0, 0.01))
+            # Echo a score derived from the prompt so ordering mistakes are visible
+            return '{"score": %d, "adequacy": 3, "fluency": 3, "rationale": "ok"}' % (len(user) % 101)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    return fake_chat_completion
+
+
+def _segments(n: int):
+    return [Segment(id=i, source="s" * i, hypothesis="h", reference="r") for i in range(n)]
+
+
+def test_concurrent_score_matches_sequential():
+    segs = _segments(40)
+    scorer = LLMScorer(deployment="fake")
+    max_seen = [0]
+    fake = _make_fake(max_seen)
+    sequential = scorer.score(segs, _chat_fn=fake)
+    concurrent = scorer.score(segs, concurrency=5, _chat_fn=fake)
+    assert [r["id"] for r in concurrent["segments"]] == list(range(40))
+    assert concurrent["segments"] == sequential["segments"]
+    assert concurrent["aggregate"] == sequential["aggregate"]
+    assert 1 < max_seen[0] <= 5
+
+
+def test_score_multiple_concurrency_keeps_order():
+    segs = _segments(20)
+    results = score_multiple(
+        segs, deployments=["a", "b"], parallel=False, chat_fn=_make_fake([0]), concurrency=4
+    )
+    for block in results["models"].values():
+        assert [r["id"] for r in block["segments"]] == list(range(20))
+        assert block["aggregate"]["num_scored"] == 20
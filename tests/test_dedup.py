@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from llm_eval.azure_client import chat_completion
+from llm_eval.benchmark import pointed_at
+from llm_eval.data import Segment
+from llm_eval.evaluator import LLMScorer
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+from llm_eval.prompting import PromptTemplate
+from llm_eval.telemetry import TELEMETRY
+
+
+def _segments():
+    # Systems often produce the same output: ids 0/2/4 and 1/5 share triplets
+    hyps = ["same", "other", "same", "unique", "same", "other"]
+    return [Segment(id=i, source="src", hypothesis=h, reference="ref") for i, h in enumerate(hyps)]
+
+
+class CountingChat:
+    def __init__(self):
+        self.users = []
+        self._lock = threading.Lock()
+
+    def __call__(self, deployment, system, user, **_):
+        with self._lock:
+            self.users.append(user)
+        if "[id=" in user:
+            ids = [line[4:-1] for line in user.splitlines() if line.startswith("[id=")]
+            return "[" + ",".join('{"id": %s, "score": %d}' % (i, len(user) % 50) for i in ids) + "]"
+        return '{"score": %d, "adequacy": 1, "fluency": 1, "rationale": "ok"}' % len(user)
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_identical_triplets_are_judged_once(concurrency):
+    chat = CountingChat()
+    TELEMETRY.reset()
+    out = LLMScorer(deployment="m", cache=None).score(_segments(), concurrency=concurrency, _chat_fn=chat)
+    assert len(chat.users) == 3
+    segs = out["segments"]
+    assert [s["id"] for s in segs] == list(range(6))
+    assert segs[0]["score"] == segs[2]["score"] == segs[4]["score"]
+    assert segs[1]["score"] == segs[5]["score"]
+    assert TELEMETRY.summary()["m"]["deduplicated"] == 3
+
+
+def test_dedup_in_packed_requests_and_opt_out():
+    chat = CountingChat()
+    out = LLMScorer(deployment="m", cache=None).score(_segments(), _chat_fn=chat, segments_per_request=3)
+    # First pack holds "same"/"other" (its second "same" is a copy); second pack only "unique"
+    assert chat.users[0].count("[id=") == 2 and len(chat.users) == 2
+    assert [s["id"] for s in out["segments"]] == list(range(6))
+    assert out["segments"][4]["score"] == out["segments"][0]["score"]
+
+    chat = CountingChat()
+    LLMScorer(deployment="m", cache=None, dedup=False).score(_segments(), _chat_fn=chat)
+    assert len(chat.users) == 6
+
+
+def test_failed_judgment_is_shared_with_copies():
+    def failing(**_):
+        raise RuntimeError("boom")
+
+    results = list(LLMScorer(deployment="m", cache=None).iter_score(_segments(), _chat_fn=failing, record_errors=True))
+    assert [r["id"] for r in results] == list(range(6))
+    assert all(r["error"] == "boom" for r in results)
+    with pytest.raises(RuntimeError):
+        LLMScorer(deployment="m", cache=None).score(_segments(), concurrency=3, _chat_fn=failing)
+
+
+def test_static_instructions_precede_segment_fields():
+    template = PromptTemplate()
+    prompts = [template.build("s1", "h1", "r1"), template.build("other source", "h2", None)]
+    for prompt in prompts:
+        assert (prompt["system"] + "\n" + prompt["user"]).startswith(template.static_prefix)
+    assert "IMPORTANT" in template.static_prefix
+    assert template.batch_user_template.index("IMPORTANT") < template.batch_user_template.index("{segments}")
+
+
+def test_cached_token_rate_is_reported():
+    config = FakeServerConfig(cache_min_tokens=32, cache_block_tokens=16)
+    TELEMETRY.reset()
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        LLMScorer(deployment="m", cache=None).score(_segments(), _chat_fn=chat_completion)
+    stats = TELEMETRY.summary()["m"]
+    assert stats["cached_tokens"] > 0
+    assert 0 < stats["cached_token_rate"] < 1
@@ -0,0 +1,152 @@
+import builtins
+import json
+import math
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.benchmark import pointed_at
+from llm_eval.cli import app
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+from llm_eval.metrics.embedding import AzureEmbeddingBackend, EmbeddingCache, embedding_similarity, text_key
+from llm_eval.ratelimit import RetryPolicy
+
+
+class CountingBackend:
+    """Deterministic per-text vectors; records every text it is asked to embed."""
+
+    name = "counting"
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack(
+            [np.random.default_rng(sum(map(ord, t)) + len(t)).normal(size=self.dim) for t in texts]
+        ).astype(np.float32)
+
+    @property
+    def embedded(self):
+        return [t for call in self.calls for t in call]
+
+
+def test_cache_round_trip_and_reopen(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    keys = [text_key(t) for t in ("a", "b", "a")]
+    vectors = np.arange(9, dtype=np.float32).reshape(3, 3)
+    assert cache.add(keys, vectors) == [0, 1, 0]
+    reopened = EmbeddingCache(str(tmp_path))
+    assert len(reopened) == 2 and reopened.dim == 3
+    assert reopened.rows([text_key("b"), text_key("c")]) == [1, None]
+    assert np.array_equal(reopened.vectors([1, 0]), vectors[[1, 0]])
+    with pytest.raises(ValueError):
+        reopened.add([text_key("c")], np.zeros((1, 4)))
+
+
+def test_cache_rows_stay_correct_after_interrupted_write(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.add([text_key("a"), text_key("b")], np.array([[1, 1], [2, 2]], dtype=np.float32))
+    # A crash after the vector was written but before its key: an orphan row, plus half a key record
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(np.array([9, 9], dtype=np.float32).tobytes() + b"\x00\x00")
+    with open(tmp_path / "keys.bin", "ab") as f:
+        f.write(text_key("x")[:5])
+    other = EmbeddingCache(str(tmp_path))
+    (row,) = other.add([text_key("c")], np.array([[5, 5]], dtype=np.float32))
+    assert other.vectors([row]).tolist() == [[5, 5]]
+    # Appends from another cache instance (process) are picked up, not overwritten
+    cache.add([text_key("d")], np.array([[7, 7]], dtype=np.float32))
+    reopened = EmbeddingCache(str(tmp_path))
+    rows = reopened.rows([text_key(t) for t in "abcd"])
+    assert reopened.vectors(rows).tolist() == [[1, 1], [2, 2], [5, 5], [7, 7]]
+    assert reopened.rows([text_key("x")]) == [None]
+
+
+def test_cache_add_parses_only_new_key_records(tmp_path, monkeypatch):
+    read = []
+    real_open = builtins.open
+
+    def spying_open(path, mode="r", *args, **kwargs):
+        f = real_open(path, mode, *args, **kwargs)
+        if str(path).endswith("keys.bin") and "r" in mode:
+            real_read = f.read
+            f.read = lambda *a: read.append(len(data := real_read(*a))) or data
+        return f
+
+    cache = EmbeddingCache(str(tmp_path))
+    monkeypatch.setattr("llm_eval.metrics.embedding.open", spying_open, raising=False)
+    for batch in range(20):
+        keys = [text_key(f"{batch}-{i}") for i in range(50)]
+        cache.add(keys, np.ones((50, 4)))
+    assert sum(read) == 0 and len(cache) == 1000
+    other = EmbeddingCache(str(tmp_path))  # another process appends 50 more
+    other.add([text_key(f"x{i}") for i in range(50)], np.ones((50, 4)))
+    read.clear()
+    cache.add([text_key("y")], np.ones((1, 4)))
+    assert sum(read) == 50 * 24 and len(cache) == 1051
+
+
+def test_each_text_embedded_once_and_cached_across_runs(tmp_path):
+    backend = CountingBackend()
+    hyps = ["x", "y", "x", "same"]
+    refs = ["r", "y", "r", "same"]
+    srcs = ["s", "s", "s", "t"]
+    first = embedding_similarity(hyps, refs, srcs, backend=backend, cache=EmbeddingCache(str(tmp_path)), batch_size=2)
+    assert sorted(backend.embedded) == sorted({*hyps, *refs, *srcs})
+    assert all(len(call) <= 2 for call in backend.calls)
+    assert first["embedding"] == {"texts": 6, "embedded": 6, "cached": 0}
+
+    second = embedding_similarity(hyps, refs, srcs, backend=backend, cache=EmbeddingCache(str(tmp_path)))
+    assert len(backend.embedded) == 6 and second["embedding"]["cached"] == 6
+    for metric in ("EMB", "EMB-src"):
+        np.testing.assert_allclose(second["sentence"][metric], first["sentence"][metric])
+
+
+def test_cosine_matches_numpy_and_missing_references_are_nan():
+    backend = CountingBackend()
+    hyps, refs, srcs = ["h1", "h2", "h3"], ["r1", None, "h3"], ["s1", "s2", "s3"]
+    out = embedding_similarity(hyps, refs, srcs, backend=backend)
+
+    def cos(a, b):
+        va, vb = backend([a])[0].astype(float), backend([b])[0].astype(float)
+        return va @ vb / (np.linalg.norm(va) * np.linalg.norm(vb))
+
+    assert None not in backend.embedded and "" not in backend.embedded
+    emb = out["sentence"]["EMB"]
+    assert emb[0] == pytest.approx(cos("h1", "r1")) and math.isnan(emb[1]) and emb[2] == pytest.approx(1.0)
+    assert out["corpus"]["EMB"] == pytest.approx((emb[0] + emb[2]) / 2)
+    expected = [cos(h, s) for h, s in zip(hyps, srcs)]
+    np.testing.assert_allclose(out["sentence"]["EMB-src"], expected, rtol=1e-6)
+
+
+def test_cli_embedding_metrics_against_fake_server(tmp_path):
+    sentence = tmp_path / "sentence.jsonl"
+    args = ["metrics", "--data", "data/sample.tsv", "--metrics", "BLEU,EMB,EMB-src",
+            "--embedding-cache", str(tmp_path / "emb"), "--embedding-deployment", "emb",
+            "--sentence-output", str(sentence)]
+    with FakeOpenAIServer() as server, pointed_at(server):
+        result = CliRunner().invoke(app, args)
+        assert result.exit_code == 0, result.output
+        assert server.stats.requests == 1
+        again = CliRunner().invoke(app, args)
+        assert again.exit_code == 0, again.output
+        assert server.stats.requests == 1
+    corpus = json.loads(result.stdout)
+    assert set(corpus) == {"BLEU", "EMB", "EMB-src"}
+    assert json.loads(again.stdout) == corpus
+    assert 0.0 <= corpus["EMB-src"] < corpus["EMB"] <= 1.0
+    rows = [json.loads(line) for line in sentence.read_text(encoding="utf-8").splitlines()]
+    assert rows[0]["EMB"] == pytest.approx(1.0)
+
+
+def test_azure_backend_retries_throttled_requests():
+    texts = [f"text number {i}" for i in range(40)]
+    config = FakeServerConfig(rate_429=0.5, retry_after=0.0, seed=1)
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        backend = AzureEmbeddingBackend("emb", retry=RetryPolicy(max_retries=20))
+        out = embedding_similarity(texts, sources=texts, backend=backend, batch_size=4)
+        assert server.stats.status[429] > 0 and server.stats.status[200] == 10
+    np.testing.assert_allclose(out["sentence"]["EMB-src"], 1.0, rtol=1e-6)
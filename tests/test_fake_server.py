@@ -0,0 +1,73 @@
+import pytest
+
+from llm_eval.azure_client import PROFILES, chat_completion
+from llm_eval.benchmark import pointed_at, run_benchmarks, synthetic_segments
+from llm_eval.evaluator import LLMScorer
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+from llm_eval.ratelimit import RateLimitedChat, RetryPolicy
+
+
+@pytest.fixture(autouse=True)
+def fresh_profiles(monkeypatch):
+    """Learned request shapes are global; keep this module's out of other tests."""
+    monkeypatch.setattr(PROFILES, "_profiles", {})
+
+
+def test_rejected_params_are_learned_once():
+    config = FakeServerConfig(reject_params=("max_tokens", "temperature"))
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        for i in range(3):
+            raw = chat_completion("o-model", "sys", f"Hypothesis: h{i}")
+            assert '"score"' in raw
+        assert server.stats.status == {400: 2, 200: 3}
+        assert PROFILES.get("o-model", server.url) == [
+            "max_tokens->max_completion_tokens",
+            "drop-temperature",
+        ]
+
+
+def test_injected_faults_are_retried_and_tokens_counted():
+    config = FakeServerConfig(rate_429=0.2, rate_5xx=0.1, seed=3)
+    segs = synthetic_segments(30)
+    chat = RateLimitedChat(chat_completion, retry=RetryPolicy(max_retries=20, base_delay=0.001, max_delay=0.01))
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        out = LLMScorer(deployment="m", cache=None).score(segs, concurrency=4, _chat_fn=chat)
+        stats = server.stats
+    assert out["aggregate"]["num_scored"] == 30
+    assert stats.status[429] > 0 and stats.status[503] > 0
+    assert stats.status[200] == 30
+    assert stats.prompt_tokens > 0 and stats.completion_tokens > 0
+
+
+def test_packed_prompts_get_one_result_per_id():
+    segs = synthetic_segments(10)
+    with FakeOpenAIServer() as server, pointed_at(server):
+        out = LLMScorer(deployment="m", cache=None).score(segs, segments_per_request=5)
+        assert server.stats.requests == 2
+    assert [s["id"] for s in out["segments"]] == list(range(10))
+    assert all("error" not in s and s["score"] is not None for s in out["segments"])
+
+
+def test_prefix_cache_reports_cached_tokens():
+    config = FakeServerConfig(cache_min_tokens=128, cache_block_tokens=64)
+    shared = "instructions " * 100
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        chat_completion("m", shared, "Hypothesis: a")
+        assert server.stats.cached_tokens == 0
+        chat_completion("m", shared, "Hypothesis: b")
+        assert server.stats.cached_tokens >= 256
+
+
+def test_benchmark_reports_throughput_and_concurrency_helps():
+    config = FakeServerConfig(latency_ms=20)
+    results = run_benchmarks(num_segments=40, concurrency=8, config=config)
+    assert [r.name for r in results] == ["score", "score_multiple", "cli"]
+    for r in results:
+        assert r.requests >= r.segments
+        assert r.segments_per_sec > 0 and r.p50_ms >= 20 and r.p99_ms >= r.p50_ms
+        assert r.peak_memory_mb > 0
+    serial = run_benchmarks(num_segments=40, concurrency=1, config=config, cases=["score"], track_memory=False)
+    parallel = run_benchmarks(num_segments=40, concurrency=8, config=config, cases=["score"], track_memory=False)
+    # Overlap is observed by the server, independent of how fast this machine is
+    assert serial[0].peak_in_flight == 1
+    assert 1 < parallel[0].peak_in_flight <= 8
@@ -0,0 +1,99 @@
+import json
+from types import SimpleNamespace
+
+from typer.testing import CliRunner
+
+from llm_eval import azure_client
+from llm_eval.cli import app
+from llm_eval.data import read_tsv
+from llm_eval.evaluator import score_multiple
+from llm_eval.journal import RunJournal
+
+
+class FakeClient:
+    """Minimal stand-in for the OpenAI client; fails for hypotheses in ``fail_on``."""
+
+    def __init__(self, fail_on=()):
+        self.calls = []
+        self.fail_on = fail_on
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        user = kwargs["messages"][-1]["content"]
+        self.calls.append(user)
+        if any(marker in user for marker in self.fail_on):
+            raise RuntimeError("503 upstream unavailable")
+        content = '{"score": 60, "adequacy": 3, "fluency": 3, "rationale": "ok"}'
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_cli_resume_retries_only_errored(tmp_path, monkeypatch):
+    out = tmp_path / "scores.jsonl"
+    args = ["score", "--data", "data/sample.tsv", "--deployment", "m", "--no-cache",
+            "--output", str(out), "--jsonl", "--profile-cache", str(tmp_path / "profiles.json")]
+    runner = CliRunner()
+
+    failing = FakeClient(fail_on=("Fehlerchen",))
+    monkeypatch.setattr(azure_client, "get_client", lambda: failing)
+    first = runner.invoke(app, args)
+    assert first.exit_code == 0, first.output
+    assert json.loads(first.output)["num_errors"] == 1
+    assert len(failing.calls) == 3
+
+    healthy = FakeClient()
+    monkeypatch.setattr(azure_client, "get_client", lambda: healthy)
+    second = runner.invoke(app, args + ["--resume"])
+    assert second.exit_code == 0, second.output
+    summary = json.loads(second.output)
+    assert len(healthy.calls) == 1
+    assert summary["num_scored"] == 3 and summary["num_errors"] == 0
+    assert [json.loads(line)["id"] for line in out.read_text(encoding="utf-8").splitlines()] == [0, 1, 2]
+
+
+def test_journal_latest_record_wins_and_torn_line_ignored(tmp_path):
+    path = tmp_path / "run.journal.jsonl"
+    path.write_text(
+        json.dumps({"id": 0, "model": "a", "error": "boom"}) + "\n"
+        + json.dumps({"id": 0, "model": "a", "score": 10.0}) + "\n"
+        + json.dumps({"id": 1, "model": "a", "error": "boom"}) + "\n"
+        + '{"id": 2, "model": "a", "sco',
+        encoding="utf-8",
+    )
+    journal = RunJournal(str(path))
+    assert list(journal.completed()["a"]) == [0]
+    journal.start(resume=True)
+    journal.append({"id": 1, "model": "a", "score": 20.0})
+    journal.close()
+    assert sorted(journal.completed()["a"]) == [0, 1]
+
+
+def test_score_multiple_replays_done_and_streams_fresh():
+    segs = read_tsv("data/sample.tsv")
+    done = {"a": {0: {"id": 0, "model": "a", "score": 100.0}}}
+    fresh = []
+
+    def fake_chat_completion(**_: object) -> str:
+        return '{"score": 40, "adequacy": 2, "fluency": 2}'
+
+    res = score_multiple(
+        segs, ["a", "b"], parallel=False, chat_fn=fake_chat_completion,
+        done=done, on_result=fresh.append, keep_segments=False,
+    )
+    assert sorted((r["model"], r["id"]) for r in fresh) == [("a", 1), ("a", 2), ("b", 0), ("b", 1), ("b", 2)]
+    assert res["models"]["a"]["segments"] == []
+    assert res["models"]["a"]["aggregate"]["mean_score"] == 60.0
+    assert res["models"]["b"]["aggregate"]["mean_score"] == 40.0
+
+
+def test_output_without_jsonl_keeps_multi_model_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(azure_client, "get_client", lambda: FakeClient())
+    out = tmp_path / "scores.jsonl"
+    result = CliRunner().invoke(
+        app,
+        ["score", "--data", "data/sample.tsv", "--models", "a,b", "--no-cache", "--output", str(out),
+         "--profile-cache", ""],
+    )
+    assert result.exit_code == 0, result.output
+    models = json.loads(result.output)["models"]
+    assert [len(models[m]["segments"]) for m in ("a", "b")] == [3, 3]
+    assert not (tmp_path / "scores.jsonl.journal.jsonl").exists()
@@ -0,0 +1,125 @@
+import json
+import random
+import re
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.cli import app
+from llm_eval.metrics import compute_metrics
+from llm_eval.metrics.engine import tokenize_13a
+
+HYPS = [
+    "The cat sat on the mat.",
+    "It is a 3.5 km-long road!",
+    "Der schnelle braune Fuchs springt.",
+    "",
+    "a b c d e f",
+    "the dog bites the man",
+]
+REFS = [
+    "The cat is sitting on the mat.",
+    "It's a 3.5-km long road.",
+    "Der braune, schnelle Fuchs sprang.",
+    "something",
+    "a b c d e f",
+    "the man bites the dog",
+]
+
+# SacreBLEU's 13a tokenizer, rule by rule
+SACREBLEU_13A_RULES = [
+    (re.compile(r"([\{-\~\[-\` -\&\(-\+\:-\@\/])"), r" \1 "),
+    (re.compile(r"([^0-9])([\.,])"), r"\1 \2 "),
+    (re.compile(r"([\.,])([^0-9])"), r" \1 \2"),
+    (re.compile(r"([0-9])(-)"), r"\1 \2 "),
+]
+
+
+def sacrebleu_13a(line):
+    line = line.replace("<skipped>", "").replace("-\n", "").replace("\n", " ")
+    if "&" in line:
+        line = line.replace("&quot;", '"').replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+    line = f" {line} "
+    for pattern, repl in SACREBLEU_13A_RULES:
+        line = pattern.sub(repl, line)
+    return " ".join(line.split())
+
+
+# Reference values from sacrebleu 2.x with default settings (BLEU/chrF/TER corpus_score,
+# sentence_bleu/sentence_chrf/sentence_ter).
+SACREBLEU_CORPUS = {"BLEU": 36.20904521637221, "chrF": 56.19058035984853, "TER": 44.827586206896555}
+SACREBLEU_SENTENCE = {
+    "BLEU": [42.38365628278778, 12.600736402830258, 10.27399780837539, 0.0, 100.0, 35.355339059327385],
+    "chrF": [49.6485170311433, 50.14125386996905, 60.51482276769633, 0.0, 100.0, 77.03220390720391],
+    "TER": [28.57142857142857, 100.0, 60.0, 100.0, 0.0, 40.0],
+}
+
+
+@pytest.mark.parametrize("chunk_size", [10000, 4, 1])
+def test_matches_sacrebleu_reference_values(chunk_size):
+    result = compute_metrics(HYPS, REFS, chunk_size=chunk_size)
+    for metric, expected in SACREBLEU_CORPUS.items():
+        assert result["corpus"][metric] == pytest.approx(expected, abs=1e-9)
+        assert list(result["sentence"][metric]) == pytest.approx(SACREBLEU_SENTENCE[metric], abs=1e-9)
+
+
+def test_tokenize_13a_matches_sacrebleu_rules():
+    rng = random.Random(0)
+    alphabet = [chr(c) for c in range(32, 127)] + list("äß€\n\t-.,0123456789") * 3
+    lines = ["", "...", "a,.5", "3.5-4,000.", "&amp;-\nx", "<skipped>end."]
+    lines += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 20))) for _ in range(50000)]
+    for line in lines:
+        assert tokenize_13a.__wrapped__(line) == sacrebleu_13a(line), repr(line)
+
+
+def test_tokenize_13a_is_faster_than_sacrebleu_rules():
+    rng = random.Random(1)
+    words = ["The", "cat", "sat,", "on", "3.5-km", "(long)", "road.", "It's", "a", "mat!", "1,000"]
+    lines = [" ".join(rng.choice(words) for _ in range(30)) + f" {i}." for i in range(5000)]
+
+    def best_of_3(fn):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for line in lines:
+                fn(line)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    # Uncached: every line is new to the tokenizer; measured ~5x faster, assert 2x
+    assert best_of_3(tokenize_13a.__wrapped__) * 2 < best_of_3(sacrebleu_13a)
+
+
+def test_metric_subset_and_unknown_metric():
+    result = compute_metrics(HYPS, REFS, metrics=("chrF",))
+    assert set(result["corpus"]) == {"chrF"}
+    assert result["stats"].bleu is None and result["stats"].ter is None
+    with pytest.raises(ValueError):
+        compute_metrics(HYPS, REFS, metrics=("METEOR",))
+
+
+def test_worker_processes_give_identical_scores():
+    hyps, refs = HYPS * 5, REFS * 5
+    serial = compute_metrics(hyps, refs, chunk_size=7)
+    parallel = compute_metrics(hyps, refs, chunk_size=7, processes=2)
+    assert parallel["corpus"] == serial["corpus"]
+    for metric in serial["sentence"]:
+        assert list(parallel["sentence"][metric]) == list(serial["sentence"][metric])
+
+
+def test_metrics_cli_writes_sentence_scores(tmp_path):
+    data = tmp_path / "data.tsv"
+    data.write_text("".join(f"src\t{r}\t{h}\n" for h, r in zip(HYPS, REFS)), encoding="utf-8")
+    sentence_path = tmp_path / "sentence.jsonl"
+    result = CliRunner().invoke(
+        app, ["metrics", "--data", str(data), "--sentence-output", str(sentence_path)]
+    )
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output)["BLEU"] == pytest.approx(SACREBLEU_CORPUS["BLEU"])
+    lines = [json.loads(line) for line in sentence_path.read_text(encoding="utf-8").splitlines()]
+    assert [line["id"] for line in lines] == list(range(len(HYPS)))
+    assert [line["TER"] for line in lines] == pytest.approx(SACREBLEU_SENTENCE["TER"])
+    for option in ("--chunk-size", "--processes", "--embedding-batch-size"):
+        rejected = CliRunner().invoke(app, ["metrics", "--data", str(data), option, "0"])
+        assert rejected.exit_code == 2
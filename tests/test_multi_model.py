@@ -1,4 +1,6 @@
 import os
+from functools import partial
+
 from llm_eval.evaluator import score_multiple, LLMScorer
 from llm_eval.data import Segment
 
@@ -18,6 +20,22 @@ def test_score_multiple_models(monkeypatch):
         assert seg_entry["score"] == len(d)
 
 
+def test_score_multiple_builds_scorers_with_factory():
+    segs = [Segment(id=i, source="a", hypothesis=f"b{i}", reference="c") for i in range(3)]
+    calls = []
+
+    def fake_chat_completion(deployment: str, system: str, user: str, **kwargs: object) -> list:
+        calls.append((deployment, kwargs))
+        return ['{"score": 40}', '{"score": 60}']
+
+    scorer = partial(LLMScorer, rationale=False, samples=2, temperature=0.7)
+    results = score_multiple(segs, ["modelA", "modelB"], chat_fn=fake_chat_completion, scorer=scorer)
+    assert sorted({d for d, _ in calls}) == ["modelA", "modelB"] and len(calls) == 6
+    assert all(kw["n"] == 2 and kw["temperature"] == 0.7 for _, kw in calls)
+    for block in results["models"].values():
+        assert [s["score"] for s in block["segments"]] == [50.0] * 3
+
+
 def test_quoted_env_single(monkeypatch):
     monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", '"single-model"')
     scorer = LLMScorer()
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm_eval.ratelimit import RateLimitedChat, RateLimiter, RetryPolicy, is_retryable, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status: int, headers=None):
+        super().__init__(f"Error code: {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def test_limiter_paces_requests_and_tokens():
+    clock = FakeClock()
+    limiter = RateLimiter(rpm=60, tpm=6000, clock=clock, sleep=clock.sleep)
+    # 10-second burst: 10 requests / 1000 tokens available up front
+    for _ in range(10):
+        assert limiter.acquire(50) == 0.0
+    assert limiter.acquire(50) == pytest.approx(1.0)
+    # Token budget now binds: 550 tokens left (100/s refill), a 900-token request waits 3.5s
+    assert limiter.acquire(900) == pytest.approx(3.5)
+
+
+def test_limiter_pause_blocks_until_retry_after():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+    limiter.pause(3.0)
+    assert limiter.acquire() == pytest.approx(3.0)
+
+
+def test_retry_after_and_retryable_detection():
+    assert retry_after_seconds(FakeAPIError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_seconds(FakeAPIError(429, {"retry-after": "2"})) == 2.0
+    wrapped = RuntimeError("Chat completion request failed")
+    wrapped.__cause__ = FakeAPIError(503)
+    assert is_retryable(wrapped)
+    assert not is_retryable(FakeAPIError(400))
+    assert not is_retryable(ValueError("bad"))
+
+
+def test_chat_retries_throttling_with_retry_after():
+    clock = FakeClock()
+    responses = [FakeAPIError(429, {"retry-after": "4"}), FakeAPIError(502), "ok"]
+
+    def fake_chat(**_: object) -> str:
+        r = responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+    chat = RateLimitedChat(fake_chat, retry=RetryPolicy(max_retries=3), sleep=clock.sleep)
+    chat.limiter("m")._clock = clock  # drive the limiter with the fake clock
+    assert chat(deployment="m", system="", user="x") == "ok"
+    assert 4.0 <= clock.sleeps[0] <= 4.4
+    assert len(clock.sleeps) == 2
+
+    def always_bad(**_: object) -> str:
+        raise FakeAPIError(400)
+
+    with pytest.raises(FakeAPIError):
+        RateLimitedChat(always_bad, sleep=clock.sleep)(deployment="m", system="", user="x")
+
+
+def test_throttled_endpoint_is_avoided():
+    calls = []
+
+    def fake_chat(endpoint: str, **_: object) -> str:
+        calls.append(endpoint)
+        if endpoint == "https://a/" and calls.count(endpoint) == 1:
+            raise FakeAPIError(429, {"retry-after": "30"})
+        return endpoint
+
+    chat = RateLimitedChat(fake_chat, endpoints=["https://a/", "https://b/"], sleep=lambda s: None)
+    results = [chat(deployment="m", system="", user="x") for _ in range(4)]
+    # Once endpoint a is throttled, every request (including the retry) goes to b
+    assert results == ["https://b/"] * 4
+    assert calls.count("https://a/") == 1
+
+
+def test_reported_usage_returns_unused_token_reservation():
+    from llm_eval.telemetry import TELEMETRY
+
+    def fake_chat(deployment, system, user, **_):
+        rec = TELEMETRY.current()
+        rec.prompt_tokens, rec.completion_tokens = 20, 30
+        return "ok"
+
+    chat = RateLimitedChat(fake_chat, limits=(None, 600))
+    limiter = chat.limiter("m")
+    chat("m", "", "x" * 40, max_tokens=400)
+    # The whole 100-token burst was reserved for the ~420-token estimate; only 50 were used
+    assert limiter.delay(50) == 0.0
@@ -0,0 +1,100 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.cli import app
+from llm_eval.data import Segment
+from llm_eval.evaluator import score_multiple
+from llm_eval.results import RawSidecar, ResultColumns, load_npz, read_raw
+
+
+def fake_chat(deployment, system, user, **_):
+    if "Hypothesis: bad" in user:
+        return "no json here"
+    return '{"score": %d, "adequacy": 3, "fluency": 4, "rationale": "long rationale text"}' % (len(user) % 90)
+
+
+def _segs(n=12):
+    return [Segment(id=i, source=f"s{i}", hypothesis="bad" if i == 3 else f"h{i}", reference="r") for i in range(n)]
+
+
+def test_columns_restore_input_order_and_keep_errors():
+    cols = ResultColumns("m")
+    cols.append({"id": 2, "score": 2.0}, unit=1, offset=0)
+    cols.append({"id": 0, "error": "boom"}, unit=0, offset=0)
+    cols.append({"id": 1, "score": 1.0, "adequacy": 5}, unit=0, offset=1)
+    cols.finish()
+    assert [r["id"] for r in cols] == [0, 1, 2]
+    assert cols[0] == {"id": 0, "model": "m", "score": None, "adequacy": None, "fluency": None, "error": "boom"}
+    assert cols[-1]["score"] == 2.0 and cols[1]["adequacy"] == 5.0
+    arrays = cols.arrays()
+    assert arrays["id"].tolist() == [0, 1, 2] and math.isnan(arrays["score"][0])
+    assert arrays["error"].tolist() == ["boom", "", ""]
+    named = ResultColumns("m")
+    for seg_id in ("007", "010"):
+        named.append({"id": seg_id, "score": 1.0})
+    assert named.arrays()["id"].tolist() == ["007", "010"]
+
+
+def test_compact_score_multiple_with_sidecar(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    with RawSidecar(str(path)) as sidecar:
+        out = score_multiple(
+            _segs(), ["a", "b"], chat_fn=fake_chat, concurrency=3, compact=True, sidecar=sidecar,
+            bootstrap_resamples=0,
+        )
+    full = score_multiple(_segs(), ["a", "b"], chat_fn=fake_chat, bootstrap_resamples=0)
+    for model in ("a", "b"):
+        cols = out["models"][model]["segments"]
+        assert isinstance(cols, ResultColumns)
+        assert [r["score"] for r in cols] == [r.get("score") for r in full["models"][model]["segments"]]
+        assert out["models"][model]["aggregate"] == full["models"][model]["aggregate"]
+        assert "rationale" not in cols[0] and "raw_response" not in cols[0]
+        raw = read_raw(str(path), cols[0]["raw_offset"])
+        assert raw["rationale"] == "long rationale text" and raw["model"] == model
+        failed = read_raw(str(path), cols[3]["raw_offset"])
+        assert cols[3]["error"] == "no_json" and failed["raw"] == "no json here"
+
+
+@pytest.mark.parametrize("models", ["m", "m1,m2"])
+def test_cli_columnar_and_raw_outputs(tmp_path, monkeypatch, models):
+    monkeypatch.setattr("llm_eval.cli.chat_completion", fake_chat)
+    output, raw, npz = tmp_path / "out.jsonl", tmp_path / "raw.jsonl", tmp_path / "scores.npz"
+    result = CliRunner().invoke(
+        app,
+        ["score", "--data", "data/sample.tsv", "--models", models, "--no-cache", "--output", str(output), "--jsonl",
+         "--raw-output", str(raw), "--columnar-output", str(npz), "--profile-cache", ""],
+    )
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert rows and all("raw_response" not in r and "raw_offset" in r for r in rows)
+    assert read_raw(str(raw), rows[0]["raw_offset"])["raw_response"].startswith("{")
+    columns = load_npz(str(npz))
+    assert sorted(columns) == sorted(models.split(","))
+    for model, cols in columns.items():
+        expected = [r["score"] for r in rows if r["model"] == model]
+        assert np.array_equal(cols["score"], np.array(expected, dtype=float))
+        assert cols["id"].dtype == np.int64
+
+
+def test_cli_resume_keeps_raw_offsets_valid(tmp_path, monkeypatch):
+    def flaky(deployment, system, user, **_):
+        if "Fehlerchen" in user:
+            raise RuntimeError("boom")
+        return fake_chat(deployment, system, user)
+
+    output, raw = tmp_path / "out.jsonl", tmp_path / "raw.jsonl"
+    args = ["score", "--data", "data/sample.tsv", "--deployment", "m", "--no-cache", "--output", str(output),
+            "--jsonl", "--raw-output", str(raw), "--profile-cache", "", "--max-retries", "0"]
+    monkeypatch.setattr("llm_eval.cli.chat_completion", flaky)
+    assert CliRunner().invoke(app, args).exit_code == 0
+    monkeypatch.setattr("llm_eval.cli.chat_completion", fake_chat)
+    result = CliRunner().invoke(app, [*args, "--resume"])
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [r["id"] for r in rows] == [0, 1, 2] and all("error" not in r for r in rows)
+    for row in rows:
+        assert read_raw(str(raw), row["raw_offset"])["id"] == row["id"]
@@ -0,0 +1,113 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.benchmark import pointed_at, synthetic_segments
+from llm_eval.cli import app
+from llm_eval.data import Segment
+from llm_eval.fake_server import FakeOpenAIServer
+from llm_eval.sampling import half_width, sample_score, sequential_sample
+
+
+def _corpus(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    truth = rng.normal(60, 15, size=n)
+    segs = [Segment(id=i, source="s", hypothesis=f"h{i}", reference="r") for i in range(n)]
+    return segs, truth
+
+
+def test_half_width_uses_finite_population_correction():
+    values = np.arange(100.0)
+    assert half_width(values, population=100) == 0.0
+    assert half_width(values, population=10**9) == pytest.approx(1.96 * values.std(ddof=1) / 10, rel=1e-3)
+    assert half_width(values[:1], population=100) == float("inf")
+    # Judge noise stays once the whole corpus is scored
+    assert half_width(values, population=100, noise=100 * 4.0) == pytest.approx(1.959964 * 2.0 / 10)
+    # ...and is not counted twice while sampling: it is part of the spread of the values
+    spread = values.var(ddof=1)
+    assert half_width(values, population=10**9, noise=100 * 4.0) == pytest.approx(
+        1.959964 * math.sqrt((spread - 4.0) / 100 + 4.0 / 100), rel=1e-4
+    )
+
+
+def test_stops_once_target_reached_with_paired_models():
+    segs, truth = _corpus()
+    calls = []
+
+    def score_batch(batch):
+        calls.append(len(batch))
+        a = [{"id": s.id, "score": truth[s.id]} for s in batch]
+        b = [{"id": s.id, "score": truth[s.id] + 3 + (s.id % 3 - 1) * 0.1} for s in batch]
+        return {"A": a, "B": b}
+
+    out = sequential_sample(segs, score_batch, target_ci=2.0, batch_size=50)
+    assert out["reached"] and out["fraction_scored"] < 0.25
+    assert out["num_sampled"] == sum(calls) and all(c == 50 for c in calls)
+    a = out["models"]["A"]
+    assert a["half_width"] <= 2.0
+    assert a["ci_low"] <= truth.mean() <= a["ci_high"]
+    pair = out["pairwise"][0]
+    # Paired differences are nearly constant, so their interval is far tighter than each mean's
+    assert pair["delta"] == pytest.approx(-3.0, abs=0.05)
+    assert pair["ci_high"] - pair["ci_low"] < 0.1
+    assert pair["num_paired"] == out["num_sampled"]
+
+
+def test_unreachable_target_scores_everything_exactly():
+    segs, truth = _corpus(n=120)
+    out = sequential_sample(
+        segs, lambda batch: {"A": [{"id": s.id, "score": truth[s.id]} for s in batch]}, target_ci=0.0
+    )
+    assert out["fraction_scored"] == 1.0 and out["reached"]
+    assert out["models"]["A"]["estimate"] == pytest.approx(truth.mean())
+    assert sorted(r["id"] for r in out["segments"]["A"]) == list(range(120))
+
+
+def test_failing_model_does_not_block_stopping():
+    segs, truth = _corpus()
+
+    def score_batch(batch):
+        return {"A": [{"id": s.id, "score": truth[s.id]} for s in batch],
+                "gone": [{"id": s.id, "error": "DeploymentNotFound"} for s in batch]}
+
+    out = sequential_sample(segs, score_batch, target_ci=2.0, batch_size=50)
+    assert out["reached"] and out["fraction_scored"] < 0.25
+    assert out["failed"] == ["gone"] and out["models"]["gone"]["half_width"] is None
+    everything_fails = sequential_sample(segs, lambda b: {"gone": score_batch(b)["gone"]}, target_ci=2.0)
+    assert not everything_fails["reached"] and everything_fails["num_sampled"] == 100
+
+
+def test_errors_are_counted_not_averaged():
+    segs, truth = _corpus(n=200)
+
+    def score_batch(batch):
+        return {"A": [{"id": s.id, "error": "boom"} if s.id % 10 == 0 else {"id": s.id, "score": truth[s.id]}
+                      for s in batch]}
+
+    out = sequential_sample(segs, score_batch, target_ci=100.0, batch_size=40)
+    a = out["models"]["A"]
+    assert a["num_scored"] + a["num_errors"] == out["num_sampled"] == 40
+    assert a["num_errors"] == sum(1 for r in out["segments"]["A"] if "error" in r)
+
+
+def test_sample_score_and_cli_against_fake_server(tmp_path):
+    segs = synthetic_segments(300)
+    with FakeOpenAIServer() as server, pointed_at(server):
+        out = sample_score(segs, ["m1", "m2"], target_ci=10.0, concurrency=8)
+        assert server.stats.requests == 2 * out["num_sampled"] < 2 * len(segs)
+        data = tmp_path / "data.tsv"
+        data.write_text("".join(f"{s.source}\t{s.reference}\t{s.hypothesis}\n" for s in segs), encoding="utf-8")
+        output = tmp_path / "scores.jsonl"
+        result = CliRunner().invoke(
+            app,
+            ["score", "--data", str(data), "--models", "m1,m2", "--no-cache", "--target-ci", "10",
+             "--output", str(output), "--jsonl", "--profile-cache", str(tmp_path / "p.json")],
+        )
+    assert result.exit_code == 0, result.output
+    summary = json.loads(result.output)
+    assert summary["fraction_scored"] == pytest.approx(100 / 300)
+    assert set(summary["models"]) == {"m1", "m2"}
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 200
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from llm_eval.data import Segment
+from llm_eval.evaluator import score_multiple
+from llm_eval.scheduler import WorkScheduler
+
+
+def _tracked(delay: float, peaks: dict, key: str, lock: threading.Lock, live: dict):
+    def run(item):
+        with lock:
+            live[key] += 1
+            peaks[key] = max(peaks[key], live[key])
+        time.sleep(delay)
+        with lock:
+            live[key] -= 1
+        return item * 2
+
+    return run
+
+
+def test_budget_shifts_to_slow_deployment_after_fast_one_finishes():
+    lock = threading.Lock()
+    live = {"fast": 0, "slow": 0}
+    peaks = {"fast": 0, "slow": 0}
+    scheduler = WorkScheduler({"fast": 4, "slow": 4}, max_in_flight=4)
+    out = list(
+        scheduler.run(
+            {
+                "fast": (range(4), _tracked(0.001, peaks, "fast", lock, live)),
+                "slow": (range(40), _tracked(0.01, peaks, "slow", lock, live)),
+            }
+        )
+    )
+    assert len(out) == 44
+    assert sorted(r for k, _, r in out if k == "slow") == [i * 2 for i in range(40)]
+    assert peaks["fast"] <= 4
+    # The slow deployment starts with half of the budget and later gets all of it
+    assert peaks["slow"] == 4
+
+
+def test_failing_deployment_does_not_stop_others():
+    def boom(_):
+        raise RuntimeError("401 unauthorized")
+
+    scheduler = WorkScheduler(2)
+    out = list(scheduler.run({"bad": (range(5), boom), "ok": (range(5), lambda i: i)}))
+    assert sorted(r for k, _, r in out if k == "ok") == list(range(5))
+    assert not any(k == "bad" for k, _, _ in out)
+    assert "401" in str(scheduler.failures["bad"])
+
+
+def test_score_multiple_per_deployment_caps_keep_shape():
+    segs = [Segment(id=i, source=f"s{i}", hypothesis="h") for i in range(12)]
+
+    def fake_chat_completion(deployment: str, user: str, **_: object) -> str:
+        time.sleep(0.005 if deployment == "slow" else 0)
+        return '{"score": %d, "adequacy": 3, "fluency": 3}' % (10 if deployment == "slow" else 20)
+
+    res = score_multiple(
+        segs, ["fast", "slow"], chat_fn=fake_chat_completion, concurrency={"fast": 1, "slow": 6}
+    )
+    assert list(res["models"]) == ["fast", "slow"]
+    for dep, mean in (("fast", 20.0), ("slow", 10.0)):
+        block = res["models"][dep]
+        assert [r["id"] for r in block["segments"]] == list(range(12))
+        assert block["aggregate"]["mean_score"] == mean
+    assert [a["model"] for a in res["summary"]["model_aggregates"]] == ["fast", "slow"]
@@ -0,0 +1,129 @@
+import json
+import math
+import threading
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.aggregate import RunningAggregate
+from llm_eval.azure_client import PROFILES, chat_completion
+from llm_eval.benchmark import pointed_at, synthetic_segments
+from llm_eval.cache import JudgmentCache
+from llm_eval.cli import app
+from llm_eval.evaluator import LLMScorer
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+from llm_eval.prompting import parse_samples
+
+
+def _raw(score):
+    return '{"score": %s, "adequacy": 2, "fluency": 4, "rationale": "r%s"}' % (score, score)
+
+
+def test_parse_samples_reports_spread_and_skips_bad_samples():
+    out = parse_samples([_raw(70), "garbage", _raw(80), _raw(90)])
+    assert out["score"] == 80 and out["score_median"] == 80
+    assert out["score_var"] == pytest.approx(100.0)
+    assert out["samples"] == [70, 80, 90] and out["num_samples"] == 3
+    assert out["rationale"] == "r70" and out["adequacy"] == 2
+    assert parse_samples([_raw(50)])["score_var"] == 0.0
+    assert parse_samples(["nope", "nada"])["error"] == "no_json"
+
+
+def test_n_choices_in_one_request(monkeypatch):
+    monkeypatch.setattr(PROFILES, "_profiles", {})
+    segs = synthetic_segments(8)
+    with FakeOpenAIServer() as server, pointed_at(server):
+        out = LLMScorer(deployment="m", cache=None, samples=4, temperature=1.0).score(
+            segs, concurrency=4, _chat_fn=chat_completion
+        )
+        assert server.stats.requests == 8
+    for res in out["segments"]:
+        assert res["num_samples"] == 4 and len(res["samples"]) == 4
+        assert res["score"] == pytest.approx(sum(res["samples"]) / 4)
+    assert any(res["score_var"] > 0 for res in out["segments"])
+
+
+def test_falls_back_to_concurrent_calls_when_n_is_rejected(monkeypatch):
+    monkeypatch.setattr(PROFILES, "_profiles", {})
+    segs = synthetic_segments(5)
+    with FakeOpenAIServer(FakeServerConfig(reject_params=("n",))) as server, pointed_at(server):
+        out = LLMScorer(deployment="m", cache=None, samples=3, temperature=1.0).score(segs, _chat_fn=chat_completion)
+        # One rejected request teaches the profile; then 1 + 2 top-up calls per segment
+        assert server.stats.status == {400: 1, 200: 15}
+        assert "drop-n" in PROFILES.get("m")
+    assert all(res["num_samples"] == 3 for res in out["segments"])
+
+
+def test_top_up_samples_respect_concurrency():
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def chat(deployment, system, user, **kwargs):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.005)
+        with lock:
+            state["now"] -= 1
+        return _raw(50)  # ignores n, like a deployment without multiple choices
+
+    out = LLMScorer(deployment="m", cache=None, samples=4).score(synthetic_segments(8), concurrency=2, _chat_fn=chat)
+    assert all(res["num_samples"] == 4 for res in out["segments"])
+    assert state["peak"] <= 2
+
+
+def test_samples_are_cached_together(tmp_path):
+    calls = []
+    lock = threading.Lock()
+
+    def chat(deployment, system, user, **kwargs):
+        with lock:
+            calls.append(kwargs.get("n"))
+        return [_raw(60), _raw(64)] if kwargs.get("n") else _raw(62)
+
+    cache = JudgmentCache(str(tmp_path / "c.sqlite3"))
+    segs = synthetic_segments(3)
+    first = LLMScorer(deployment="m", cache=cache, samples=3).score(segs, _chat_fn=chat)
+    assert calls.count(3) == 3 and calls.count(None) == 3
+    again = LLMScorer(deployment="m", cache=cache, samples=3).score(segs, _chat_fn=chat)
+    assert len(calls) == 6
+    assert again["segments"][0]["samples"] == first["segments"][0]["samples"] == [60, 64, 62]
+    # A single-sample scorer does not reuse the multi-sample entries
+    LLMScorer(deployment="m", cache=cache).score(segs, _chat_fn=chat)
+    assert len(calls) == 9
+    cache.close()
+
+
+def test_judge_noise_widens_aggregate_interval():
+    agg = RunningAggregate()
+    for score in (40.0, 60.0):
+        agg.add({"score": score, "score_var": 25.0, "num_samples": 4})
+    out = agg.to_dict()
+    # s^2 / N of the per-segment means, which already carry their judge noise
+    se = math.sqrt(200.0 / 2)
+    assert out["mean_score_se"] == pytest.approx(se)
+    assert out["judge_noise_se"] == pytest.approx(math.sqrt(2 * 25.0 / 4) / 2)
+    assert out["mean_score_ci"] == pytest.approx([50 - 1.959964 * se, 50 + 1.959964 * se])
+    merged = RunningAggregate().merge(RunningAggregate.from_partial(agg.to_partial()))
+    assert merged.to_dict() == out
+    assert "mean_score_ci" not in RunningAggregate().to_dict()
+
+
+def test_cli_samples(tmp_path, monkeypatch):
+    temps = []
+
+    def chat(deployment, system, user, **kwargs):
+        temps.append(kwargs.get("temperature"))
+        return _raw(len(temps) % 7 * 10)
+
+    monkeypatch.setattr("llm_eval.cli.chat_completion", chat)
+    result = CliRunner().invoke(
+        app,
+        ["score", "--data", "data/sample.tsv", "--deployment", "m", "--no-cache", "--samples", "3",
+         "--profile-cache", str(tmp_path / "p.json")],
+    )
+    assert result.exit_code == 0, result.output
+    summary = json.loads(result.output)
+    assert len(temps) == 3 * summary["num_segments"] and set(temps) == {1.0}
+    assert summary["mean_score_ci"][0] < summary["mean_score"] < summary["mean_score_ci"][1]
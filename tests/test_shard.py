@@ -0,0 +1,91 @@
+import json
+import random
+
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.aggregate import RunningAggregate
+from llm_eval.cli import app
+from llm_eval.metrics.engine import compute_metrics
+from llm_eval.shard import merge_partials, parse_shard, shard_of
+
+
+def fake_chat(deployment, system, user, **_):
+    # Scores with many significant digits, so summation order would show
+    score = (hash((deployment, user)) % 10**6) / 7919.0
+    return '{"score": %r, "adequacy": 1, "fluency": 1, "rationale": "r"}' % score
+
+
+def test_parse_and_select_shards():
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ("4/4", "-1/2", "1", "a/b", "0/0"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+    ids = list(range(1000))
+    buckets = [[i for i in ids if shard_of(i, 4) == k] for k in range(4)]
+    assert sorted(sum(buckets, [])) == ids
+    assert all(200 < len(b) < 300 for b in buckets)
+    assert shard_of("doc-7", 3) == shard_of("doc-7", 3)
+
+
+def test_merged_partials_equal_one_pass():
+    rng = random.Random(0)
+    results = [{"score": rng.uniform(0, 100) * 10 ** rng.randint(-8, 8)} for _ in range(500)]
+    results += [{"error": "boom"}] * 7
+    whole = RunningAggregate()
+    parts = [RunningAggregate() for _ in range(3)]
+    for i, r in enumerate(results):
+        whole.add(r)
+        parts[i % 3].add(r)
+    partials = [
+        {"shard": [k, 3], "models": {"m": json.loads(json.dumps(p.to_partial()))}} for k, p in enumerate(parts)
+    ]
+    merged = merge_partials(partials[::-1])
+    assert {k: merged[k] for k in whole.to_dict()} == whole.to_dict()
+    with pytest.raises(ValueError, match="Missing"):
+        merge_partials(partials[:2])
+    assert merge_partials(partials[:2], allow_missing=True)["shards"]["missing"] == [2]
+    with pytest.raises(ValueError, match="Duplicate"):
+        merge_partials(partials + partials[:1])
+
+
+@pytest.mark.parametrize("models", [["m"], ["m1", "m2"]])
+def test_cli_shards_merge_to_single_process_numbers(tmp_path, monkeypatch, models):
+    monkeypatch.setattr("llm_eval.cli.chat_completion", fake_chat)
+    rng = random.Random(1)
+    words = "the cat sat on a mat dog ran far away".split()
+    rows = [(" ".join(rng.choices(words, k=8)), " ".join(rng.choices(words, k=8)), " ".join(rng.choices(words, k=7)))
+            for _ in range(60)]
+    data = tmp_path / "data.tsv"
+    data.write_text("".join("\t".join(r) + "\n" for r in rows), encoding="utf-8")
+    runner = CliRunner()
+    base = ["score", "--data", str(data), "--models", ",".join(models), "--no-cache", "--jsonl",
+            "--profile-cache", ""]
+
+    single = runner.invoke(app, base + ["--output", str(tmp_path / "all.jsonl")])
+    assert single.exit_code == 0, single.output
+    single = json.loads(single.output)
+
+    partials = []
+    for i in range(3):
+        out = tmp_path / f"shard{i}.jsonl"
+        result = runner.invoke(app, base + ["--output", str(out), "--shard", f"{i}/3"])
+        assert result.exit_code == 0, result.output
+        partials.append(f"{out}.partial.json")
+    shard_lines = sum(len((tmp_path / f"shard{i}.jsonl").read_text().splitlines()) for i in range(3))
+    assert shard_lines == 60 * len(models)
+
+    merged = runner.invoke(app, ["merge", *partials])
+    assert merged.exit_code == 0, merged.output
+    merged = json.loads(merged.output)
+    if len(models) == 1:
+        assert merged["model"] == single["model"]
+        assert {k: merged[k] for k in ("mean_score", "num_segments", "num_scored", "num_errors")} == {
+            k: single[k] for k in ("mean_score", "num_segments", "num_scored", "num_errors")
+        }
+    else:
+        for m in models:
+            assert merged["models"][m]["aggregate"] == single["models"][m]["aggregate"]
+    expected_bleu = compute_metrics([r[2] for r in rows], [r[1] for r in rows], metrics=("BLEU",))["corpus"]["BLEU"]
+    assert merged["metrics"]["BLEU"] == expected_bleu
+    assert runner.invoke(app, ["merge", *partials[:2]]).exit_code == 1
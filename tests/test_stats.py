@@ -0,0 +1,136 @@
+import json
+import re
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from llm_eval.cli import app
+from llm_eval.data import Segment
+from llm_eval.evaluator import score_multiple
+from llm_eval.stats import bootstrap_counts, bootstrap_means, compare, paired_bootstrap, z_normalize
+
+
+def test_z_normalize_per_group_ignores_nan():
+    scores = np.array([1.0, 2.0, 3.0, np.nan, 10.0, 10.0, 40.0, 70.0])
+    groups = np.array(["a", "a", "a", "a", "b", "b", "b", "b"])
+    z = z_normalize(scores, groups)
+    a = np.array([1.0, 2.0, 3.0])
+    assert z[:3] == pytest.approx((a - a.mean()) / a.std())
+    assert np.isnan(z[3])
+    b = scores[4:]
+    assert z[4:] == pytest.approx((b - b.mean()) / b.std())
+    assert list(z_normalize(np.array([5.0, 5.0]), np.array([0, 0]))) == [0.0, 0.0]
+
+
+def test_bootstrap_matches_explicit_resampling():
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(3, 50))
+    counts = np.vstack(list(bootstrap_counts(50, 200, seed=7, block_size=50 * 30)))
+    assert counts.shape == (200, 50)
+    assert (counts.sum(axis=1) == 50).all()
+    # Same counts, written as index resampling one row at a time
+    expected = np.array(
+        [[matrix[s, np.repeat(np.arange(50), c)].mean() for s in range(3)] for c in counts]
+    )
+    assert bootstrap_means(matrix, 200, seed=7) == pytest.approx(expected)
+
+
+def test_paired_bootstrap_detects_consistent_difference():
+    rng = np.random.default_rng(0)
+    base = rng.uniform(0, 100, size=300)
+    matrix = np.vstack([base + 2.0 + rng.normal(0, 1, 300), base, base])
+    out = paired_bootstrap(matrix, n_resamples=2000, seed=0)
+    assert out["p_value"][0, 1] < 0.01
+    assert out["p_value"][1, 2] == 1.0  # identical systems
+    assert out["delta_ci_low"][0, 1] > 0
+    assert (out["ci_low"] <= out["mean"]).all() and (out["mean"] <= out["ci_high"]).all()
+
+
+def test_compare_uses_common_segments_and_reports_correlation():
+    records = []
+    for i in range(40):
+        records.append({"model": "A", "id": i, "score": float(i)})
+        records.append({"model": "B", "id": i, "score": float(2 * i + (i % 3))})
+    records.append({"model": "A", "id": 99, "score": 50.0})  # only A scored it
+    records.append({"model": "B", "id": 5, "score": None, "error": "boom"})
+    out = compare(records, n_resamples=500)
+    assert out["num_segments"] == 40
+    assert [m["model"] for m in out["models"]] == ["A", "B"]
+    assert out["models"][0]["mean_score"] == pytest.approx(19.5)
+    # z-scores pool every scored record, including the segment B never scored
+    pooled = np.array([r["score"] for r in records if r["score"] is not None and "error" not in r])
+    assert out["models"][0]["mean_z"] == pytest.approx(((np.arange(40.0) - pooled.mean()) / pooled.std()).mean())
+    pair = out["pairwise"][0]
+    b = [2 * i + (i % 3) for i in range(40)]
+    assert pair["pearson"] == pytest.approx(np.corrcoef(np.arange(40), b)[0, 1])
+    assert pair["delta"] == pytest.approx(19.5 - np.mean(b))
+
+
+def test_compare_without_common_segments_reports_no_significance():
+    records = [{"model": "A", "id": i, "score": 10.0} for i in range(5)]
+    records += [{"model": "B", "id": i + 5, "score": 90.0} for i in range(5)]
+    pair = compare(records, n_resamples=50)["pairwise"][0]
+    assert pair["delta"] is None and pair["p_value"] is None and pair["z_p_value"] is None
+    with pytest.raises(ValueError):
+        compare(records, n_resamples=0)
+
+
+def test_z_delta_keeps_a_real_offset_between_systems():
+    rng = np.random.default_rng(0)
+    base = rng.normal(60, 10, size=200)
+    records = [{"model": "A", "id": i, "score": float(v + 5)} for i, v in enumerate(base)]
+    records += [{"model": "B", "id": i, "score": float(v + rng.normal(0, 3))} for i, v in enumerate(base)]
+    out = compare(records, n_resamples=500)
+    assert out["z_normalization"] == "all"
+    pair = out["pairwise"][0]
+    assert pair["p_value"] < 0.01 and pair["z_p_value"] < 0.01
+    assert pair["z_delta"] == pytest.approx(pair["delta"] / np.std([r["score"] for r in records]))
+    assert out["models"][0]["mean_z"] > 0 > out["models"][1]["mean_z"]
+
+
+def test_compare_rater_normalization():
+    # Rater r2 is harsher by a constant; per-rater z-scores remove the offset
+    records = [
+        {"model": sys, "rater": rater, "id": i, "score": score + (0 if rater == "r1" else -30)}
+        for i in range(10)
+        for rater in ("r1", "r2")
+        for sys, score in (("good", 80 + i), ("bad", 60 + i))
+    ]
+    out = compare(records, n_resamples=200, rater_key="rater")
+    assert out["z_normalization"] == "rater"
+    good, bad = out["models"]
+    assert good["mean_z"] > 0 > bad["mean_z"]
+    assert good["mean_z"] == pytest.approx(-bad["mean_z"])
+
+
+def test_score_multiple_summary_has_comparison():
+    segs = [Segment(id=i, source="s", hypothesis=f"h{i}", reference="r") for i in range(20)]
+
+    def fake_chat(deployment, system, user, **_):
+        score = 50 + (10 if deployment == "big" else 0) + int(re.search(r"h(\d+)", user).group(1))
+        return '{"score": %d, "adequacy": 1, "fluency": 1, "rationale": "ok"}' % score
+
+    out = score_multiple(segs, ["big", "small"], chat_fn=fake_chat, keep_segments=False)
+    comparison = out["summary"]["comparison"]
+    assert comparison["num_segments"] == 20
+    assert comparison["pairwise"][0]["delta"] == pytest.approx(10.0)
+    assert comparison["pairwise"][0]["p_value"] < 0.01
+
+
+def test_compare_cli_from_jsonl(tmp_path):
+    path = tmp_path / "scores.jsonl"
+    path.write_text(
+        "".join(
+            json.dumps({"id": i, "model": m, "score": float(i + off)}) + "\n"
+            for m, off in (("A", 0), ("B", 5))
+            for i in range(30)
+        ),
+        encoding="utf-8",
+    )
+    result = CliRunner().invoke(app, ["compare", "--results", str(path), "--resamples", "300"])
+    assert result.exit_code == 0, result.output
+    out = json.loads(result.output)
+    assert out["num_resamples"] == 300
+    assert out["pairwise"][0]["delta"] == pytest.approx(-5.0)
+    assert CliRunner().invoke(app, ["compare", "--results", str(path), "--resamples", "0"]).exit_code == 2
@@ -0,0 +1,86 @@
+import json
+import random
+import statistics
+
+from typer.testing import CliRunner
+
+from llm_eval.aggregate import RunningAggregate
+from llm_eval.cli import app
+from llm_eval.data import JsonlWriter, Segment, iter_segments, read_tsv
+from llm_eval.evaluator import LLMScorer
+
+
+def test_readers_agree_across_formats(tmp_path):
+    expected = read_tsv("data/sample.tsv", has_reference=True)
+    csv_path = tmp_path / "sample.csv"
+    jsonl_path = tmp_path / "sample.jsonl"
+    csv_path.write_text(
+        "".join(f'"{s.source}","{s.reference}","{s.hypothesis}"\n' for s in expected), encoding="utf-8"
+    )
+    jsonl_path.write_text(
+        "".join(
+            json.dumps({"source": s.source, "reference": s.reference, "hypothesis": s.hypothesis}) + "\n"
+            for s in expected
+        ),
+        encoding="utf-8",
+    )
+    assert list(iter_segments(str(csv_path))) == expected
+    assert list(iter_segments(str(jsonl_path))) == expected
+    assert list(iter_segments("data/sample.tsv")) == expected
+
+
+def test_jsonl_keeps_string_ids_and_scores_them(tmp_path, monkeypatch):
+    path = tmp_path / "named.jsonl"
+    ids = ["doc1-3", "007", 12]
+    path.write_text(
+        "".join(json.dumps({"id": i, "source": "s", "reference": "r", "hypothesis": f"h{n}"}) + "\n"
+                for n, i in enumerate(ids)),
+        encoding="utf-8",
+    )
+    assert [s.id for s in iter_segments(str(path))] == ids
+    monkeypatch.setattr(
+        "llm_eval.cli.chat_completion", lambda **_: '{"score": 50, "adequacy": 3, "fluency": 3, "rationale": "r"}'
+    )
+    out = tmp_path / "out.jsonl"
+    result = CliRunner().invoke(
+        app, ["score", "--data", str(path), "--deployment", "m", "--no-cache", "--output", str(out), "--jsonl",
+              "--profile-cache", "", "--segments-per-request", "3"],
+    )
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line)["id"] for line in out.read_text(encoding="utf-8").splitlines()] == ids
+
+
+def test_running_aggregate_matches_fmean_exactly():
+    rng = random.Random(3)
+    scores = [rng.uniform(0, 100) for _ in range(5000)] + [1e-9, 1e9, -1e9]
+    agg = RunningAggregate()
+    for s in scores:
+        agg.add({"score": s})
+    agg.add({"error": "no_json"})
+    assert agg.mean_score == statistics.fmean(scores)
+    assert agg.to_dict()["num_segments"] == len(scores) + 1
+    assert agg.to_dict()["num_errors"] == 1
+
+
+def test_iter_score_pulls_input_lazily(tmp_path):
+    pulled = []
+
+    def segments():
+        for i in range(100):
+            pulled.append(i)
+            yield Segment(id=i, source="s", hypothesis="h")
+
+    def fake_chat_completion(**_: object) -> str:
+        return '{"score": 50, "adequacy": 3, "fluency": 3}'
+
+    out = tmp_path / "out.jsonl"
+    stream = LLMScorer(deployment="m").iter_score(segments(), concurrency=2, _chat_fn=fake_chat_completion)
+    with JsonlWriter(str(out)) as writer:
+        writer.write(next(stream))
+        # Only the bounded in-flight window has been read from the input so far
+        assert len(pulled) <= 10
+        # ...and the first record is already on disk
+        assert json.loads(out.read_text(encoding="utf-8"))["score"] == 50.0
+        for r in stream:
+            writer.write(r)
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 100
@@ -0,0 +1,82 @@
+import json
+import time
+
+import pytest
+
+from llm_eval.azure_client import chat_completion
+from llm_eval.benchmark import pointed_at
+from llm_eval.data import Segment
+from llm_eval.evaluator import LLMScorer
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+from llm_eval.prompting import JsonFieldScanner, PromptTemplate
+from llm_eval.telemetry import TELEMETRY
+
+RESPONSE = '{"score": 72.5, "adequacy": 4, "fluency": {"n": 5}, "rationale": "a \\"quoted\\", {odd} text"}'
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(RESPONSE)])
+def test_scanner_finds_fields_across_chunk_boundaries(size):
+    scanner = JsonFieldScanner()
+    done_at = None
+    for start in range(0, len(RESPONSE), size):
+        if scanner.feed(RESPONSE[start : start + size]) and done_at is None:
+            done_at = start + size
+    assert scanner.done and scanner.values == {"score": 72.5, "adequacy": 4, "fluency": {"n": 5}}
+    # Completes before the rationale has been read
+    assert done_at < len(RESPONSE) or size == len(RESPONSE)
+    assert json.loads(scanner.complete_json()) == scanner.values
+
+
+def test_scanner_ignores_nested_and_array_roots():
+    scanner = JsonFieldScanner(["score"])
+    assert not scanner.feed('```json\n{"detail": {"score": 1}, ')
+    assert scanner.feed('"score": 2}')
+    assert scanner.values == {"score": 2}
+    batch = JsonFieldScanner(["score"])
+    assert not batch.feed('[{"id": 1, "score": 5, "adequacy": 1, "fluency": 1}]')
+
+
+def test_score_only_template_drops_rationale():
+    prompt = PromptTemplate.score_only().build("s", "h", "r")
+    assert "rationale" not in prompt["user"] and "fluency" in prompt["user"]
+    assert LLMScorer(deployment="m", rationale=False).template.name == "score_only"
+    assert LLMScorer(deployment="m", template=PromptTemplate(), rationale=False).template.name == "default"
+
+
+def test_early_close_cuts_latency_and_billed_tokens():
+    config = FakeServerConfig(token_latency_ms=2, rationale_words=60)
+    user = PromptTemplate().build("source", "hypothesis", None)["user"]
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        full = chat_completion("m", "sys", user, stream=True)
+        full_tokens = server.stats.completion_tokens
+        server.reset_stats()
+        TELEMETRY.reset()
+        short = chat_completion("m", "sys", user, stream=True, early_stop=True)
+        deadline = time.monotonic() + 5
+        while server.stats.requests < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)  # the server books the request once it notices the closed connection
+        billed = server.stats.completion_tokens
+        streamed = server.stats.streamed_chars
+    assert json.loads(full) == {**json.loads(short), "rationale": json.loads(full)["rationale"]}
+    assert "rationale" not in json.loads(short)
+    assert streamed < len(full) / 2
+    assert billed < full_tokens / 2
+    assert TELEMETRY.summary()["m"]["completion_tokens"] < full_tokens / 2
+
+
+def test_streamed_scoring_matches_non_streamed():
+    segs = [Segment(id=i, source=f"s{i}", hypothesis=f"h{i}", reference="r") for i in range(6)]
+    with FakeOpenAIServer() as server, pointed_at(server):
+        plain = LLMScorer(deployment="m", cache=None).score(segs, _chat_fn=chat_completion)
+        streamed = LLMScorer(deployment="m", cache=None, stream=True).score(segs, _chat_fn=chat_completion)
+        # Batch responses are JSON arrays and are always read to the end
+        packed = LLMScorer(deployment="m", cache=None, stream=True, rationale=False).score(
+            segs, _chat_fn=chat_completion, segments_per_request=3
+        )
+        fast = LLMScorer(deployment="m", cache=None, stream=True, rationale=False).score(
+            segs, _chat_fn=chat_completion
+        )
+    assert [s["score"] for s in streamed["segments"]] == [s["score"] for s in plain["segments"]]
+    assert streamed["segments"][0]["rationale"]
+    assert all(s["score"] is not None and "error" not in s for s in packed["segments"] + fast["segments"])
+    assert not any(s.get("rationale") for s in fast["segments"])
@@ -0,0 +1,70 @@
+import json
+
+from typer.testing import CliRunner
+
+from llm_eval.azure_client import chat_completion
+from llm_eval.benchmark import pointed_at, synthetic_segments
+from llm_eval.cli import app
+from llm_eval.evaluator import LLMScorer
+from llm_eval.fake_server import FakeOpenAIServer, FakeServerConfig
+from llm_eval.ratelimit import RateLimitedChat, RetryPolicy
+from llm_eval.telemetry import TELEMETRY, Histogram, RequestRecord, Telemetry
+
+
+def test_records_latency_usage_transforms_and_retries():
+    config = FakeServerConfig(latency_ms=5, rate_429=0.3, reject_params=("max_tokens",), seed=1)
+    chat = RateLimitedChat(chat_completion, retry=RetryPolicy(max_retries=20, base_delay=0.001, max_delay=0.01))
+    TELEMETRY.reset(keep_records=True)
+    with FakeOpenAIServer(config) as server, pointed_at(server):
+        LLMScorer(deployment="tele", cache=None).score(synthetic_segments(12), concurrency=3, _chat_fn=chat)
+        server_stats = server.stats
+    stats = TELEMETRY.summary()["tele"]
+    assert stats["requests"] == 12 and stats["errors"] == 0
+    assert stats["retries"] == server_stats.status[429] > 0
+    assert stats["prompt_tokens"] == server_stats.prompt_tokens
+    assert stats["completion_tokens"] == server_stats.completion_tokens
+    assert stats["transforms"] == {"max_tokens->max_completion_tokens": 12}
+    assert stats["latency_seconds"]["count"] == 12 and stats["latency_seconds"]["mean"] >= 0.005
+    assert len(TELEMETRY.records) == 12
+    assert all(r.completion_tokens and r.endpoint is None for r in TELEMETRY.records)
+
+
+def test_failed_and_unparseable_requests_are_counted():
+    telemetry = Telemetry()
+    try:
+        with telemetry.request("m") as rec:
+            rec.retries = 2
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    telemetry.parse_error("m")
+    stats = telemetry.summary()["m"]
+    assert (stats["requests"], stats["errors"], stats["retries"], stats["parse_errors"]) == (1, 1, 2, 1)
+
+
+def test_histogram_and_prometheus_text():
+    h = Histogram((1, 2, 5))
+    for v in (0.5, 1.5, 1.7, 3, 10):
+        h.observe(v)
+    assert h.counts == [1, 2, 1, 1]
+    assert h.quantile(0.5) == 2 and h.quantile(1.0) is None
+    telemetry = Telemetry()
+    telemetry.add(RequestRecord(deployment='we"ird', latency=0.2, prompt_tokens=10, completion_tokens=40))
+    text = telemetry.prometheus_text()
+    assert 'llm_eval_requests_total{deployment="we\\"ird"} 1' in text
+    assert 'llm_eval_tokens_total{deployment="we\\"ird",kind="completion"} 40' in text
+    assert 'llm_eval_request_latency_seconds_bucket{deployment="we\\"ird",le="0.25"} 1' in text
+    assert 'llm_eval_request_latency_seconds_bucket{deployment="we\\"ird",le="+Inf"} 1' in text
+
+
+def test_cli_summary_and_prometheus_file(tmp_path):
+    prom = tmp_path / "llm_eval.prom"
+    args = ["score", "--data", "data/sample.tsv", "--deployment", "m", "--no-cache",
+            "--profile-cache", str(tmp_path / "profiles.json"),
+            "--telemetry-output", str(prom), "--telemetry-format", "prometheus"]
+    with FakeOpenAIServer() as server, pointed_at(server):
+        result = CliRunner().invoke(app, args)
+    assert result.exit_code == 0, result.output
+    summary = json.loads(result.output)
+    assert summary["telemetry"]["m"]["requests"] == 3
+    assert 'llm_eval_requests_total{deployment="m"} 3' in prom.read_text(encoding="utf-8")